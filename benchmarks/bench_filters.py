@@ -0,0 +1,154 @@
+"""
+Benchmark dos filtros do DataProcessor: caminho em lista (um objeto por vez)
+contra o modo em colunas (máscaras vetorizadas no pandas).
+
+"columnar" inclui montar o ProductBatch a partir dos Products; "columnar (lote
+pronto)" mede só as máscaras e a seleção, com o lote já em colunas.
+A segunda tabela mede o NegativeKeywordFilter com listas de 6 a 1000 palavras
+contra a busca ingênua (any(k in title) para cada palavra). A terceira roda
+lotes do tamanho de uma página (48) com os filtros cadastrados na pior ordem:
+um apply() por filtro (listas intermediárias) contra a passada única, com e
+sem a reordenação por custo/seletividade.
+
+    python benchmarks/bench_filters.py
+    python benchmarks/bench_filters.py --rows 48 1000 10000 --keywords 6 100
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from data_processing import (DataProcessor, ConditionFilter, NegativeKeywordFilter, LogisticsFilter,
+                             ProductBatch)
+from product import Product, Logistics, Condition
+
+NEGATIVE = ["capa", "capinha", "película", "vidro", "suporte", "cabo"]
+WORDS = ["JBL", "Flip", "6", "Caixa", "de", "Som", "Bluetooth", "Preta", "Azul", "Original", "Portátil",
+         "Capa", "Película", "Suporte", "Cabo", "USB-C", "20W", "Prova", "D'água", "Kit"]
+
+
+def make_products(rows, seed=7):
+    rng = random.Random(seed)
+    logistics = list(Logistics)
+    conditions = [Condition.NOVO] * 8 + [Condition.USADO, Condition.RECONDICIONADO]
+    return [
+        Product("jbl flip 6", " ".join(rng.choices(WORDS, k=8)), rng.uniform(10, 1000),
+                logistics=rng.choice(logistics), condition=rng.choice(conditions))
+        for _ in range(rows)
+    ]
+
+
+def make_processor(mode):
+    processor = DataProcessor(mode=mode)
+    processor.add_filter(ConditionFilter("Novo"))
+    processor.add_filter(NegativeKeywordFilter(NEGATIVE))
+    processor.add_filter(LogisticsFilter(["full", "flex", "full, flex"]))
+    return processor
+
+
+def timed(fn, repeat):
+    """Melhor tempo de 'repeat' execuções."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Filtros em lista x em colunas.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--keywords", type=int, nargs="+", default=[6, 100, 1000],
+                        help="tamanhos de lista de palavras negativas")
+    parser.add_argument("--keyword-rows", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    list_processor = make_processor("list")
+    columnar_processor = make_processor("columnar")
+
+    print(f"{'linhas':>9} {'saída':>8} {'lista s':>9} {'colunas s':>10} {'lote pronto s':>14} {'ganho':>7}")
+    for rows in args.rows:
+        products = make_products(rows)
+        list_seconds, expected = timed(lambda: list_processor.process(products), args.repeat)
+        columnar_seconds, result = timed(lambda: columnar_processor.process(products), args.repeat)
+        # Só a conversão Product -> colunas fica de fora; as máscaras são recalculadas
+        batch = ProductBatch(products)
+        batch_seconds, batch_result = timed(lambda: columnar_processor.process(_fresh(batch)), args.repeat)
+        assert result == expected and batch_result == expected, "modos divergem"
+        print(f"{rows:>9} {len(expected):>8} {list_seconds:>9.3f} {columnar_seconds:>10.3f} "
+              f"{batch_seconds:>14.3f} {list_seconds / columnar_seconds:>6.1f}x")
+
+    bench_keywords(args.keyword_rows, args.keywords, args.repeat)
+    bench_planner(args.keyword_rows, args.repeat)
+    return 0
+
+
+def naive_negative(products, keywords):
+    """Implementação anterior: uma busca de substring por palavra em cada título."""
+    keywords = [k.lower() for k in keywords]
+    return [p for p in products if not any(k in p.title.lower() for k in keywords)]
+
+
+def bench_keywords(rows, counts, repeat):
+    products = make_products(rows)
+    batch = ProductBatch(products)
+    print(f"\n{'palavras':>8} {'ingênuo s':>10} {'trie s':>8} {'trie colunas s':>15}")
+    for count in counts:
+        # Palavras que não aparecem nos títulos + as negativas reais
+        keywords = [f"acessorio{i}" for i in range(max(count - len(NEGATIVE), 0))] + NEGATIVE[:count]
+        negative = NegativeKeywordFilter(keywords)
+        naive_seconds, _ = timed(lambda: naive_negative(products, keywords), repeat)
+        trie_seconds, _ = timed(lambda: negative.apply(products), repeat)
+        columnar_seconds, _ = timed(lambda: negative.mask(_fresh(batch)), repeat)
+        print(f"{count:>8} {naive_seconds:>10.3f} {trie_seconds:>8.3f} {columnar_seconds:>15.3f}")
+
+
+def bench_planner(rows, repeat, page=48):
+    products = make_products(rows)
+    pages = [products[i:i + page] for i in range(0, rows, page)]
+    # Pior ordem: o filtro caro e pouco seletivo primeiro, o barato e seletivo por último
+    keywords = [f"acessorio{i}" for i in range(300)] + NEGATIVE
+    filters = [NegativeKeywordFilter(keywords), LogisticsFilter(["full"]), ConditionFilter("Usado")]
+
+    def sequential():
+        out = []
+        for chunk in pages:
+            for f in filters:
+                chunk = f.apply(chunk)
+            out.extend(chunk)
+        return out
+
+    def fused(reorder):
+        processor = DataProcessor(mode="list", reorder=reorder)
+        for f in filters:
+            processor.add_filter(f)
+        out = []
+        for chunk in pages:
+            out.extend(processor.process(chunk))
+        return out, processor
+
+    sequential_seconds, expected = timed(sequential, repeat)
+    fixed_seconds, (fixed, _) = timed(lambda: fused(False), repeat)
+    planned_seconds, (planned, processor) = timed(lambda: fused(True), repeat)
+    assert fixed == expected and planned == expected, "planos divergem"
+    print(f"\n{len(pages)} lotes de {page}: um apply por filtro {sequential_seconds:.3f}s, "
+          f"passada única {fixed_seconds:.3f}s, com reordenação {planned_seconds:.3f}s")
+    for line in processor.summary():
+        print(f"  {line}")
+
+
+def _fresh(batch):
+    """Mesmo lote sem as colunas derivadas calculadas na execução anterior."""
+    batch._derived = {}
+    return batch
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Tempo do pré-passo de hash perceptual (carregar + aHash/dHash/pHash + agrupar).
+
+    python benchmarks/bench_image_hash.py --images 500
+    python benchmarks/bench_image_hash.py --folder input
+"""
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import numpy as np
+import PIL.Image
+import PIL.ImageDraw
+from image_hash import hash_images, cluster_images, compute_hashes
+
+
+def centered_product(rng, size):
+    """Produto único centralizado em fundo branco (o caso difícil para aHash/dHash)."""
+    image = PIL.Image.new("RGB", size, (255, 255, 255))
+    draw = PIL.ImageDraw.Draw(image)
+    w, h = size
+    bw, bh = w * rng.uniform(0.2, 0.7), h * rng.uniform(0.3, 0.8)
+    box = ((w - bw) / 2, (h - bh) / 2, (w + bw) / 2, (h + bh) / 2)
+    color = tuple(int(c) for c in rng.integers(0, 200, 3))
+    shape = rng.integers(0, 3)
+    if shape == 0:
+        draw.ellipse(box, fill=color)
+    elif shape == 1:
+        draw.rounded_rectangle(box, radius=int(min(bw, bh) * 0.2), fill=color)
+    else:
+        draw.polygon([(w / 2, box[1]), (box[2], box[3]), (box[0], box[3])], fill=color)
+    return image
+
+
+def make_images(folder, count, size=(1600, 1200)):
+    """
+    Fotos sintéticas em JPEG; cada 'produto' aparece 2x (original e reduzida).
+    Metade são cenas coloridas ocupando a foto toda, metade um produto
+    centralizado em fundo branco. Retorna (paths, grupos esperados).
+    """
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(count // 2):
+        if i % 2:
+            image = centered_product(rng, size)
+        else:
+            base = (rng.random((12, 16, 3)) * 255).astype(np.uint8)
+            image = PIL.Image.fromarray(base).resize(size, PIL.Image.BILINEAR)
+        original = os.path.join(folder, f"produto_{i}.jpg")
+        image.save(original, quality=90)
+        small = os.path.join(folder, f"produto_{i}_p.jpg")
+        image.resize((size[0] // 3, size[1] // 3)).save(small, quality=60)
+        paths += [original, small]
+    return paths, count // 2
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do hash perceptual.")
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--folder", help="pasta com imagens reais (em vez das sintéticas)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        expected = None
+        if args.folder:
+            paths = [p for ext in ("*.jpg", "*.jpeg", "*.png", "*.webp")
+                     for p in glob.glob(os.path.join(args.folder, ext))]
+        else:
+            paths, expected = make_images(tmp, args.images)
+
+        start = time.perf_counter()
+        valid, _, _ = hash_images(paths)
+        load_time = time.perf_counter() - start
+
+        samples = np.random.default_rng(1).random((len(valid), 32, 32)).astype(np.float32)
+        start = time.perf_counter()
+        compute_hashes(samples)
+        hash_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        clusters = cluster_images(paths)
+        total_time = time.perf_counter() - start
+
+    print(f"{len(paths)} imagens -> {len(clusters)} grupos" + (f" (esperado: {expected})" if expected else ""))
+    print(f"carregar+hash: {load_time:.2f}s ({len(paths) / load_time:.0f} imagens/s)")
+    print(f"só os hashes (vetorizado): {hash_time * 1000:.1f} ms")
+    print(f"pré-passo completo (com agrupamento): {total_time:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Benchmark offline de ponta a ponta do CLI (equivalente ao main.main).
+
+Roda agrupamento de imagens -> pipeline (IA -> busca -> filtros -> miniaturas)
+-> relatório Excel para 10/100/1000 imagens sintéticas, com o Gemini local
+(fake_gemini) e as listagens servidas por replay. Não precisa de chave nem de rede.
+Mostra o tempo de cada etapa e a ocupação de cada estágio do pipeline.
+
+    python benchmarks/bench_offline.py
+    python benchmarks/bench_offline.py --images 10 100 --latency 0.8 --error-rate 0.05
+    python benchmarks/bench_offline.py --rpm 15   # com a cota real do plano gratuito
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import PIL.Image
+import PIL.ImageDraw
+
+
+def product_terms(products):
+    """Keywords prontas do Gemini local: 3 termos por produto."""
+    return [[f"produto teste {i}", f"produto teste {i} original", f"kit produto teste {i}"]
+            for i in range(products)]
+
+
+def make_images(directory, count, seed=42):
+    """Imagens distintas (elipses aleatórias em fundo liso), para não caírem no mesmo grupo."""
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(count):
+        image = PIL.Image.new("RGB", (256, 256), tuple(rng.randrange(256) for _ in range(3)))
+        draw = PIL.ImageDraw.Draw(image)
+        for _ in range(12):
+            x, y = rng.randrange(-40, 220), rng.randrange(-40, 220)
+            draw.ellipse((x, y, x + rng.randrange(30, 160), y + rng.randrange(30, 160)),
+                         fill=tuple(rng.randrange(256) for _ in range(3)))
+        path = os.path.join(directory, f"produto_{i:04d}.jpg")
+        image.save(path, quality=90)
+        paths.append(path)
+    return paths
+
+
+def configure_env(workdir, args):
+    """Variáveis lidas na importação dos módulos do src (antes de importá-los)."""
+    os.environ.update({
+        "ML_GEMINI_FAKE": "1",
+        "ML_FAKE_GEMINI_LATENCY": str(args.latency),
+        "ML_FAKE_GEMINI_ERROR_RATE": str(args.error_rate),
+        "ML_FAKE_GEMINI_QUOTA_ERROR_RATE": str(args.quota_error_rate),
+        "ML_FAKE_GEMINI_KEYWORDS": os.path.join(workdir, "keywords.json"),
+        "ML_REPLAY_DIR": os.path.join(workdir, "replay"),
+        "ML_GEMINI_RPM": str(args.rpm),
+        "ML_KEYWORD_CACHE_BYPASS": "1",
+        "ML_MODEL_CACHE": os.path.join(workdir, "model.json"),
+        "ML_MODEL_STATS": os.path.join(workdir, "model_stats.json"),
+        "ML_PIPELINE_LOG_INTERVAL": "0",
+    })
+    with open(os.environ["ML_FAKE_GEMINI_KEYWORDS"], "w", encoding="utf-8") as f:
+        json.dump(product_terms(args.products), f)
+
+
+def record_listings(workdir, products):
+    """Uma página de 48 cards gravada para cada termo do Gemini local."""
+    from bench_parsing import build_pages
+    from market_search import build_search_url, PAGE_SIZE
+    from replay import ReplayStore
+
+    html = build_pages()[("classic", PAGE_SIZE)]
+    store = ReplayStore(os.path.join(workdir, "replay"))
+    for terms in product_terms(products):
+        for term in terms:
+            store.save(build_search_url(term), html)
+
+
+def run_once(paths, output_dir):
+    """Uma execução completa; retorna {etapa: segundos} e o Pipeline."""
+    import analysis_ai
+    from image_hash import cluster_images
+    from main import build_processor, process_clusters
+    from report import ReportGenerator
+    from search_query import SearchRun
+
+    # Cada tamanho começa sem modelo escolhido nem histórico
+    analysis_ai._analyzer = None
+    for name in ("ML_MODEL_CACHE", "ML_MODEL_STATS"):
+        with contextlib.suppress(OSError):
+            os.remove(os.environ[name])
+
+    timings = {}
+    start = time.perf_counter()
+    clusters = cluster_images(paths)
+    timings["agrupamento"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    products, thumbnails, pipeline = process_clusters(clusters, build_processor(), SearchRun())
+    timings["pipeline"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ReportGenerator(output_dir=output_dir).generate_excel(products, thumbnails=thumbnails)
+    timings["relatorio"] = time.perf_counter() - start
+    return timings, pipeline, len(clusters), len(products)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline de ponta a ponta (Gemini local + replay).")
+    parser.add_argument("--images", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--products", type=int, default=50, help="produtos distintos nas respostas da IA")
+    parser.add_argument("--latency", type=float, default=0.5, help="latência do Gemini local (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fração de erros 500")
+    parser.add_argument("--quota-error-rate", type=float, default=0.0, help="fração de erros 429")
+    parser.add_argument("--rpm", type=int, default=100000, help="cota de requisições por minuto")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench_offline_")
+    try:
+        configure_env(workdir, args)
+        record_listings(workdir, args.products)
+        all_paths = make_images(os.path.join(workdir, "input"), max(args.images))
+
+        rows = []
+        for count in args.images:
+            # Progresso do pipeline fica fora da saída do benchmark
+            with contextlib.redirect_stdout(io.StringIO()):
+                timings, pipeline, clusters, products = run_once(all_paths[:count], os.path.join(workdir, "output"))
+            rows.append((count, clusters, products, timings, pipeline))
+
+        print(f"{'imagens':>7} {'grupos':>6} {'produtos':>8} {'agrup. s':>8} {'pipeline s':>10} "
+              f"{'relat. s':>8} {'total s':>8} {'img/s':>7}")
+        for count, clusters, products, timings, _ in rows:
+            total = sum(timings.values())
+            print(f"{count:>7} {clusters:>6} {products:>8} {timings['agrupamento']:>8.2f} "
+                  f"{timings['pipeline']:>10.2f} {timings['relatorio']:>8.2f} {total:>8.2f} {count / total:>7.1f}")
+
+        for count, _, _, _, pipeline in rows:
+            print(f"\nEstágios com {count} imagens:")
+            for line in pipeline.summary():
+                print(f"  {line}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
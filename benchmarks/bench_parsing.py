@@ -0,0 +1,150 @@
+"""
+Benchmark offline da extração de listagens (search_mercadolibre).
+
+Mede páginas/s e itens/s por backend de parser e tamanho de página, usando
+as fixtures de tests/fixtures replicadas até N cards. Com --replay DIR usa
+também as páginas gravadas com ML_RECORD_DIR. Não acessa a rede.
+
+    python benchmarks/bench_parsing.py
+    python benchmarks/bench_parsing.py --replay gravacoes/ --min-items-per-sec 500
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from market_search import parse_search_results, search_mercadolibre, build_search_url, PAGE_SIZE
+from html_parsers import PARSER_BACKENDS
+from http_client import ScrapingClient
+from replay import ReplayStore
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), '..', 'tests', 'fixtures')
+
+# Fixture -> (início de cada card, fim do container dos cards)
+LAYOUTS = {
+    "classic": ("listing_classic.html", '  <li class="ui-search-layout__item">', "</ol>"),
+    "grid": ("listing_grid.html", '  <div class="poly-card poly-card--grid-card">', "</div>\n</section>"),
+}
+# Cards por página: página pequena, página real (48) e página pesada
+CARD_COUNTS = (6, PAGE_SIZE, 4 * PAGE_SIZE)
+QUERY = "jbl flip 6"
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def scale_listing(html, card_start, container_end, cards):
+    """Repete os cards da fixture até a página ter 'cards' itens."""
+    first = html.index(card_start)
+    end = html.index(container_end, first)
+    items = [card_start + chunk for chunk in html[first:end].split(card_start) if chunk]
+    body = "".join(items[i % len(items)] for i in range(cards))
+    return html[:first] + body + html[end:]
+
+
+def build_pages():
+    """{(layout, cards): html} com as páginas sintéticas."""
+    pages = {}
+    for layout, (fixture, card_start, container_end) in LAYOUTS.items():
+        html = load_fixture(fixture)
+        for cards in CARD_COUNTS:
+            pages[(layout, cards)] = scale_listing(html, card_start, container_end, cards)
+    return pages
+
+
+def measure(fn, min_time):
+    """Roda fn até somar 'min_time' segundos; retorna (execuções, segundos, itens por execução)."""
+    runs = 0
+    items = 0
+    start = time.perf_counter()
+    while True:
+        items = len(fn())
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return runs, elapsed, items
+
+
+def bench_parsers(pages, min_time):
+    rows = []
+    for (layout, cards), html in pages.items():
+        for backend in PARSER_BACKENDS:
+            runs, elapsed, items = measure(
+                lambda: parse_search_results(html, QUERY, limit=None, backend=backend, mode="dom"), min_time
+            )
+            rows.append((f"{layout}/{cards}", backend, len(html), runs / elapsed, runs * items / elapsed))
+    return rows
+
+
+def bench_replay(pages, min_time, replay_dir=None):
+    """
+    search_mercadolibre de ponta a ponta (cliente + parsing) sobre páginas gravadas.
+    Sem 'replay_dir', grava as páginas sintéticas de 48 cards num diretório temporário.
+    """
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        if replay_dir is None:
+            store = ReplayStore(tmp)
+            queries = []
+            for (layout, cards), html in pages.items():
+                if cards == PAGE_SIZE:
+                    query = f"{QUERY} {layout}"
+                    store.save(build_search_url(query), html)
+                    queries.append(query)
+            replay_dir = tmp
+        else:
+            queries = None
+
+        client = ScrapingClient(replay_dir=replay_dir)
+        urls = client.replay.urls()
+        if queries is None:
+            # Páginas gravadas: o termo é o último segmento da URL
+            queries = [url.rstrip("/").rsplit("/", 1)[-1].split("_Desde_")[0].replace("-", " ") for url in urls]
+
+        for query in queries:
+            size = len(client.replay.load(build_search_url(query)) or "")
+            runs, elapsed, items = measure(
+                lambda: search_mercadolibre(query, limit=PAGE_SIZE, client=client, use_cache=False), min_time
+            )
+            rows.append((f"replay/{query}", "search_mercadolibre", size, runs / elapsed, runs * items / elapsed))
+    return rows
+
+
+def print_rows(rows):
+    print(f"{'página':<28} {'backend':<20} {'KB':>7} {'páginas/s':>10} {'itens/s':>10}")
+    for name, backend, size, pages_per_sec, items_per_sec in rows:
+        print(f"{name:<28} {backend:<20} {size / 1024:>7.1f} {pages_per_sec:>10.1f} {items_per_sec:>10.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline da extração de listagens.")
+    parser.add_argument("--min-time", type=float, default=0.5, help="segundos por medição")
+    parser.add_argument("--replay", help="diretório gravado com ML_RECORD_DIR")
+    parser.add_argument("--min-items-per-sec", type=float, default=0,
+                        help="falha (exit 1) se alguma medição ficar abaixo")
+    args = parser.parse_args(argv)
+
+    pages = build_pages()
+    # search_mercadolibre/parse imprimem progresso; fica fora da medição
+    with contextlib.redirect_stdout(io.StringIO()):
+        rows = bench_parsers(pages, args.min_time)
+        rows += bench_replay(pages, args.min_time, args.replay)
+
+    print_rows(rows)
+
+    slow = [row for row in rows if row[4] < args.min_items_per_sec]
+    if slow:
+        print(f"\n{len(slow)} medições abaixo de {args.min_items_per_sec:.0f} itens/s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
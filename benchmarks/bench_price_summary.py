@@ -0,0 +1,79 @@
+"""
+Benchmark do resumo de preços (price_summary): agregação por termo e por
+imagem de origem sobre listas de Products de 10 mil a 1 milhão de linhas,
+contra o equivalente em groupby do pandas (quantis + média filtrada por grupo).
+
+    python benchmarks/bench_price_summary.py
+    python benchmarks/bench_price_summary.py --rows 10000 100000 --terms 50
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import pandas as pd
+from price_summary import price_summary, PRICE_IQR_FACTOR
+from product import Product, Logistics
+
+
+def make_products(rows, terms, seed=11):
+    rng = random.Random(seed)
+    names = [f"produto teste {i}" for i in range(terms)]
+    images = [f"img_{i:03d}.jpg" for i in range(terms // 2 or 1)]
+    logistics = list(Logistics)
+    products = []
+    for _ in range(rows):
+        # ~5% de preços 0.0 (falha de parsing) e alguns preços absurdos
+        price = 0.0 if rng.random() < 0.05 else rng.lognormvariate(5, 0.5) * (20 if rng.random() < 0.01 else 1)
+        source = rng.choice(images)
+        if rng.random() < 0.2:
+            source += " | " + rng.choice(images)
+        products.append(Product(rng.choice(names), "Produto", price, logistics=rng.choice(logistics),
+                                source_image=source))
+    return products
+
+
+def pandas_summary(products):
+    """Referência: DataFrame + groupby (quantis e média sem outliers com transform)."""
+    frame = pd.DataFrame({"termo": [p.query for p in products], "preco": [p.price for p in products]})
+    valid = frame[frame["preco"] > 0]
+    grouped = valid.groupby("termo")["preco"]
+    q25, q75 = grouped.transform("quantile", 0.25), grouped.transform("quantile", 0.75)
+    spread = (q75 - q25) * PRICE_IQR_FACTOR
+    inliers = valid[(valid["preco"] >= q25 - spread) & (valid["preco"] <= q75 + spread)]
+    return pd.concat([grouped.quantile([0.25, 0.5, 0.75]).unstack(), grouped.min(),
+                      inliers.groupby("termo")["preco"].mean()], axis=1)
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resumo de preços por termo/imagem.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--terms", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'linhas':>9} {'por termo s':>12} {'por imagem s':>13} {'pandas groupby s':>17}")
+    for rows in args.rows:
+        products = make_products(rows, args.terms)
+        term_seconds = timed(lambda: price_summary(products), args.repeat)
+        image_seconds = timed(lambda: price_summary(products, by="source_image"), args.repeat)
+        pandas_seconds = timed(lambda: pandas_summary(products), args.repeat)
+        print(f"{rows:>9} {term_seconds:>12.3f} {image_seconds:>13.3f} {pandas_seconds:>17.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
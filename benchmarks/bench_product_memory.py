@@ -0,0 +1,79 @@
+"""
+Memória de N produtos: Product (slots + enums) x dicts com colunas em português.
+
+    python benchmarks/bench_product_memory.py --items 50000
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from market_search import parse_search_results
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), '..', 'tests', 'fixtures')
+FIXTURES = ("listing_classic.html", "listing_grid.html", "listing_state.html")
+
+
+def load_templates():
+    """Produtos reais extraídos das fixtures (DOM e estado JSON)."""
+    templates = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name in FIXTURES:
+            with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+                templates += parse_search_results(f.read(), "jbl flip 6", limit=None)
+    return templates
+
+
+def build(templates, items, as_dict):
+    """
+    Simula um lote: cada item com título/link próprios (como na vida real),
+    o restante vindo da página. Os dicts repetem chaves e textos por item.
+    """
+    products = []
+    for i in range(items):
+        template = templates[i % len(templates)]
+        title = f"{template.title} #{i}"
+        link = f"{template.link}?item={i}"
+        if as_dict:
+            row = template.to_row()
+            row["Título"] = title
+            row["Link"] = link
+            products.append(row)
+        else:
+            products.append(type(template)(
+                template.query, title, template.price, link, template.seller, template.logistics,
+                template.condition, template.attributes, template.sales, template.image_url, template.item_id,
+            ))
+    return products
+
+
+def measure(templates, items, as_dict):
+    tracemalloc.start()
+    start = time.perf_counter()
+    products = build(templates, items, as_dict)
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del products
+    return size, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memória de Product x dict por item.")
+    parser.add_argument("--items", type=int, default=50000)
+    args = parser.parse_args(argv)
+
+    templates = load_templates()
+    print(f"{'formato':<10} {'itens':>8} {'MB':>8} {'bytes/item':>11} {'s':>7}")
+    for label, as_dict in (("dict", True), ("Product", False)):
+        size, elapsed = measure(templates, args.items, as_dict)
+        print(f"{label:<10} {args.items:>8} {size / 1_048_576:>8.1f} {size / args.items:>11.0f} {elapsed:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
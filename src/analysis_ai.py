@@ -1,44 +1,58 @@
 
 import os
 import json
-import PIL.Image
+import hashlib
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+import httpx
 from google import genai
+from google.genai import types
 from dotenv import load_dotenv
+from keyword_cache import get_keyword_cache, hash_file, keyword_key
+from image_prep import prepare_image, read_original, prep_stats, IMAGE_PREP_ENABLED
+from rate_limit import QuotaLimiter, backoff_delay
+from model_stats import ModelStats
+import fake_gemini
 
 # Carrega variáveis de ambiente
 load_dotenv()
 
-def analyze_image(image_path, user_context=None):
-    """
-    Analisa uma imagem usando o Google Gemini (via google-genai SDK)
-    e retorna palavras-chave para busca. 
-    Aceita um contexto opcional do usuário.
-    """
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        print("Erro: GEMINI_API_KEY não encontrada no arquivo .env")
-        return []
+# Modelo escolhido fica salvo em disco por MODEL_CACHE_TTL segundos (via .env)
+MODEL_CACHE_PATH = os.getenv("ML_MODEL_CACHE", os.path.join(".cache", "gemini_model.json"))
+MODEL_CACHE_TTL = int(os.getenv("ML_MODEL_CACHE_TTL", "86400"))
 
-    try:
-        # Configuração do Client (Nova SDK)
-        client = genai.Client(api_key=api_key)
+# Análise em lote: chamadas simultâneas e tentativas em erro de cota (via .env)
+GEMINI_WORKERS = int(os.getenv("ML_GEMINI_WORKERS", "4"))
+GEMINI_MAX_ATTEMPTS = int(os.getenv("ML_GEMINI_MAX_ATTEMPTS", "5"))
 
-        # Carregar imagem com PIL
-        try:
-            image = PIL.Image.open(image_path)
-        except Exception as e:
-            print(f"Erro ao abrir imagem com PIL: {e}")
-            return []
-        
-        # Montar contexto extra se houver
-        context_str = ""
-        if user_context:
-            context_str = f"CONTEXTO ADICIONAL FORNECIDO PELO USUÁRIO (Use-o para refinar a busca): {user_context}"
-
-        # Prompt otimizado para extração de keywords
-        prompt = f"""
+# Status da API que indicam cota/sobrecarga (esperar e tentar de novo, sem trocar de modelo)
+RETRYABLE_CODES = (429, 503)
+RETRYABLE_STATUS = ("RESOURCE_EXHAUSTED", "UNAVAILABLE")
+# Falhas temporárias do servidor/rede: nova tentativa no mesmo modelo, sem cooldown
+TRANSIENT_CODES = (500, 502, 504)
+TRANSIENT_STATUS = ("INTERNAL", "DEADLINE_EXCEEDED")
+# Modelo inexistente ou sem permissão: só estes põem o modelo em cooldown
+MODEL_ERROR_CODES = (403, 404)
+MODEL_ERROR_STATUS = ("NOT_FOUND", "PERMISSION_DENIED")
+_LEADING_CODE = re.compile(r"^\s*(\d{3})\b")
+_RETRY_DELAY = re.compile(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s")
+
+# Fallback hardcoded se a listagem falhar ou não retornar nada útil
+FALLBACK_MODELS = ["gemini-1.5-flash", "gemini-2.0-flash-exp", "gemini-pro-vision"]
+
+
+def build_prompt(user_context=None):
+    """Prompt otimizado para extração de keywords (com contexto opcional do usuário)."""
+    # Montar contexto extra se houver
+    context_str = ""
+    if user_context:
+        context_str = f"CONTEXTO ADICIONAL FORNECIDO PELO USUÁRIO (Use-o para refinar a busca): {user_context}"
+
+    return f"""
         Você é um especialista em e-commerce brasileiro. Analise esta imagem de produto e sugira EXATAMENTE 3 termos de busca (keywords) ALTAMENTE ESPECÍFICOS para encontrar este item exato no Mercado Livre.
-        
+
         {context_str}
 
         Regras:
@@ -46,77 +60,420 @@ def analyze_image(image_path, user_context=None):
         2. Inclua características distintivas (ex: "prova d'água", "20W", "portátil").
         3. Evite termos genéricos como "qualidade", "bom", "barato".
         4. O primeiro termo deve ser o mais específico possível (Marca + Modelo + Cor/Ref).
-        
+
         Retorne APENAS um JSON válido no formato: {{"keywords": ["termo 1", "termo 2", "termo 3"]}}
         Não use formatação Markdown (```json) ou texto extra. Apenas o JSON puro.
         """
 
-        # Descoberta dinâmica de modelos (para evitar erros de nome/versão)
-        chosen_model = None
-        
+
+# Muda sozinha quando o texto do prompt muda (invalida o cache de keywords)
+PROMPT_VERSION = hashlib.sha256(build_prompt().encode("utf-8")).hexdigest()[:12]
+
+
+def _error_code(error):
+    """Código HTTP do erro: atributo 'code' do SDK ou o número no início da mensagem ("404 ...")."""
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code
+    match = _LEADING_CODE.match(str(error))
+    return int(match.group(1)) if match else None
+
+
+def _matches(error, codes, statuses):
+    if _error_code(error) in codes:
+        return True
+    message = str(error)
+    return any(status in message for status in statuses)
+
+
+def is_retryable_error(error):
+    """Erro de cota (429 / RESOURCE_EXHAUSTED) ou sobrecarga (503): o modelo está certo, só precisa esperar."""
+    return _matches(error, RETRYABLE_CODES, RETRYABLE_STATUS)
+
+
+def is_transient_error(error):
+    """Erro interno do servidor (500/502/504), timeout ou falha de conexão: vale tentar de novo."""
+    if isinstance(error, (TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    return _matches(error, TRANSIENT_CODES, TRANSIENT_STATUS)
+
+
+def is_model_error(error):
+    """Erro persistente do modelo (404 / NOT_FOUND, 403 / PERMISSION_DENIED): não adianta insistir nele."""
+    return _matches(error, MODEL_ERROR_CODES, MODEL_ERROR_STATUS)
+
+
+def retry_delay_hint(error):
+    """Espera sugerida pela API ("retryDelay": "17s"), se houver."""
+    match = _RETRY_DELAY.search(str(error))
+    return float(match.group(1)) if match else None
+
+
+def estimate_tokens(prepared, prompt):
+    """
+    Estimativa de tokens de uma chamada, para o limitador de TPM:
+    imagem até 384px = 258 tokens, maior que isso = 258 por bloco de 768px;
+    texto ~4 caracteres por token, mais a resposta (curta, só o JSON).
+    """
+    width, height = prepared.size
+    if width <= 384 and height <= 384:
+        image_tokens = 258
+    else:
+        image_tokens = 258 * (-(-width // 768)) * (-(-height // 768))
+    return image_tokens + len(prompt) // 4 + 100
+
+
+def parse_keywords(response_text):
+    """Extrai a lista de keywords da resposta do modelo."""
+    # Limpeza básica de Markdown se houver
+    if "```json" in response_text:
+        response_text = response_text.replace("```json", "").replace("```", "")
+
+    data = json.loads(response_text)
+    return data.get("keywords", [])
+
+
+class GeminiAnalyzer:
+    """
+    Analisador de imagens de vida longa: mantém um único genai.Client e
+    descobre o modelo que funciona uma vez só. A escolha fica em memória e
+    em disco (com TTL), então um lote de imagens — ou a próxima execução —
+    não lista modelos de novo. Só redescobre quando o modelo escolhido falha.
+    Todas as chamadas passam pelo limitador de cota (RPM/TPM); erro de cota
+    espera com backoff e tenta de novo, sem descartar o modelo.
+    Latência e falhas de cada modelo vão para ModelStats: a descoberta testa
+    primeiro os mais rápidos e pula os que falharam há pouco (cooldown).
+    Pode ser usado por várias threads ao mesmo tempo (ver analyze_images).
+    """
+    def __init__(self, api_key=None, client=None, cache_path=MODEL_CACHE_PATH, cache_ttl=MODEL_CACHE_TTL,
+                 quota=None, max_attempts=GEMINI_MAX_ATTEMPTS, model_stats=None):
+        self.client = client or genai.Client(api_key=api_key or os.getenv("GEMINI_API_KEY"))
+        self.cache_path = cache_path
+        self.cache_ttl = cache_ttl
+        self.quota = quota or QuotaLimiter()
+        self.max_attempts = max_attempts
+        self.model_stats = model_stats or ModelStats()
+        self.model = None
+        self._lock = threading.Lock()
+        self._discovery_lock = threading.Lock()
+        self.stats = {"calls": 0, "discoveries": 0, "cache_hits": 0, "model_errors": 0, "retries": 0,
+                      "skipped_models": 0}
+
+    def _load_cached_model(self):
+        """Modelo salvo em disco, se ainda dentro do TTL."""
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - cached.get("chosen_at", 0) > self.cache_ttl:
+            return None
+        model_name = cached.get("model")
+        if model_name and self.model_stats.in_cooldown(model_name):
+            # Falhou depois de ter sido salvo (ex: em outra execução)
+            return None
+        return model_name
+
+    def _save_model(self, model_name):
         try:
-            print("Buscando modelos disponíveis na conta...")
-            available_models = list(client.models.list())
-            
-            # Prioridade: Procurar por modelos "flash" (mais rápidos/baratos)
-            # Ordenar para pegar versões mais recentes ou estáveis se possível
-            # Ex: gemini-1.5-flash, gemini-2.0-flash, etc.
-            
-            flash_models = [m.name for m in available_models if "flash" in m.name.lower() and "gemini" in m.name.lower()]
-            other_gemini = [m.name for m in available_models if "gemini" in m.name.lower() and m.name not in flash_models]
-            
-            # Tentar Flash primeiro, depois outros
-            candidate_models = flash_models + other_gemini
-            
-            if not candidate_models:
-                # Fallback hardcoded se a listagem falhar ou não retornar nada útil
-                candidate_models = ["gemini-1.5-flash", "gemini-2.0-flash-exp", "gemini-pro-vision"]
-            
-            print(f"Candidatos encontrados: {candidate_models}")
-
-            response = None
-            last_error = None
-
-            for model_name in candidate_models:
-                # Pular modelos de audio-only se houver (o nome geralmente indica)
-                if "audio" in model_name.lower() and "speech" not in model_name.lower(): 
-                   # Alguns modelos 2.5 flash native audio podem não aceitar texto/imagem genérico, mas vamos tentar se for o único
-                   pass
-
-                print(f"Tentando usar modelo: {model_name}...")
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump({"model": model_name, "chosen_at": time.time()}, f)
+        except OSError as e:
+            print(f"Aviso: não foi possível salvar o modelo escolhido: {e}")
+
+    def _current_model(self):
+        with self._lock:
+            if self.model is None:
+                self.model = self._load_cached_model()
+                if self.model is not None:
+                    self.stats["cache_hits"] += 1
+                    print(f"Usando modelo salvo: {self.model}")
+            return self.model
+
+    def invalidate(self, model_name):
+        """Descarta o modelo (em memória e em disco) depois de um erro."""
+        with self._lock:
+            if self.model == model_name:
+                self.model = None
                 try:
-                    response = client.models.generate_content(
-                        model=model_name, 
-                        contents=[image, prompt]
-                    )
-                    print(f"Sucesso com modelo: {model_name}")
-                    chosen_model = model_name
-                    break 
-                except Exception as e:
-                    print(f"Falha ao usar modelo {model_name}: {e}")
-                    last_error = e
-            
+                    os.remove(self.cache_path)
+                except OSError:
+                    pass
+
+    def candidate_models(self):
+        """
+        Modelos Gemini da conta, ordenados pela latência esperada medida nas
+        execuções anteriores; sem histórico, 'flash' primeiro (mais rápidos/baratos).
+        Modelos em cooldown (falharam há pouco) ficam de fora.
+        """
+        # Descoberta dinâmica de modelos (para evitar erros de nome/versão)
+        print("Buscando modelos disponíveis na conta...")
+        self._count("discoveries")
+        try:
+            available_models = [m.name for m in self.client.models.list()]
+        except Exception as e:
+            print(f"Erro ao listar modelos: {e}")
+            available_models = []
+
+        flash_models = [m for m in available_models if "flash" in m.lower() and "gemini" in m.lower()]
+        other_gemini = [m for m in available_models if "gemini" in m.lower() and m not in flash_models]
+
+        # Tentar Flash primeiro, depois outros
+        candidates = flash_models + other_gemini or list(FALLBACK_MODELS)
+        skipped = self.model_stats.skipped(candidates)
+        if skipped:
+            with self._lock:
+                self.stats["skipped_models"] += len(skipped)
+            print(f"Pulando modelos que falharam recentemente: {skipped}")
+        candidates = self.model_stats.order(candidates)
+        print(f"Candidatos encontrados: {candidates}")
+        return candidates
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _generate(self, model_name, contents, tokens=0):
+        """
+        Uma chamada real a generate_content: reserva 1 requisição e 'tokens'
+        (estimativa) na cota antes de chamar; depois acerta os tokens com o
+        consumo informado pela API (ou devolve a estimativa se a chamada falhou).
+        """
+        self.quota.acquire_blocking(tokens)
+        self._count("calls")
+        start = time.perf_counter()
+        try:
+            response = self.client.models.generate_content(model=model_name, contents=contents)
+        except Exception as e:
+            self.quota.charge_tokens(-tokens)
+            # Erro de cota não é culpa do modelo: não entra na taxa de erro.
+            # Só erro persistente (modelo inexistente/sem permissão) dá cooldown.
+            if not is_retryable_error(e):
+                self.model_stats.record_failure(model_name, e, persistent=is_model_error(e))
+            raise
+        self.model_stats.record_success(model_name, time.perf_counter() - start)
+        usage = getattr(response, "usage_metadata", None)
+        total = getattr(usage, "total_token_count", None)
+        if isinstance(total, int):
+            self.quota.charge_tokens(total - tokens)
+        return response
+
+    def _discover_and_generate(self, contents, skip=(), tokens=0):
+        """Testa os candidatos até um responder; o vencedor vira o modelo da sessão."""
+        last_error = None
+        for model_name in self.candidate_models():
+            if model_name in skip:
+                continue
+            print(f"Tentando usar modelo: {model_name}...")
+            try:
+                response = self._generate(model_name, contents, tokens)
+            except Exception as e:
+                if is_retryable_error(e):
+                    # O modelo existe, só está sem cota agora: fica escolhido e a chamada é repetida
+                    with self._lock:
+                        self.model = model_name
+                    raise
+                print(f"Falha ao usar modelo {model_name}: {e}")
+                last_error = e
+                continue
+
+            print(f"Sucesso com modelo: {model_name}")
+            with self._lock:
+                self.model = model_name
+            self._save_model(model_name)
+            return response
+
+        print(f"Todos os modelos falharam. Último erro: {last_error}")
+        return None
+
+    def generate(self, contents, tokens=0):
+        """
+        generate_content no modelo da sessão, redescobrindo se ele falhar.
+        Cada chamada real (inclusive as da descoberta) passa pela cota com 'tokens' estimados.
+        """
+        model_name = self._current_model()
+        if model_name is not None:
+            try:
+                return self._generate(model_name, contents, tokens)
+            except Exception as e:
+                # Cota ou falha temporária: o analyze() tenta de novo no mesmo modelo
+                if is_retryable_error(e) or is_transient_error(e):
+                    raise
+                print(f"Modelo {model_name} falhou ({e}); redescobrindo modelos...")
+                self._count("model_errors")
+                self.invalidate(model_name)
+                return self._discover_and_generate(contents, skip=(model_name,), tokens=tokens)
+
+        with self._discovery_lock:
+            # Só uma thread descobre; as outras reaproveitam o resultado
+            if self.model is None:
+                return self._discover_and_generate(contents, tokens=tokens)
+        return self.generate(contents, tokens)
+
+    def analyze(self, image_path, user_context=None, prepared=None):
+        """
+        Palavras-chave de busca para a imagem (lista vazia em caso de erro).
+        'prepared' é a PreparedImage já reduzida (ex: vinda do ImagePreprocessor);
+        sem ela, a imagem é preparada aqui mesmo.
+        """
+        if prepared is None:
+            try:
+                prepared = prepare_image(image_path) if IMAGE_PREP_ENABLED else read_original(image_path)
+            except Exception as e:
+                print(f"Erro ao abrir imagem com PIL: {e}")
+                return []
+            prep_stats.record_prep(prepared)
+        print(f"  > Imagem enviada: {prepared.describe()}")
+
+        # Bytes já no formato final: o SDK não recodifica a imagem
+        image = types.Part.from_bytes(data=prepared.data, mime_type=prepared.mime_type)
+        prompt = build_prompt(user_context)
+        estimated = estimate_tokens(prepared, prompt)
+
+        for attempt in range(self.max_attempts):
+            try:
+                start = time.perf_counter()
+                response = self.generate([image, prompt], estimated)
+                seconds = time.perf_counter() - start
+                prep_stats.record_api(seconds, prepared)
+                print(f"  > Resposta da IA em {seconds:.2f}s "
+                      f"({'imagem reduzida' if prepared.reduced else 'arquivo original'})")
+            except Exception as e:
+                quota_error = is_retryable_error(e)
+                if (quota_error or is_transient_error(e)) and attempt < self.max_attempts - 1:
+                    delay = backoff_delay(attempt, retry_delay_hint(e))
+                    reason = "Cota da IA atingida" if quota_error else "Falha temporária da IA"
+                    print(f"{reason}; nova tentativa em {delay:.1f}s ({e})")
+                    self._count("retries")
+                    time.sleep(delay)
+                    continue
+                print(f"Erro ao analisar imagem com Gemini: {e}")
+                return []
+
             if not response:
-                print(f"Todos os modelos falharam. Último erro: {last_error}")
                 return []
 
-        except Exception as e:
-            print(f"Erro na descoberta/uso de modelos: {e}")
+            # Processamento da resposta
+            try:
+                return parse_keywords(response.text)
+            except Exception as e:
+                print(f"Erro ao analisar imagem com Gemini: {e}")
+                return []
+        return []
+
+
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+
+def get_analyzer():
+    """
+    Analisador do processo (None se GEMINI_API_KEY não estiver configurada).
+    Com ML_GEMINI_FAKE=1 usa o Gemini local de fake_gemini (sem chave nem rede).
+    """
+    global _analyzer
+    if fake_gemini.GEMINI_FAKE:
+        with _analyzer_lock:
+            if _analyzer is None:
+                _analyzer = GeminiAnalyzer(client=fake_gemini.FakeGeminiClient.from_env())
+            return _analyzer
+
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        return None
+    with _analyzer_lock:
+        if _analyzer is None:
+            _analyzer = GeminiAnalyzer(api_key=api_key)
+        return _analyzer
+
+
+def has_cached_keywords(image_path, user_context=None):
+    """
+    True se as keywords da imagem já estão no cache (sem contar hit/miss).
+    Usado para não preparar imagens que não vão ser enviadas à IA.
+    """
+    cache = get_keyword_cache()
+    if cache is None:
+        return False
+    try:
+        return cache.contains(keyword_key(hash_file(image_path), user_context, PROMPT_VERSION))
+    except OSError:
+        return False
+
+
+def analyze_image(image_path, user_context=None, use_cache=True, prepared=None):
+    """
+    Analisa uma imagem usando o Google Gemini (via google-genai SDK)
+    e retorna palavras-chave para busca.
+    Aceita um contexto opcional do usuário.
+    A mesma imagem (mesmos bytes) com o mesmo contexto e versão do prompt
+    sai do cache de keywords, sem chamar a API.
+    'prepared': PreparedImage (ou Future do ImagePreprocessor) da imagem já reduzida.
+    """
+    cache = get_keyword_cache() if use_cache else None
+    key = None
+    if cache is not None:
+        try:
+            key = keyword_key(hash_file(image_path), user_context, PROMPT_VERSION)
+        except OSError as e:
+            print(f"Erro ao ler imagem: {e}")
             return []
+        keywords = cache.get(key)
+        if keywords is not None:
+            print("Keywords reaproveitadas do cache.")
+            return keywords
 
-        # Processamento da resposta
-        response_text = response.text
-        
-        # Limpeza básica de Markdown se houver
-        if "```json" in response_text:
-            response_text = response_text.replace("```json", "").replace("```", "")
-        
-        data = json.loads(response_text)
-        return data.get("keywords", [])
-
-    except Exception as e:
-        print(f"Erro ao analisar imagem com Gemini: {e}")
+    analyzer = get_analyzer()
+    if analyzer is None:
+        print("Erro: GEMINI_API_KEY não encontrada no arquivo .env")
         return []
 
+    if isinstance(prepared, Future):
+        try:
+            prepared = prepared.result()
+        except Exception as e:
+            print(f"Erro ao preparar imagem: {e}")
+            return []
+
+    keywords = analyzer.analyze(image_path, user_context, prepared)
+    # Falhas (lista vazia) não são guardadas: a próxima execução tenta de novo
+    if keywords and key is not None:
+        cache.put(key, keywords)
+    return keywords
+
+def analyze_images(paths, contexts=None, max_workers=GEMINI_WORKERS, use_cache=True, prepared=None):
+    """
+    Analisa várias imagens em paralelo (no máximo 'max_workers' chamadas ao
+    mesmo tempo, dentro da cota RPM/TPM) e entrega (caminho, keywords) na
+    ordem em que ficam prontas, para a busca começar sem esperar o lote
+    (é a entrada do pipeline do main). Imagem com erro vem com lista vazia.
+    contexts: None, um texto para todas ou uma lista alinhada com 'paths'.
+    prepared: {caminho: PreparedImage ou Future} já reduzidas (opcional).
+    """
+    paths = list(paths)
+    if contexts is None or isinstance(contexts, str):
+        contexts = [contexts] * len(paths)
+    prepared = prepared or {}
+
+    executor = ThreadPoolExecutor(max_workers=max(int(max_workers), 1), thread_name_prefix="gemini")
+    try:
+        futures = {
+            executor.submit(analyze_image, path, context, use_cache, prepared.get(path)): path
+            for path, context in zip(paths, contexts)
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                keywords = future.result()
+            except Exception as e:
+                # Erro inesperado numa imagem não interrompe o lote
+                print(f"Erro ao analisar {os.path.basename(path)}: {e}")
+                keywords = []
+            yield path, keywords
+    finally:
+        # Consumidor parou antes do fim: descarta o que ainda não começou
+        executor.shutdown(wait=False, cancel_futures=True)
+
 if __name__ == "__main__":
     print("Módulo de Análise de IA (Gemini) carregado.")
@@ -2,12 +2,16 @@
 import os
 import streamlit as st
 import tempfile
-import pandas as pd
 from dotenv import load_dotenv
-from analysis_ai import analyze_image
-from market_search import search_mercadolibre
+from analysis_ai import analyze_image, get_analyzer
+from market_search import search_many, search_connection_stats
+from http_client import get_client
+from keyword_cache import get_keyword_cache
 from report import ReportGenerator
 from data_processing import DataProcessor, ConditionFilter, NegativeKeywordFilter
+from listing_index import ListingIndex
+from product import products_to_dataframe
+from price_summary import price_summary
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -40,8 +44,14 @@ def main():
     excluded_keywords = st.sidebar.text_area(
         "Palavras-chave Negativas (separadas por vírgula)", 
         "capa, capinha, película, vidro, suporte, cabo",
-        help="Produtos contendo estas palavras serão removidos dos resultados."
+        help="Produtos contendo estas palavras serão removidos dos resultados (acentos são ignorados)."
     )
+    whole_word = st.sidebar.checkbox("Somente palavras inteiras", value=False,
+                                     help="'cabo' remove 'Cabo USB', mas não 'Cabochão'.")
+
+    # Cache de páginas (buscas repetidas na última hora não vão à rede)
+    bypass_cache = st.sidebar.checkbox("Ignorar cache de buscas", value=False,
+                                       help="Força baixar as páginas do Mercado Livre de novo.")
 
     # Área principal
     uploaded_file = st.file_uploader("Envie a imagem do produto", type=['jpg', 'jpeg', 'png', 'webp'])
@@ -67,6 +77,10 @@ def main():
 
                     # 1. Análise de IA (com contexto)
                     keywords = analyze_image(tmp_path, user_context=user_description)
+                    # Sem fim de execução no Streamlit: grava o histórico dos modelos a cada análise
+                    analyzer = get_analyzer()
+                    if analyzer is not None:
+                        analyzer.model_stats.flush()
                     
                     # Remover arquivo temporário
                     os.unlink(tmp_path)
@@ -77,11 +91,17 @@ def main():
 
                     st.success(f"Palavras-chave identificadas: {', '.join(keywords)}")
 
+                    # Cache de keywords é compartilhado entre uploads (mesmo processo)
+                    keyword_cache = get_keyword_cache()
+                    if keyword_cache is not None:
+                        ks = keyword_cache.stats
+                        st.caption(f"Cache de keywords: {ks['hits']} hits / {ks['misses']} misses "
+                                   f"({keyword_cache.hit_rate():.0%} de acerto)")
+
                     # 2. Busca e Processamento
                     progress_text = "Buscando produtos no Mercado Livre..."
                     my_bar = st.progress(0, text=progress_text)
                     
-                    all_products = []
                     processor = DataProcessor()
                     
                     if condition != "Qualquer":
@@ -89,32 +109,51 @@ def main():
                     
                     if excluded_keywords:
                         neg_keywords_list = [k.strip() for k in excluded_keywords.split(',') if k.strip()]
-                        processor.add_filter(NegativeKeywordFilter(neg_keywords_list))
+                        processor.add_filter(NegativeKeywordFilter(neg_keywords_list, whole_word=whole_word))
 
-                    total_keywords = len(keywords)
-                    for i, term in enumerate(keywords):
-                        my_bar.progress((i / total_keywords), text=f"Buscando por: {term}")
-                        
-                        raw_results = search_mercadolibre(term, limit=10)
+                    # Busca todos os termos em paralelo (limite de concorrência e taxa por host)
+                    my_bar.progress(0.1, text=f"Buscando por: {', '.join(keywords)}")
+                    search_results = search_many(keywords, limit=10, use_cache=not bypass_cache)
+
+                    # Mesmo anúncio em mais de um termo vira uma linha só (com os termos unidos)
+                    listings = ListingIndex()
+                    for term, raw_results in search_results.items():
                         cleaned_results = processor.process(raw_results)
-                        
-                        # Adicionar coluna da imagem de origem
                         for item in cleaned_results:
-                            item["Imagem Origem"] = uploaded_file.name
-                            
-                        all_products.extend(cleaned_results)
+                            listings.add(item, terms=[term], sources=[uploaded_file.name])
+                    all_products = listings.products()
                     
                     my_bar.progress(1.0, text="Finalizado!")
+
+                    # Quanto cada filtro removeu (na ordem em que rodaram por último)
+                    for line in processor.summary():
+                        st.caption(f"Filtro {line}")
+                    st.caption(f"Anúncios: {listings.summary()}")
+
+                    # Clientes HTTP são compartilhados entre execuções do app (mesmo processo):
+                    # o das buscas (httpx) e o de cookies/imagens (requests)
+                    search_stats = search_connection_stats()
+                    conn_stats = get_client().connection_stats()
+                    st.caption(
+                        f"Conexões das buscas: {search_stats['connections_opened']} abertas, "
+                        f"{search_stats['connections_reused']} reaproveitadas · "
+                        f"cookies/imagens: {conn_stats['connections_opened']} abertas, "
+                        f"{conn_stats['connections_reused']} reaproveitadas"
+                    )
                     
                     # 3. Exibir Resultados e Gerar Relatório
                     if all_products:
-                        df = pd.DataFrame(all_products)
+                        df = products_to_dataframe(all_products)
                         
                         st.subheader(f"Resultados Encontrados ({len(df)})")
                         
                         # Exibição simplificada no Streamlit (escondendo colunas técnicas se quiser)
                         cols_to_show = ["Título", "Preço (R$)", "Condição", "Vendedor", "Logística"]
                         st.dataframe(df[cols_to_show], use_container_width=True)
+
+                        # Distribuição de preços por termo (mesma tabela da aba "Resumo de Preços")
+                        st.markdown("### 📊 Preços por Termo")
+                        st.dataframe(price_summary(all_products), use_container_width=True)
                         
                         # Botão de Download
                         st.markdown("### 📥 Exportar Resultados")
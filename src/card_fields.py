@@ -0,0 +1,129 @@
+import threading
+from collections import Counter, namedtuple
+
+# Um seletor de campo: (campo, variante de layout, tag, classe CSS)
+FieldSelector = namedtuple("FieldSelector", ["field", "variant", "tag", "class_"])
+
+# Tabela declarativa dos campos de um card de produto.
+# A ordem define a prioridade quando mais de um seletor casa no mesmo card.
+# Variantes: "classic" (ui-search-*) e "poly" (poly-component__*, layout novo).
+CARD_FIELD_SELECTORS = [
+    # TÍTULO
+    FieldSelector("title", "poly", "a", "poly-component__title"),
+    FieldSelector("title", "classic", "h2", "ui-search-item__title"),
+    FieldSelector("title", "classic", "a", "ui-search-item__group__element ui-search-link__title-card"),
+    # LINK (âncora do título; no clássico o h2 fica dentro do link)
+    FieldSelector("link", "poly", "a", "poly-component__title"),
+    FieldSelector("link", "classic", "a", "ui-search-item__group__element ui-search-link__title-card"),
+    FieldSelector("link", "classic", "a", "ui-search-link"),
+    # PREÇO (container; a fração é lida dentro dele)
+    FieldSelector("price", "classic", "div", "ui-search-price__second-line"),
+    FieldSelector("price", "poly", "div", "poly-price__current"),
+    # LOGÍSTICA
+    FieldSelector("full_label", "classic", "span", "ui-search-item__fulfillment-label"),
+    FieldSelector("shipping", "poly", "span", "poly-component__shipping"),
+    FieldSelector("shipping", "poly", "div", "poly-component__shipping"),
+    # CONDIÇÃO
+    FieldSelector("condition", "poly", "span", "poly-component__item-condition"),
+    # ATRIBUTOS
+    FieldSelector("attributes", "classic", "ul", "ui-search-card-attributes"),
+    FieldSelector("attributes", "poly", "ul", "poly-component__attributes-list"),
+    # IMAGEM
+    FieldSelector("image", "classic", "img", "ui-search-result-image__element"),
+    FieldSelector("image", "poly", "img", "poly-component__picture"),
+]
+
+CARD_FIELDS = tuple(dict.fromkeys(s.field for s in CARD_FIELD_SELECTORS))
+
+
+def compile_selectors(selectors):
+    """
+    Compila a tabela em um índice (tag, classe) -> [(prioridade, seletor)].
+    Seletores com várias classes usam o atributo 'class' inteiro como chave
+    (mesma semântica do BeautifulSoup para class_="a b").
+    """
+    index = {}
+    for priority, selector in enumerate(selectors):
+        key = (selector.tag, " ".join(selector.class_.split()))
+        index.setdefault(key, []).append((priority, selector))
+    return index
+
+
+_COMPILED = compile_selectors(CARD_FIELD_SELECTORS)
+
+
+def _class_tokens(element):
+    classes = element.get("class") or []
+    if isinstance(classes, str):
+        classes = classes.split()
+    return classes
+
+
+def match_card(card, compiled=_COMPILED):
+    """
+    Percorre o card UMA vez e retorna {campo: (nó, variante)} com o seletor
+    de maior prioridade que casou para cada campo.
+    """
+    best = {}
+    for element in card.find_all(True):
+        classes = _class_tokens(element)
+        if not classes:
+            continue
+        name = element.name
+        keys = [(name, c) for c in classes]
+        if len(classes) > 1:
+            keys.append((name, " ".join(classes)))
+
+        for key in keys:
+            for priority, selector in compiled.get(key, ()):
+                current = best.get(selector.field)
+                if current is None or priority < current[0]:
+                    best[selector.field] = (priority, element, selector.variant)
+
+    return {field: (element, variant) for field, (_, element, variant) in best.items()}
+
+
+class FieldStats:
+    """
+    Contadores de acerto/erro por campo e por variante de layout.
+    Ajuda a diagnosticar mudanças de layout do site sem reler o código.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.cards = 0
+            self.hits = Counter()
+            self.misses = Counter()
+
+    def record(self, matches_per_card):
+        """Acumula os resultados de uma página (lista de retornos de match_card)."""
+        hits = Counter()
+        misses = Counter()
+        for matches in matches_per_card:
+            for field in CARD_FIELDS:
+                if field in matches:
+                    hits[(field, matches[field][1])] += 1
+                else:
+                    misses[field] += 1
+
+        with self._lock:
+            self.cards += len(matches_per_card)
+            self.hits.update(hits)
+            self.misses.update(misses)
+
+    def summary(self):
+        """Uma linha por campo: 'title: poly=120 classic=3 miss=0'."""
+        with self._lock:
+            lines = []
+            for field in CARD_FIELDS:
+                variants = " ".join(
+                    f"{variant}={count}" for (f, variant), count in sorted(self.hits.items()) if f == field
+                )
+                lines.append(f"{field}: {variants or '-'} miss={self.misses[field]}")
+            return lines
+
+
+field_stats = FieldStats()
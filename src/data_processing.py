@@ -1,36 +1,149 @@
 
-from typing import List, Dict, Callable
+import os
+import threading
+import time
+from typing import List, Callable, Union
+import numpy as np
 import pandas as pd
+from product import Product, Condition, Logistics, products_to_dataframe
+from keyword_matcher import KeywordMatcher
+
+# Modo de execução dos filtros (via .env): "list" (um objeto por vez),
+# "columnar" (máscaras vetorizadas no pandas) ou "auto" (columnar a partir de N itens)
+FILTER_MODE = os.getenv("ML_FILTER_MODE", "auto")
+COLUMNAR_MIN_ROWS = int(os.getenv("ML_COLUMNAR_MIN_ROWS", "5000"))
+# Reordena os filtros pelo custo e pela seletividade observados (0 mantém a ordem de cadastro)
+FILTER_REORDER = os.getenv("ML_FILTER_REORDER", "1") == "1"
+# No modo lista, cronometra cada filtro a cada N lotes (cronometrar tudo custa caro)
+FILTER_PROFILE_EVERY = int(os.getenv("ML_FILTER_PROFILE_EVERY", "8"))
+# Peso do lote mais recente nas médias de custo e de taxa de aprovação
+FILTER_STATS_ALPHA = 0.3
+
+
+def _enum_column(values, enum) -> pd.Categorical:
+    """
+    Coluna categórica a partir dos membros do enum. Membros são únicos, então
+    os códigos saem da comparação por identidade (id), sem ler .value item a item.
+    """
+    ids = np.fromiter(map(id, values), dtype=np.int64, count=len(values))
+    codes = np.full(len(values), -1, dtype=np.int8)
+    for code, member in enumerate(enum):
+        codes[ids == id(member)] = code
+    if (codes < 0).any():
+        # Algum valor fora do enum (ex: texto cru): caminho genérico
+        return pd.Categorical([getattr(v, "value", v) for v in values])
+    return pd.Categorical.from_codes(codes, [member.value for member in enum])
+
+
+class ProductBatch:
+    """
+    Lote de produtos em colunas (pandas) para os filtros vetorizados.
+    Colunas derivadas (ex: título em minúsculas) são calculadas uma vez só
+    e compartilhadas entre os filtros; select() aplica a máscara final.
+    """
+    def __init__(self, products: List[Product]):
+        self.products = products
+        self.frame = pd.DataFrame({
+            # Dtype de texto padrão do pandas (Arrow, se instalado): lower/contains vetorizados
+            "title": pd.Series([p.title for p in products]),
+            # Poucos valores distintos: categorias (operações só nas categorias)
+            "condition": _enum_column([p.condition for p in products], Condition),
+            "logistics": _enum_column([p.logistics for p in products], Logistics),
+        })
+        self._derived = {}
+
+    def __len__(self):
+        return len(self.products)
+
+    def column(self, name) -> pd.Series:
+        return self.frame[name]
+
+    def lower(self, name) -> pd.Series:
+        """Coluna em minúsculas (cacheada)."""
+        key = ("lower", name)
+        if key not in self._derived:
+            self._derived[key] = self.frame[name].str.lower()
+        return self._derived[key]
+
+    def select(self, mask) -> List[Product]:
+        products = self.products
+        return [products[i] for i in np.flatnonzero(np.asarray(mask, dtype=bool))]
+
 
 class FilterStrategy:
     """Class base (interface implícita) para estratégias de filtro."""
-    def apply(self, data: List[Dict]) -> List[Dict]:
+    def apply(self, data: List[Product]) -> List[Product]:
         raise NotImplementedError
 
+    def predicate(self) -> Callable[[Product], bool]:
+        """
+        Teste de um item só (True = mantém), usado na passada única do DataProcessor.
+        Padrão para filtros sem versão por item: roda apply() numa lista de um item.
+        """
+        return lambda item: bool(self.apply([item]))
+
+    def describe(self) -> str:
+        """Nome do filtro nas estatísticas."""
+        return type(self).__name__
+
+    def mask(self, batch: ProductBatch) -> np.ndarray:
+        """
+        Máscara booleana (True = mantém) sobre o lote em colunas.
+        Padrão para filtros sem versão vetorizada: roda apply() nos objetos.
+        """
+        kept = {id(item) for item in self.apply(batch.products)}
+        return np.fromiter((id(item) in kept for item in batch.products), dtype=bool, count=len(batch))
+
 class ConditionFilter(FilterStrategy):
     """Filtra produtos com base na condição (ex: apenas 'Novo')."""
     def __init__(self, condition: str = "Novo"):
-        self.condition = condition.lower()
+        self.condition = Condition.parse(condition)
 
-    def apply(self, data: List[Dict]) -> List[Dict]:
-        # Normaliza a condição para comparação
+    def apply(self, data: List[Product]) -> List[Product]:
+        # Condição já vem normalizada no enum: comparação por identidade
         return [
             item for item in data 
-            if self.condition in item.get("Condição", "").lower()
+            if item.condition is self.condition
         ]
 
+    def predicate(self) -> Callable[[Product], bool]:
+        condition = self.condition
+        return lambda item: item.condition is condition
+
+    def mask(self, batch: ProductBatch) -> np.ndarray:
+        return (batch.column("condition") == self.condition.value).to_numpy()
+
+    def describe(self) -> str:
+        return f"Condição = {self.condition.value}"
+
 class NegativeKeywordFilter(FilterStrategy):
-    """Remove produtos que contenham palavras indesejadas no título."""
-    def __init__(self, keywords: List[str]):
-        self.keywords = [k.lower() for k in keywords]
-
-    def apply(self, data: List[Dict]) -> List[Dict]:
-        filtered_data = []
-        for item in data:
-            title = item.get("Título", "").lower()
-            if not any(k in title for k in self.keywords):
-                filtered_data.append(item)
-        return filtered_data
+    """
+    Remove produtos que contenham palavras indesejadas no título.
+    Acentos e maiúsculas são ignorados ("pelicula" remove "Película");
+    whole_word=True só remove palavras inteiras ("cabo" não remove "Cabochão").
+    """
+    def __init__(self, keywords: List[str], whole_word: bool = False):
+        # Lista compilada uma vez numa regex-trie: custo por título não cresce com a lista
+        self.matcher = KeywordMatcher(keywords, whole_word)
+        self.keywords = self.matcher.keywords
+
+    def apply(self, data: List[Product]) -> List[Product]:
+        if not self.matcher:
+            return list(data)
+        search = self.matcher.search
+        return [item for item in data if search(item.title) is None]
+
+    def predicate(self) -> Callable[[Product], bool]:
+        search = self.matcher.search
+        return lambda item: search(item.title) is None
+
+    def mask(self, batch: ProductBatch) -> np.ndarray:
+        if not self.matcher:
+            return np.ones(len(batch), dtype=bool)
+        return ~self.matcher.contains(batch.lower("title")).to_numpy(dtype=bool)
+
+    def describe(self) -> str:
+        return f"Palavras negativas ({len(self.keywords)})"
 
 class LogisticsFilter(FilterStrategy):
     """Filtra produtos por tipo de logística (Ex: 'Full', 'Flex', 'Normal')."""
@@ -38,48 +151,243 @@ class LogisticsFilter(FilterStrategy):
         # Normaliza para lowercase
         self.target_types = [t.lower() for t in logistics_types]
 
-    def apply(self, data: List[Dict]) -> List[Dict]:
+    def apply(self, data: List[Product]) -> List[Product]:
         if not self.target_types:
             return data
             
         return [
             item for item in data 
-            if item.get("Logística", "").lower() in self.target_types
+            if item.logistics.value.lower() in self.target_types
         ]
 
+    def predicate(self) -> Callable[[Product], bool]:
+        if not self.target_types:
+            return lambda item: True
+        # Membros aceitos resolvidos uma vez: por item só a identidade do enum
+        allowed = frozenset(id(m) for m in Logistics if m.value.lower() in self.target_types)
+        return lambda item: id(item.logistics) in allowed
+
+    def mask(self, batch: ProductBatch) -> np.ndarray:
+        if not self.target_types:
+            return np.ones(len(batch), dtype=bool)
+        # Coluna categórica: lower()/isin trabalham só nas categorias distintas
+        return batch.lower("logistics").isin(self.target_types).to_numpy()
+
+    def describe(self) -> str:
+        return f"Logística em {', '.join(self.target_types)}"
+
+
+class FilterStats:
+    """
+    Contagens de um filtro (itens vistos/removidos, tempo medido) e médias
+    móveis da taxa de aprovação e do custo por item, usadas para ordenar a passada.
+    """
+    __slots__ = ("name", "seen", "dropped", "seconds", "timed", "pass_rate", "cost")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.seen = 0
+        self.dropped = 0
+        self.seconds = 0.0
+        self.timed = 0
+        self.pass_rate = None
+        self.cost = None
+
+    def update(self, seen: int, dropped: int, seconds: float = None):
+        """Um lote: 'seen' itens chegaram ao filtro e 'dropped' foram removidos por ele."""
+        self.seen += seen
+        self.dropped += dropped
+        if not seen:
+            return
+        rate = 1.0 - dropped / seen
+        self.pass_rate = rate if self.pass_rate is None else _ewma(self.pass_rate, rate)
+        if seconds is not None:
+            self.seconds += seconds
+            self.timed += seen
+            cost = seconds / seen
+            self.cost = cost if self.cost is None else _ewma(self.cost, cost)
+
+    def rank(self):
+        """
+        Custo esperado por item removido (custo / fração removida): na ordem
+        crescente, os filtros baratos e seletivos rodam primeiro. None sem medição.
+        """
+        if self.pass_rate is None or self.cost is None:
+            return None
+        return self.cost / max(1.0 - self.pass_rate, 1e-3)
+
+    def to_dict(self):
+        return {"filtro": self.name, "vistos": self.seen, "removidos": self.dropped,
+                "taxa_remocao": self.dropped / self.seen if self.seen else 0.0,
+                "segundos": self.seconds,
+                "us_por_item": self.seconds / self.timed * 1e6 if self.timed else None}
+
+
+def _ewma(previous, value, alpha=FILTER_STATS_ALPHA):
+    return previous + alpha * (value - previous)
+
 class DataProcessor:
     """
     Responsável por processar e limpar os dados brutos do scraping.
     Segue o princípio Open/Closed permitindo adicionar filtros dinamicamente.
+
+    Os filtros rodam numa passada única: cada item passa pelos testes em
+    sequência e para no primeiro que o remove, sem listas intermediárias.
+    A ordem é replanejada a cada lote pelo custo e pela seletividade medidos
+    (FilterStats.rank); as contagens e tempos ficam em filter_stats()/summary().
     """
-    def __init__(self):
+    def __init__(self, mode: str = FILTER_MODE, columnar_min_rows: int = COLUMNAR_MIN_ROWS,
+                 reorder: bool = FILTER_REORDER, profile_every: int = FILTER_PROFILE_EVERY):
         self.filters: List[FilterStrategy] = []
+        self.stats: List[FilterStats] = []
+        self.mode = mode
+        self.columnar_min_rows = columnar_min_rows
+        self.reorder = reorder
+        self.profile_every = max(profile_every, 1)
+        self.batches = 0
+        # Índices dos filtros na ordem de execução atual
+        self._plan: List[int] = []
+        self._lock = threading.Lock()
 
     def add_filter(self, filter_strategy: FilterStrategy):
-        self.filters.append(filter_strategy)
+        with self._lock:
+            self.filters.append(filter_strategy)
+            self.stats.append(FilterStats(filter_strategy.describe()))
+            self._plan.append(len(self.filters) - 1)
+
+    def plan(self) -> List[FilterStrategy]:
+        """Filtros na ordem em que o próximo lote vai rodar."""
+        with self._lock:
+            return [self.filters[i] for i in self._plan]
+
+    def _replan(self):
+        """
+        Sem medição primeiro (na ordem de cadastro, para serem medidos), depois
+        pelo menor custo por item removido. Chamado com o lock.
+        """
+        if not self.reorder:
+            return
+        ranks = {i: self.stats[i].rank() for i in self._plan}
+        unmeasured = [i for i in self._plan if ranks[i] is None]
+        measured = sorted((i for i in self._plan if ranks[i] is not None), key=ranks.get)
+        self._plan = sorted(unmeasured) + measured
+
+    def _start_batch(self):
+        """Ordem para este lote e se ele deve ser cronometrado item a item."""
+        with self._lock:
+            profile = self.batches % self.profile_every == 0
+            self.batches += 1
+            return list(self._plan), profile
 
-    def process(self, raw_data: List[Dict]) -> List[Dict]:
-        if not raw_data:
+    def _finish_batch(self, plan, size, dropped, seconds):
+        with self._lock:
+            seen = size
+            for position, index in enumerate(plan):
+                self.stats[index].update(seen, dropped[position], seconds[position] if seconds else None)
+                seen -= dropped[position]
+            self._replan()
+
+    def _use_columnar(self, size: int) -> bool:
+        if self.mode == "columnar":
+            return True
+        if self.mode == "auto":
+            # Lotes pequenos (uma página) são mais rápidos sem o custo de montar o DataFrame
+            return size >= self.columnar_min_rows
+        return False
+
+    def process(self, raw_data: Union[List[Product], ProductBatch]) -> List[Product]:
+        if raw_data is None or not len(raw_data):
             return []
-        
-        processed_data = raw_data
-        for filter_strategy in self.filters:
-            processed_data = filter_strategy.apply(processed_data)
-        
-        return processed_data
+        if isinstance(raw_data, ProductBatch) or self._use_columnar(len(raw_data)):
+            return self.process_columnar(raw_data)
+        if not self.filters:
+            return list(raw_data)
+
+        plan, profile = self._start_batch()
+        predicates = [self.filters[i].predicate() for i in plan]
+        dropped = [0] * len(plan)
+        kept = []
+        if profile:
+            seconds = [0.0] * len(plan)
+            clock = time.perf_counter
+            for item in raw_data:
+                position = 0
+                for keep in predicates:
+                    start = clock()
+                    passed = keep(item)
+                    seconds[position] += clock() - start
+                    if not passed:
+                        dropped[position] += 1
+                        break
+                    position += 1
+                else:
+                    kept.append(item)
+        else:
+            seconds = None
+            for item in raw_data:
+                position = 0
+                for keep in predicates:
+                    if not keep(item):
+                        dropped[position] += 1
+                        break
+                    position += 1
+                else:
+                    kept.append(item)
+        self._finish_batch(plan, len(raw_data), dropped, seconds)
+        return kept
+
+    def process_columnar(self, raw_data: Union[List[Product], ProductBatch]) -> List[Product]:
+        """
+        Os filtros viram máscaras sobre o lote em colunas, na ordem do plano;
+        para quando nada sobra e faz uma seleção só no final.
+        """
+        batch = raw_data if isinstance(raw_data, ProductBatch) else ProductBatch(raw_data)
+        if not self.filters:
+            return list(batch.products)
+        plan, _ = self._start_batch()
+        dropped = [0] * len(plan)
+        seconds = [0.0] * len(plan)
+        keep = np.ones(len(batch), dtype=bool)
+        alive = len(batch)
+        for position, index in enumerate(plan):
+            if not alive:
+                break
+            start = time.perf_counter()
+            keep &= self.filters[index].mask(batch)
+            seconds[position] = time.perf_counter() - start
+            remaining = int(np.count_nonzero(keep))
+            dropped[position] = alive - remaining
+            alive = remaining
+        self._finish_batch(plan, len(batch), dropped, seconds)
+        return batch.select(keep)
+
+    def filter_stats(self) -> List[dict]:
+        """Contagens e tempos de cada filtro, na ordem de execução atual."""
+        with self._lock:
+            return [self.stats[i].to_dict() for i in self._plan]
+
+    def summary(self) -> List[str]:
+        """Uma linha por filtro: 'Condição = Novo: 480 vistos, 120 removidos (25%), 0.4 µs/item'."""
+        lines = []
+        for stats in self.filter_stats():
+            line = (f"{stats['filtro']}: {stats['vistos']} vistos, {stats['removidos']} removidos "
+                    f"({stats['taxa_remocao']:.0%})")
+            if stats["us_por_item"] is not None:
+                line += f", {stats['us_por_item']:.1f} µs/item"
+            lines.append(line)
+        return lines
 
     @staticmethod
-    def to_dataframe(data: List[Dict]) -> pd.DataFrame:
-        if not data:
-            return pd.DataFrame()
-        return pd.DataFrame(data)
+    def to_dataframe(data: List[Product]) -> pd.DataFrame:
+        # Colunas em português só aqui, na exportação
+        return products_to_dataframe(data)
 
 if __name__ == "__main__":
     # Teste simples
     mock_data = [
-        {"Título": "iPhone 15 Novo", "Condição": "Novo"},
-        {"Título": "iPhone 15 Usado (Quebrado)", "Condição": "Usado"},
-        {"Título": "Capa para iPhone 15", "Condição": "Novo"}
+        Product("iphone 15", "iPhone 15 Novo", condition=Condition.NOVO),
+        Product("iphone 15", "iPhone 15 Usado (Quebrado)", condition=Condition.USADO),
+        Product("iphone 15", "Capa para iPhone 15", condition=Condition.NOVO)
     ]
     
     processor = DataProcessor()
@@ -89,3 +397,4 @@ if __name__ == "__main__":
     result = processor.process(mock_data)
     print(f"Entrada: {len(mock_data)} -> Saída: {len(result)}")
     print(result)
+    print("\n".join(processor.summary()))
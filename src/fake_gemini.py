@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+# Gemini local para testes e benchmarks sem chave nem rede (via .env)
+# ML_GEMINI_FAKE=1 faz o get_analyzer usar o FakeGeminiClient
+GEMINI_FAKE = os.getenv("ML_GEMINI_FAKE", "0") == "1"
+FAKE_LATENCY = float(os.getenv("ML_FAKE_GEMINI_LATENCY", "0.5"))
+# Variação aleatória da latência (fração: 0.2 = +-20%)
+FAKE_JITTER = float(os.getenv("ML_FAKE_GEMINI_JITTER", "0.2"))
+# Fração das chamadas que falha com 500 (erro do modelo) e com 429 (cota)
+FAKE_ERROR_RATE = float(os.getenv("ML_FAKE_GEMINI_ERROR_RATE", "0"))
+FAKE_QUOTA_ERROR_RATE = float(os.getenv("ML_FAKE_GEMINI_QUOTA_ERROR_RATE", "0"))
+# JSON com uma lista de listas de keywords (opcional)
+FAKE_KEYWORDS_FILE = os.getenv("ML_FAKE_GEMINI_KEYWORDS") or None
+
+FAKE_MODELS = ["models/gemini-2.5-flash", "models/gemini-2.0-flash", "models/gemini-2.5-pro",
+               "models/text-embedding-004"]
+
+DEFAULT_KEYWORDS = [
+    ["jbl flip 6", "caixa de som jbl flip 6", "jbl flip 6 preta"],
+    ["fone bluetooth jbl tune 510bt", "jbl tune 510bt", "fone jbl sem fio"],
+    ["echo dot 5 geração", "alexa echo dot 5", "echo dot amazon"],
+    ["mouse logitech mx master 3s", "logitech mx master 3s", "mouse sem fio logitech"],
+    ["smartwatch amazfit gts 4 mini", "amazfit gts 4 mini", "relógio amazfit"],
+]
+
+
+class FakeAPIError(Exception):
+    """Mesmo formato do google.genai.errors.APIError ('code' + mensagem com status)."""
+    def __init__(self, code, message):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class FakeUsage:
+    __slots__ = ("total_token_count",)
+
+    def __init__(self, total_token_count):
+        self.total_token_count = total_token_count
+
+
+class FakeResponse:
+    __slots__ = ("text", "usage_metadata")
+
+    def __init__(self, keywords, tokens):
+        self.text = json.dumps({"keywords": keywords}, ensure_ascii=False)
+        self.usage_metadata = FakeUsage(tokens)
+
+
+class FakeModel:
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+
+def _image_digest(contents):
+    """Hash dos bytes da imagem enviada (Part.from_bytes), para respostas determinísticas."""
+    for part in contents:
+        data = getattr(getattr(part, "inline_data", None), "data", None)
+        if data:
+            return hashlib.sha256(data).digest()
+    return None
+
+
+class FakeModels:
+    """
+    Substituto de client.models: list() e generate_content() com latência
+    configurável, injeção de erros e keywords prontas. A mesma imagem sempre
+    recebe as mesmas keywords (escolhidas pelo hash dos bytes).
+    """
+    def __init__(self, keywords=None, latency=FAKE_LATENCY, jitter=FAKE_JITTER, error_rate=FAKE_ERROR_RATE,
+                 quota_error_rate=FAKE_QUOTA_ERROR_RATE, broken=(), model_latency=None, models=None, seed=None,
+                 retry_delay=1.0):
+        self.keywords = keywords or DEFAULT_KEYWORDS
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.quota_error_rate = quota_error_rate
+        # retryDelay sugerido nos erros 429
+        self.retry_delay = retry_delay
+        self.broken = set(broken)
+        self.model_latency = model_latency or {}
+        self.models = models or FAKE_MODELS
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"list": 0, "calls": 0, "errors": 0, "quota_errors": 0}
+
+    def list(self):
+        with self._lock:
+            self.stats["list"] += 1
+        return [FakeModel(name) for name in self.models]
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def generate_content(self, model, contents):
+        with self._lock:
+            self.stats["calls"] += 1
+            roll = self._random.random()
+            jitter = self._random.uniform(-self.jitter, self.jitter)
+
+        if model in self.broken or model not in self.models:
+            raise FakeAPIError(404, f"NOT_FOUND. models/{model} is not found for API version v1beta")
+        if roll < self.quota_error_rate:
+            self._count("quota_errors")
+            raise FakeAPIError(429, f"RESOURCE_EXHAUSTED. {{'retryDelay': '{self.retry_delay:g}s'}}")
+
+        time.sleep(max(self.model_latency.get(model, self.latency) * (1 + jitter), 0))
+        if roll < self.quota_error_rate + self.error_rate:
+            self._count("errors")
+            raise FakeAPIError(500, "INTERNAL. An internal error has occurred.")
+
+        digest = _image_digest(contents)
+        index = int.from_bytes(digest[:4], "big") if digest else self.stats["calls"]
+        keywords = self.keywords[index % len(self.keywords)]
+        # Consumo parecido com o real: imagem (~258 por bloco) + prompt + resposta
+        return FakeResponse(keywords, 258 + 400 + 20 * len(keywords))
+
+
+class FakeGeminiClient:
+    """Substituto de genai.Client para o GeminiAnalyzer (GeminiAnalyzer(client=...))."""
+    def __init__(self, **kwargs):
+        self.models = FakeModels(**kwargs)
+
+    @classmethod
+    def from_env(cls):
+        """Configurado pelas variáveis ML_FAKE_GEMINI_*."""
+        keywords = None
+        if FAKE_KEYWORDS_FILE:
+            with open(FAKE_KEYWORDS_FILE, "r", encoding="utf-8") as f:
+                keywords = json.load(f)
+        return cls(keywords=keywords)
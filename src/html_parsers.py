@@ -0,0 +1,134 @@
+import os
+import re
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401 (apenas verifica se o backend do BeautifulSoup está disponível)
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+# Backends disponíveis: "html.parser" (puro Python), "lxml" (BeautifulSoup + lxml)
+# e "selectolax" (lexbor, caminho rápido sem BeautifulSoup)
+PARSER_BACKENDS = ("html.parser", "lxml", "selectolax")
+DEFAULT_PARSER_BACKEND = os.getenv("ML_PARSER_BACKEND", "lxml")
+
+# Containers dos cards de produto: layout clássico (li) e layout "Poly" (grid)
+ITEM_CONTAINER = ("li", "ui-search-layout__item")
+POLY_CONTAINER = ("div", "poly-card")
+
+# Restringe o parsing do BeautifulSoup aos containers de resultado
+# (cabeçalho, filtros, scripts e rodapé nem chegam a virar árvore).
+# Regex porque, durante o parsing, 'class' ainda chega como string única ("poly-card poly-card--grid")
+RESULT_STRAINER = SoupStrainer(
+    [ITEM_CONTAINER[0], POLY_CONTAINER[0]],
+    class_=re.compile(rf"(^|\s)({ITEM_CONTAINER[1]}|{POLY_CONTAINER[1]})(\s|$)")
+)
+
+
+def resolve_backend(name=None):
+    """Valida o backend pedido, caindo para o próximo disponível se faltar a dependência."""
+    name = name or DEFAULT_PARSER_BACKEND
+    if name not in PARSER_BACKENDS:
+        raise ValueError(f"Backend de parsing desconhecido: '{name}'. Opções: {', '.join(PARSER_BACKENDS)}")
+
+    if name == "selectolax" and LexborHTMLParser is None:
+        print("    (selectolax não instalado, usando lxml)")
+        name = "lxml"
+    if name == "lxml" and not HAS_LXML:
+        print("    (lxml não instalado, usando html.parser)")
+        name = "html.parser"
+    return name
+
+
+class LexborNode:
+    """
+    Adaptador mínimo de um nó do selectolax com a mesma interface usada do
+    BeautifulSoup (find, find_all, get_text, get, []), para que a extração dos
+    campos seja a mesma em todos os backends.
+    """
+    __slots__ = ("_node",)
+
+    def __init__(self, node):
+        self._node = node
+
+    @property
+    def name(self):
+        return self._node.tag
+
+    @property
+    def parent(self):
+        parent = self._node.parent
+        return LexborNode(parent) if parent is not None else None
+
+    def _select(self, name, class_=None):
+        if name is True:
+            # find_all(True): todos os elementos descendentes, em ordem de documento
+            return [n for n in self._node.traverse(include_text=False) if n.mem_id != self._node.mem_id]
+        if not class_:
+            selector = name
+        else:
+            selector = name + "".join(f".{c}" for c in class_.split())
+
+        nodes = self._node.css(selector)
+        if class_ and " " in class_:
+            # BeautifulSoup compara o atributo 'class' inteiro quando há mais de uma classe
+            nodes = [n for n in nodes if " ".join((n.attributes.get("class") or "").split()) == class_]
+        # css() pode incluir o próprio nó; find/find_all só olham os descendentes
+        return [n for n in nodes if n.mem_id != self._node.mem_id]
+
+    def find(self, name, class_=None):
+        nodes = self._select(name, class_)
+        return LexborNode(nodes[0]) if nodes else None
+
+    def find_all(self, name, class_=None, limit=None):
+        nodes = self._select(name, class_)
+        if limit:
+            nodes = nodes[:limit]
+        return [LexborNode(n) for n in nodes]
+
+    def get_text(self):
+        return self._node.text(deep=True)
+
+    def get(self, key, default=None):
+        value = self._node.attributes.get(key)
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        value = self._node.attributes.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+
+def select_result_cards(html, limit=None, backend=None):
+    """
+    Faz o parsing do HTML de listagem e retorna os cards de produto
+    (li.ui-search-layout__item ou, no layout grid, div.poly-card).
+    """
+    backend = resolve_backend(backend)
+
+    if backend == "selectolax":
+        tree = LexborHTMLParser(html)
+        nodes = tree.css(f"{ITEM_CONTAINER[0]}.{ITEM_CONTAINER[1]}")
+        if not nodes:
+            nodes = tree.css(f"{POLY_CONTAINER[0]}.{POLY_CONTAINER[1]}")
+        if limit:
+            nodes = nodes[:limit]
+        return [LexborNode(n) for n in nodes]
+
+    soup = BeautifulSoup(html, backend, parse_only=RESULT_STRAINER)
+
+    # Tenta encontrar os cards de produtos
+    results = soup.find_all(ITEM_CONTAINER[0], class_=ITEM_CONTAINER[1], limit=limit)
+
+    # Fallback para div que agrupa items no layout novo "Poly" (grid)
+    if not results:
+        results = soup.find_all(POLY_CONTAINER[0], class_=POLY_CONTAINER[1], limit=limit)
+
+    return results
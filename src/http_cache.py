@@ -0,0 +1,160 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Configuração do cache de páginas (via .env)
+CACHE_DIR = os.getenv("ML_CACHE_DIR", os.path.join(".cache", "http"))
+CACHE_TTL = int(os.getenv("ML_CACHE_TTL", "3600"))
+CACHE_MAX_MB = int(os.getenv("ML_CACHE_MAX_MB", "200"))
+CACHE_BYPASS = os.getenv("ML_CACHE_BYPASS", "0") == "1"
+
+
+def normalize_url(url):
+    """Normaliza a URL para servir de chave (host minúsculo, query ordenada, sem fragmento)."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", query, ""))
+
+
+class CachedPage:
+    """Página lida do cache: corpo já descomprimido e validadores HTTP."""
+    __slots__ = ("body", "encoding", "etag", "last_modified", "stored_at")
+
+    def __init__(self, body, encoding, etag, last_modified, stored_at):
+        self.body = body
+        self.encoding = encoding
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+
+    @property
+    def text(self):
+        return self.body.decode(self.encoding or "utf-8", errors="replace")
+
+    def is_fresh(self, ttl):
+        return time.time() - self.stored_at < ttl
+
+    def validators(self):
+        """Headers para revalidação condicional (If-None-Match / If-Modified-Since)."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    Cache em disco das páginas de listagem.
+    Cada entrada é um arquivo gzip (metadados JSON na primeira linha + corpo),
+    com TTL, revalidação por ETag/Last-Modified e remoção LRU quando o
+    diretório passa de 'max_bytes'. O mtime do arquivo marca o último acesso.
+    """
+    def __init__(self, cache_dir=CACHE_DIR, ttl=CACHE_TTL, max_bytes=CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "stored": 0, "evicted": 0, "bypassed": 0}
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._size = sum(entry.stat().st_size for entry in os.scandir(cache_dir) if entry.name.endswith(".gz"))
+
+    def _path(self, url):
+        key = hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.gz")
+
+    def record(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def get(self, url):
+        """Retorna a CachedPage (fresca ou não) ou None se não houver entrada."""
+        path = self._path(url)
+        try:
+            with gzip.open(path, "rb") as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+
+        # Marca o acesso para o LRU
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return CachedPage(body, meta.get("encoding"), meta.get("etag"),
+                          meta.get("last_modified"), meta.get("stored_at", 0))
+
+    def put(self, url, body, encoding=None, headers=None):
+        headers = headers or {}
+        if "no-store" in (headers.get("Cache-Control") or ""):
+            return
+
+        meta = {
+            "url": normalize_url(url),
+            "encoding": encoding,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "stored_at": time.time(),
+        }
+        path = self._path(url)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+            f.write(json.dumps(meta).encode("utf-8") + b"\n")
+            f.write(body)
+
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._size += os.path.getsize(path) - old_size
+            self.stats["stored"] += 1
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def refresh(self, url):
+        """Após um 304, renova o 'stored_at' da entrada sem baixar o corpo de novo."""
+        cached = self.get(url)
+        if cached is not None:
+            self.put(url, cached.body, cached.encoding,
+                     {"ETag": cached.etag, "Last-Modified": cached.last_modified})
+
+    def _evict(self):
+        """Remove as entradas menos usadas até ficar em 90% do limite (chamar com o lock)."""
+        entries = sorted(
+            (entry for entry in os.scandir(self.cache_dir) if entry.name.endswith(".gz")),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        target = self.max_bytes * 0.9
+        for entry in entries:
+            if self._size <= target:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+            except OSError:
+                continue
+            self._size -= size
+            self.stats["evicted"] += 1
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Cache de páginas do processo (None se ML_CACHE_BYPASS=1)."""
+    global _cache
+    if CACHE_BYPASS:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
@@ -0,0 +1,425 @@
+import asyncio
+import threading
+import time
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from rate_limit import (get_rate_limiter, get_controller, backoff_delay, ThrottledError,
+                        DEFAULT_MAX_CONCURRENCY, MAX_ATTEMPTS, SUCCESS, THROTTLED, FAILED)
+from http_cache import get_cache
+from replay import get_store, ReplayAdapter, ReplayTransport, RECORD_DIR, REPLAY_DIR
+
+try:
+    import brotli  # noqa: F401 (requests/httpx só decodificam 'br' se o módulo existir)
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+BASE_URL = "https://www.mercadolivre.com.br/"
+
+# Headers de navegador real (compartilhados por todas as requisições de scraping)
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    # requests/httpx descomprimem a resposta sozinhos; 'br' só é pedido se houver suporte instalado
+    "Accept-Encoding": "gzip, deflate, br" if HAS_BROTLI else "gzip, deflate",
+    "Accept-Language": "pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7",
+    "Referer": BASE_URL,
+    "Upgrade-Insecure-Requests": "1",
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "same-origin",
+    "Connection": "keep-alive"
+}
+
+# Status que indicam que os cookies/sessão foram rejeitados pelo site
+REJECTED_STATUS = (401, 403)
+# Status de limitação/sobrecarga (recuar e tentar de novo)
+THROTTLE_STATUS = (429, 503)
+# Trechos da página de verificação anti-bot servida com status 200
+CHALLENGE_MARKERS = ("/gz/account-verification", "suspicious-traffic")
+
+# Classificação de uma resposta
+OK = "ok"
+REJECTED = "rejected"
+
+
+class TransferStats:
+    """
+    Bytes trafegados por etapa (busca, cookies, imagens...): quanto veio pela
+    rede (comprimido) e quanto isso virou depois de descomprimido.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}
+
+    def record(self, stage, wire_bytes, body_bytes):
+        with self._lock:
+            stats = self.stages.setdefault(stage, {"responses": 0, "wire_bytes": 0, "body_bytes": 0})
+            stats["responses"] += 1
+            stats["wire_bytes"] += wire_bytes
+            stats["body_bytes"] += body_bytes
+
+    def summary(self):
+        """Uma linha por etapa: 'busca: 12 respostas, 1.2 MB na rede -> 6.3 MB (81% menos)'."""
+        with self._lock:
+            lines = []
+            for stage, stats in self.stages.items():
+                saving = 1 - stats["wire_bytes"] / stats["body_bytes"] if stats["body_bytes"] else 0
+                lines.append(f"{stage}: {stats['responses']} respostas, {_format_bytes(stats['wire_bytes'])} na rede -> "
+                             f"{_format_bytes(stats['body_bytes'])} descomprimidos ({saving:.0%} menos)")
+            return lines
+
+
+def _format_bytes(size):
+    if size >= 1_048_576:
+        return f"{size / 1_048_576:.1f} MB"
+    return f"{size / 1024:.1f} KB"
+
+
+transfer_stats = TransferStats()
+
+
+def classify_response(response):
+    """OK, REJECTED (cookies/sessão) ou THROTTLED (429/503 ou página de desafio)."""
+    if response.status_code in THROTTLE_STATUS:
+        return THROTTLED
+    if response.status_code in REJECTED_STATUS:
+        return REJECTED
+    if response.status_code == 200 and any(marker in response.text for marker in CHALLENGE_MARKERS):
+        return THROTTLED
+    return OK
+
+
+class ScrapingClient:
+    """
+    Cliente HTTP compartilhado para o scraping.
+    Mantém um pool de conexões (keep-alive) e visita a home apenas uma vez
+    para obter cookies, renovando-os só quando expiram ou são rejeitados.
+    Com 'record_dir' grava as páginas de listagem baixadas; com 'replay_dir'
+    serve as páginas gravadas sem acessar a rede (testes e benchmarks).
+    """
+    def __init__(self, pool_connections=10, pool_maxsize=20, cookie_ttl=1800, timeout=15,
+                 record_dir=RECORD_DIR, replay_dir=REPLAY_DIR):
+        self.timeout = timeout
+        self.cookie_ttl = cookie_ttl
+        self.recorder = get_store(record_dir)
+        self.replay = get_store(replay_dir)
+
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+
+        if self.replay is not None:
+            self._adapter = ReplayAdapter(self.replay)
+        else:
+            self._adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+
+        self._lock = threading.Lock()
+        self._cookies_warmed_at = None
+        # Contadores têm lock próprio: get() roda dentro de warm_cookies (que segura _lock)
+        # e em várias threads ao mesmo tempo (workers do pipeline, miniaturas)
+        self._counters_lock = threading.Lock()
+        self.counters = {"requests": 0, "cookie_refreshes": 0, "rejected": 0}
+
+    def _count(self, name):
+        with self._counters_lock:
+            self.counters[name] += 1
+
+    def _cookies_expired(self):
+        if self._cookies_warmed_at is None:
+            return True
+        if time.monotonic() - self._cookies_warmed_at > self.cookie_ttl:
+            return True
+        now = time.time()
+        return any(c.expires is not None and c.expires < now for c in self.session.cookies)
+
+    def warm_cookies(self, force=False):
+        """Visita a home para pegar cookies (apenas se ainda não houver cookies válidos)."""
+        with self._lock:
+            if not force and not self._cookies_expired():
+                return
+            print("    (Visitando home page para cookies...)")
+            self.session.cookies.clear()
+            self.get(BASE_URL, stage="cookies")
+            self._cookies_warmed_at = time.monotonic()
+            self._count("cookie_refreshes")
+
+    def get(self, url, stage="outros", **kwargs):
+        """
+        GET simples pelo pool compartilhado (ex: download de imagens).
+        'stage' identifica a etapa na contagem de bytes (transfer_stats).
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        self._count("requests")
+        response = self.session.get(url, **kwargs)
+        # raw.tell() conta os bytes lidos do socket, antes da descompressão
+        transfer_stats.record(stage, response.raw.tell(), len(response.content))
+        return response
+
+    def fetch_page(self, url, headers=None):
+        """
+        Busca uma página de listagem com cookies de navegação.
+        Se o site rejeitar a sessão, renova os cookies uma vez; se limitar
+        (429/503/desafio), recua com backoff exponencial e avisa o controle
+        adaptativo do host, que reduz concorrência e taxa.
+        """
+        controller = get_controller(url)
+        refreshed = False
+
+        for attempt in range(MAX_ATTEMPTS):
+            window = controller.acquire_blocking()
+            try:
+                self.warm_cookies()
+                if self.replay is None:
+                    get_rate_limiter().acquire_blocking(url)
+                response = self.get(url, stage="busca", headers=headers)
+            except requests.RequestException:
+                controller.release(FAILED)
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+                time.sleep(backoff_delay(attempt))
+                continue
+            except BaseException:
+                controller.release()
+                raise
+
+            signal = classify_response(response)
+            if signal == REJECTED and not refreshed:
+                controller.release()
+                self._count("rejected")
+                self.warm_cookies(force=True)
+                refreshed = True
+                continue
+            if signal != OK:
+                controller.release(THROTTLED, window)
+                # Última tentativa: não espera à toa antes de desistir
+                if attempt < MAX_ATTEMPTS - 1:
+                    time.sleep(backoff_delay(attempt, response.headers.get("Retry-After")))
+                continue
+
+            controller.release(SUCCESS)
+            response.raise_for_status()
+            if self.recorder is not None and response.status_code == 200:
+                self.recorder.save(url, response.text)
+            return response
+
+        raise ThrottledError(f"Site limitando requisições após {MAX_ATTEMPTS} tentativas: {url}")
+
+    def fetch_text(self, url, use_cache=True):
+        """
+        HTML da página passando pelo cache em disco: entrada dentro do TTL não
+        toca a rede; entrada vencida é revalidada com ETag/Last-Modified (304).
+        """
+        # Em replay o cache fica de fora: as páginas gravadas são a fonte
+        cache = get_cache() if self.replay is None else None
+        if cache is None or not use_cache:
+            if cache is not None:
+                cache.record("bypassed")
+            return self.fetch_page(url).text
+
+        cached = cache.get(url)
+        if cached is not None and cached.is_fresh(cache.ttl):
+            cache.record("hits")
+            return cached.text
+
+        response = self.fetch_page(url, headers=cached.validators() if cached else None)
+        if response.status_code == 304 and cached is not None:
+            cache.record("revalidated")
+            cache.refresh(url)
+            return cached.text
+
+        cache.record("misses")
+        cache.put(url, response.content, response.encoding, response.headers)
+        return response.text
+
+    def connection_stats(self):
+        """
+        Contadores de reuso de conexão do pool.
+        'connections_opened' são handshakes TCP/TLS novos; o restante das
+        requisições reaproveitou uma conexão já aberta (keep-alive).
+        """
+        opened = 0
+        pool_requests = 0
+        pools = self._adapter.poolmanager.pools if self.replay is None else {}
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            pool_requests += pool.num_requests
+
+        with self._counters_lock:
+            counters = dict(self.counters)
+        return {
+            "requests": counters["requests"],
+            "connections_opened": opened,
+            "connections_reused": max(pool_requests - opened, 0),
+            "cookie_refreshes": counters["cookie_refreshes"],
+            "rejected": counters["rejected"],
+        }
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Retorna o cliente de scraping do processo (criado na primeira chamada)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ScrapingClient()
+        return _client
+
+
+class AsyncScrapingClient:
+    """
+    Versão assíncrona (httpx) do cliente de scraping, usada nas buscas em lote.
+    Os cookies vêm do cliente compartilhado do processo, então a home continua
+    sendo visitada só uma vez (e só se alguma página não estiver no cache).
+    Cada requisição passa pelo limitador de taxa por host e por um semáforo
+    que limita as requisições simultâneas.
+    """
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY, rate_limiter=None, sync_client=None,
+                 timeout=15, use_cache=True, transport=None):
+        self.max_concurrency = max(int(max_concurrency), 1)
+        self.use_cache = use_cache
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.sync_client = sync_client or get_client()
+        self.timeout = timeout
+        # Gravação/replay seguem a configuração do cliente síncrono
+        self.recorder = self.sync_client.recorder
+        self.replay = self.sync_client.replay
+        # Transport alternativo (testes); senão replay ou a rede
+        self.transport = transport
+        self.counters = {"requests": 0, "rejected": 0, "connections_opened": 0}
+        self._client = None
+        self._semaphore = None
+        self._cookies_ready = False
+
+    async def __aenter__(self):
+        self._client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.max_concurrency,
+                                max_keepalive_connections=self.max_concurrency),
+            transport=self.transport or (ReplayTransport(self.replay) if self.replay is not None else None),
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._client.aclose()
+        self._client = None
+
+    async def _sync_cookies(self, force=False):
+        """Cookies só são pedidos na primeira ida à rede (lote todo em cache não visita a home)."""
+        if self._cookies_ready and not force:
+            return
+        await asyncio.to_thread(self.sync_client.warm_cookies, force)
+        self._client.cookies.update(self.sync_client.session.cookies)
+        self._cookies_ready = True
+
+    async def _trace(self, event, info):
+        """Eventos do httpcore: cada conexão TCP nova é um handshake (o resto reaproveitou o pool)."""
+        if event == "connection.connect_tcp.complete":
+            self.counters["connections_opened"] += 1
+
+    async def _get(self, url, headers=None):
+        if self.replay is None:
+            await self.rate_limiter.acquire(url)
+        self.counters["requests"] += 1
+        response = await self._client.get(url, headers=headers, extensions={"trace": self._trace})
+        # num_bytes_downloaded = bytes da rede (comprimidos); content já vem descomprimido
+        transfer_stats.record("busca", response.num_bytes_downloaded, len(response.content))
+        return response
+
+    async def fetch_page(self, url, headers=None):
+        """Equivalente assíncrono de ScrapingClient.fetch_page (retentativas + controle adaptativo)."""
+        controller = get_controller(url)
+        refreshed = False
+
+        for attempt in range(MAX_ATTEMPTS):
+            error = None
+            async with self._semaphore:
+                window = await controller.acquire()
+                try:
+                    await self._sync_cookies()
+                    response = await self._get(url, headers)
+                except httpx.HTTPError as e:
+                    error = e
+                except BaseException:
+                    # Cancelamento (ex: orçamento de páginas atingido): só devolve a vaga
+                    controller.release()
+                    raise
+
+            if error is not None:
+                controller.release(FAILED)
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise error
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+
+            signal = classify_response(response)
+            if signal == REJECTED and not refreshed:
+                controller.release()
+                self.counters["rejected"] += 1
+                await self._sync_cookies(force=True)
+                refreshed = True
+                continue
+            if signal != OK:
+                controller.release(THROTTLED, window)
+                # Espera fora do semáforo para não segurar vaga de outras buscas (e não espera após a última)
+                if attempt < MAX_ATTEMPTS - 1:
+                    await asyncio.sleep(backoff_delay(attempt, response.headers.get("Retry-After")))
+                continue
+
+            controller.release(SUCCESS)
+            # httpx trata 304 como erro; aqui é a resposta esperada da revalidação
+            if response.status_code != 304:
+                response.raise_for_status()
+            if self.recorder is not None and response.status_code == 200:
+                await asyncio.to_thread(self.recorder.save, url, response.text)
+            return response
+
+        raise ThrottledError(f"Site limitando requisições após {MAX_ATTEMPTS} tentativas: {url}")
+
+    async def fetch_text(self, url, use_cache=None):
+        """
+        Equivalente assíncrono de ScrapingClient.fetch_text (cache em disco + revalidação).
+        use_cache=None segue o padrão do cliente (o mesmo cliente atende chamadas com e sem cache).
+        """
+        use_cache = self.use_cache if use_cache is None else use_cache
+        cache = get_cache() if self.replay is None else None
+        if cache is None or not use_cache:
+            if cache is not None:
+                cache.record("bypassed")
+            return (await self.fetch_page(url)).text
+
+        cached = await asyncio.to_thread(cache.get, url)
+        if cached is not None and cached.is_fresh(cache.ttl):
+            cache.record("hits")
+            return cached.text
+
+        response = await self.fetch_page(url, headers=cached.validators() if cached else None)
+        if response.status_code == 304 and cached is not None:
+            cache.record("revalidated")
+            await asyncio.to_thread(cache.refresh, url)
+            return cached.text
+
+        cache.record("misses")
+        await asyncio.to_thread(cache.put, url, response.content, response.encoding, response.headers)
+        return response.text
+
+    def connection_stats(self):
+        """Mesmos contadores de ScrapingClient.connection_stats, para o pool do httpx."""
+        opened = self.counters["connections_opened"]
+        return {
+            "requests": self.counters["requests"],
+            "connections_opened": opened,
+            "connections_reused": max(self.counters["requests"] - opened, 0),
+            "rejected": self.counters["rejected"],
+        }
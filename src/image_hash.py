@@ -0,0 +1,188 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import PIL.Image
+
+# Distância de Hamming máxima (em 64 bits) para considerar duas imagens iguais, por hash.
+# Em foto de produto centralizada em fundo branco o aHash/dHash de produtos diferentes
+# fica muito próximo (o fundo domina): por isso os limites são apertados e o pHash decide.
+HASH_THRESHOLDS = {
+    "ahash": int(os.getenv("ML_AHASH_THRESHOLD", "8")),
+    "dhash": int(os.getenv("ML_DHASH_THRESHOLD", "10")),
+    "phash": int(os.getenv("ML_PHASH_THRESHOLD", "10")),
+}
+# Quantos dos três hashes precisam concordar para agrupar duas imagens (o pHash sempre entre eles)
+MIN_VOTES = int(os.getenv("ML_HASH_MIN_VOTES", "2"))
+
+# Lado da miniatura em tons de cinza usada por todos os hashes
+SAMPLE_SIZE = 32
+
+_BIT_WEIGHTS = (1 << np.arange(63, -1, -1, dtype=np.uint64)).astype(np.uint64)
+# Popcount por byte (fallback para NumPy sem bitwise_count)
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _dct_matrix(n):
+    """Matriz da DCT-II ortonormal (n x n): coeficientes = M @ X @ M.T."""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+_DCT = _dct_matrix(SAMPLE_SIZE)
+
+
+def load_sample(path):
+    """
+    Miniatura 32x32 em tons de cinza (float32) e a área original em pixels.
+    Para JPEG, draft() decodifica já reduzido, o que é bem mais rápido.
+    """
+    with PIL.Image.open(path) as image:
+        area = image.width * image.height
+        image.draft("L", (SAMPLE_SIZE * 2, SAMPLE_SIZE * 2))
+        sample = image.convert("L").resize((SAMPLE_SIZE, SAMPLE_SIZE), PIL.Image.LANCZOS)
+        return np.asarray(sample, dtype=np.float32), area
+
+
+def _pack(bits):
+    """(N, 64) booleanos -> (N,) uint64."""
+    return (bits.astype(np.uint64) * _BIT_WEIGHTS).sum(axis=1, dtype=np.uint64)
+
+
+def _block_mean(samples, size):
+    """Reduz (N, 32, 32) para (N, size, size) pela média dos blocos."""
+    n = samples.shape[0]
+    step = SAMPLE_SIZE // size
+    return samples.reshape(n, size, step, size, step).mean(axis=(2, 4))
+
+
+def compute_hashes(samples):
+    """
+    aHash, dHash e pHash de todas as miniaturas de uma vez (vetorizado).
+    samples: array (N, 32, 32). Retorna {"ahash": (N,) uint64, ...}.
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    n = samples.shape[0]
+
+    # aHash: 8x8, bit = pixel acima da média
+    small = _block_mean(samples, 8).reshape(n, 64)
+    ahash = _pack(small > small.mean(axis=1, keepdims=True))
+
+    # dHash: 8 faixas de linhas x 9 colunas amostradas, bit = gradiente horizontal
+    columns = np.linspace(0, SAMPLE_SIZE - 1, 9).round().astype(int)
+    bands = samples.reshape(n, 8, SAMPLE_SIZE // 8, SAMPLE_SIZE).mean(axis=2)
+    grid = bands[:, :, columns]
+    dhash = _pack((grid[:, :, 1:] > grid[:, :, :-1]).reshape(n, 64))
+
+    # pHash: DCT 32x32, bloco 8x8 de baixa frequência comparado com a mediana (sem o DC)
+    coeffs = _DCT @ samples @ _DCT.T
+    low = coeffs[:, :8, :8].reshape(n, 64)
+    median = np.median(low[:, 1:], axis=1, keepdims=True)
+    phash = _pack(low > median)
+
+    return {"ahash": ahash, "dhash": dhash, "phash": phash}
+
+
+def popcount(values):
+    """Número de bits 1 de cada uint64."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    as_bytes = values.reshape(-1, 1).view(np.uint8)
+    return _POPCOUNT_TABLE[as_bytes].sum(axis=1).reshape(values.shape)
+
+
+class ImageCluster:
+    """Grupo de imagens quase iguais; 'representative' é a de maior resolução."""
+    __slots__ = ("representative", "members")
+
+    def __init__(self, representative, members):
+        self.representative = representative
+        self.members = members
+
+    def __repr__(self):
+        return f"ImageCluster({self.representative!r}, {len(self.members)} imagens)"
+
+
+def hash_images(paths, max_workers=8):
+    """
+    Carrega as miniaturas em paralelo (a decodificação libera o GIL) e calcula
+    os três hashes de uma vez. Imagens que não abrem ficam de fora.
+    Retorna (paths válidos, {hash: array}, áreas).
+    """
+    def load(path):
+        try:
+            return load_sample(path)
+        except Exception as e:
+            print(f"Erro ao ler imagem para hash ({os.path.basename(path)}): {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        loaded = list(executor.map(load, paths))
+
+    valid = [(path, result) for path, result in zip(paths, loaded) if result is not None]
+    if not valid:
+        return [], {name: np.empty(0, dtype=np.uint64) for name in HASH_THRESHOLDS}, []
+
+    samples = np.stack([result[0] for _, result in valid])
+    areas = [result[1] for _, result in valid]
+    return [path for path, _ in valid], compute_hashes(samples), areas
+
+
+def _match_representative(hashes, representatives, count, index, thresholds, min_votes):
+    """
+    Posição do representante (entre os 'count' primeiros) mais próximo pelo pHash
+    entre os que combinam com a imagem 'index', ou None. Combinar = pHash dentro
+    do limite e pelo menos 'min_votes' hashes dentro do limite.
+    """
+    votes = np.zeros(count, dtype=np.int64)
+    for name, threshold in thresholds.items():
+        distances = popcount(representatives[name][:count] ^ hashes[name][index])
+        within = distances <= threshold
+        votes += within
+        if name == "phash":
+            phash_distances, phash_within = distances, within
+    matches = np.flatnonzero(phash_within & (votes >= min_votes))
+    if not len(matches):
+        return None
+    return int(matches[np.argmin(phash_distances[matches])])
+
+
+def cluster_images(paths, thresholds=None, min_votes=MIN_VOTES):
+    """
+    Agrupa imagens quase duplicadas (recortes, redimensionamentos, recompressões).
+    As imagens são vistas da maior para a menor resolução; cada uma entra no grupo
+    cujo representante combina com ela (pHash obrigatório + 'min_votes' hashes
+    dentro do limite) ou abre um grupo novo, do qual passa a ser o representante.
+    Comparar só com o representante evita encadear A~B~C quando A e C são diferentes.
+    Imagens ilegíveis voltam como grupos de uma imagem só (o chamador decide).
+    """
+    thresholds = thresholds or HASH_THRESHOLDS
+    if "phash" not in thresholds:
+        raise ValueError("thresholds precisa incluir 'phash'")
+    valid_paths, hashes, areas = hash_images(paths)
+
+    n = len(valid_paths)
+    representatives = {name: np.empty(n, dtype=np.uint64) for name in thresholds}
+    groups = []
+    # Maior resolução primeiro (empate: ordem de entrada)
+    for index in sorted(range(n), key=lambda i: -areas[i]):
+        position = _match_representative(hashes, representatives, len(groups), index, thresholds, min_votes)
+        if position is None:
+            for name in thresholds:
+                representatives[name][len(groups)] = hashes[name][index]
+            groups.append([index])
+        else:
+            groups[position].append(index)
+
+    clusters = []
+    # Grupos e membros na ordem de entrada
+    for indexes in sorted(groups, key=min):
+        members = [valid_paths[i] for i in sorted(indexes)]
+        clusters.append(ImageCluster(valid_paths[indexes[0]], members))
+
+    hashed = set(valid_paths)
+    unreadable = [path for path in paths if path not in hashed]
+    clusters.extend(ImageCluster(path, [path]) for path in unreadable)
+    return clusters
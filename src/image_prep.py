@@ -0,0 +1,223 @@
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import PIL.Image
+import PIL.ImageOps
+
+# Pré-processamento das fotos antes de enviar à IA (via .env)
+IMAGE_MAX_EDGE = int(os.getenv("ML_IMAGE_MAX_EDGE", "1024"))
+IMAGE_FORMAT = os.getenv("ML_IMAGE_FORMAT", "JPEG").upper()
+IMAGE_QUALITY = int(os.getenv("ML_IMAGE_QUALITY", "85"))
+# 0 = envia o arquivo original (útil para comparar latência com e sem redução)
+IMAGE_PREP_ENABLED = os.getenv("ML_IMAGE_PREP", "1") == "1"
+IMAGE_PREP_WORKERS = int(os.getenv("ML_IMAGE_PREP_WORKERS", "4"))
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+
+class PreparedImage:
+    """Bytes prontos para a API, com o antes/depois do pré-processamento."""
+    __slots__ = ("path", "data", "mime_type", "original_bytes", "original_size", "size", "seconds")
+
+    def __init__(self, path, data, mime_type, original_bytes, original_size, size, seconds):
+        self.path = path
+        self.data = data
+        self.mime_type = mime_type
+        self.original_bytes = original_bytes
+        self.original_size = original_size
+        self.size = size
+        self.seconds = seconds
+
+    @property
+    def saved_bytes(self):
+        return self.original_bytes - len(self.data)
+
+    @property
+    def reduced(self):
+        """False quando o arquivo vai como está (ML_IMAGE_PREP=0 ou o preparo não compensou)."""
+        return len(self.data) < self.original_bytes
+
+    def describe(self):
+        """'4.1 MB -> 152.3 KB (4000x3000 -> 1024x768) em 0.31s'."""
+        return (f"{_format_bytes(self.original_bytes)} -> {_format_bytes(len(self.data))} "
+                f"({self.original_size[0]}x{self.original_size[1]} -> {self.size[0]}x{self.size[1]}) "
+                f"em {self.seconds:.2f}s")
+
+
+def _format_bytes(size):
+    if size >= 1_048_576:
+        return f"{size / 1_048_576:.1f} MB"
+    return f"{size / 1024:.1f} KB"
+
+
+def _to_rgb(image):
+    """JPEG não tem transparência: aplica o canal alfa sobre fundo branco."""
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = PIL.Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def prepare_image(path, max_edge=IMAGE_MAX_EDGE, fmt=IMAGE_FORMAT, quality=IMAGE_QUALITY):
+    """
+    Reduz a imagem para no máximo 'max_edge' pixels no maior lado, aplica a
+    rotação do EXIF e regrava em 'fmt' sem metadados (EXIF, ICC, XMP).
+    Se o resultado ficar maior que o original, mantém o arquivo original.
+    """
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        original = f.read()
+
+    with PIL.Image.open(io.BytesIO(original)) as image:
+        original_size = image.size
+        original_format = image.format
+        if fmt == "JPEG":
+            # Decodifica JPEG já reduzido (bem mais rápido para fotos grandes)
+            image.draft("RGB", (max_edge, max_edge))
+        image = PIL.ImageOps.exif_transpose(image)
+        image = _to_rgb(image) if fmt == "JPEG" else image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        image.thumbnail((max_edge, max_edge), PIL.Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        # Sem exif=/icc_profile=: o arquivo novo sai sem metadados
+        image.save(buffer, format=fmt, quality=quality, optimize=True)
+        data = buffer.getvalue()
+        size = image.size
+
+    mime_type = MIME_TYPES.get(fmt, "image/jpeg")
+    if len(data) >= len(original) and size == original_size and original_format in MIME_TYPES:
+        data, mime_type = original, MIME_TYPES[original_format]
+
+    return PreparedImage(path, data, mime_type, len(original), original_size, size,
+                         time.perf_counter() - start)
+
+
+def read_original(path):
+    """Arquivo sem alterações (ML_IMAGE_PREP=0)."""
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        data = f.read()
+    with PIL.Image.open(io.BytesIO(data)) as image:
+        size = image.size
+        mime_type = MIME_TYPES.get(image.format, "image/jpeg")
+    return PreparedImage(path, data, mime_type, len(data), size, size, time.perf_counter() - start)
+
+
+class PrepStats:
+    """
+    Totais do pré-processamento e da latência das chamadas à IA por imagem.
+    A latência é separada entre imagens enviadas reduzidas e enviadas como o
+    arquivo original, para mostrar quanto o preparo muda o tempo por imagem.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.images = 0
+        self.reduced = 0
+        self.skipped = 0
+        self.original_bytes = 0
+        self.prepared_bytes = 0
+        self.prep_seconds = 0.0
+        # {reduzida?: [chamadas, segundos]}
+        self.api = {True: [0, 0.0], False: [0, 0.0]}
+
+    @property
+    def api_calls(self):
+        return self.api[True][0] + self.api[False][0]
+
+    @property
+    def api_seconds(self):
+        return self.api[True][1] + self.api[False][1]
+
+    def record_prep(self, prepared):
+        with self._lock:
+            self.images += 1
+            self.reduced += prepared.reduced
+            self.original_bytes += prepared.original_bytes
+            self.prepared_bytes += len(prepared.data)
+            self.prep_seconds += prepared.seconds
+
+    def record_skip(self):
+        """Imagem não preparada porque as keywords já estavam no cache."""
+        with self._lock:
+            self.skipped += 1
+
+    def record_api(self, seconds, prepared=None):
+        """Latência de uma chamada à IA; 'prepared' diz se a imagem foi reduzida (None = reduzida)."""
+        reduced = prepared is None or prepared.reduced
+        with self._lock:
+            self.api[reduced][0] += 1
+            self.api[reduced][1] += seconds
+
+    def api_latency(self):
+        """Segundos por chamada à IA: (imagens reduzidas, arquivos originais); None sem chamadas."""
+        with self._lock:
+            return tuple(seconds / calls if calls else None for calls, seconds in (self.api[True], self.api[False]))
+
+    def summary(self):
+        with self._lock:
+            if not self.images:
+                return None
+            saved = 1 - self.prepared_bytes / self.original_bytes if self.original_bytes else 0
+            saved_per_image = (self.original_bytes - self.prepared_bytes) / self.images
+            text = (f"{self.images} imagens, {_format_bytes(self.original_bytes)} -> "
+                    f"{_format_bytes(self.prepared_bytes)} ({saved:.0%} menos, "
+                    f"{_format_bytes(saved_per_image)} por imagem), "
+                    f"preparo {self.prep_seconds / self.images:.2f}s por imagem")
+            if self.skipped:
+                text += f", {self.skipped} não preparadas (keywords no cache)"
+        reduced, original = self.api_latency()
+        if reduced is not None and original is not None:
+            # Diferença líquida por imagem: chamada mais rápida menos o custo do preparo
+            delta = reduced - original + self.prep_seconds / self.images
+            text += (f"; IA {reduced:.2f}s por imagem reduzida x {original:.2f}s com o original "
+                     f"({delta:+.2f}s por imagem com o preparo)")
+        elif reduced is not None or original is not None:
+            label = "reduzida" if reduced is not None else "original (sem preparo)"
+            text += f"; IA {reduced if reduced is not None else original:.2f}s por chamada ({label})"
+        return text
+
+
+prep_stats = PrepStats()
+
+
+class ImagePreprocessor:
+    """
+    Pool de threads que prepara as imagens antes das chamadas à API
+    (PIL libera o GIL na decodificação/codificação). submit() devolve um Future.
+    """
+    def __init__(self, max_workers=IMAGE_PREP_WORKERS, enabled=IMAGE_PREP_ENABLED):
+        self.enabled = enabled
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-prep")
+
+    def _prepare(self, path):
+        prepared = prepare_image(path) if self.enabled else read_original(path)
+        prep_stats.record_prep(prepared)
+        return prepared
+
+    def _prepare_unless(self, path, skip):
+        if skip(path):
+            prep_stats.record_skip()
+            return None
+        return self._prepare(path)
+
+    def submit(self, path, skip=None):
+        """
+        Prepara 'path' num worker. 'skip' (opcional) é chamado antes, no próprio
+        worker: se retornar True a imagem não é preparada e o Future resolve None.
+        """
+        if skip is None:
+            return self._executor.submit(self._prepare, path)
+        return self._executor.submit(self._prepare_unless, path, skip)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
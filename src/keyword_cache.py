@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Cache de palavras-chave por imagem (via .env)
+KEYWORD_CACHE_PATH = os.getenv("ML_KEYWORD_CACHE", os.path.join(".cache", "keywords.sqlite3"))
+KEYWORD_CACHE_MAX_ENTRIES = int(os.getenv("ML_KEYWORD_CACHE_MAX_ENTRIES", "20000"))
+KEYWORD_CACHE_BYPASS = os.getenv("ML_KEYWORD_CACHE_BYPASS", "0") == "1"
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """SHA-256 do conteúdo do arquivo (mesma foto com outro nome = mesmo hash)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def keyword_key(image_hash, user_context, prompt_version):
+    """Chave do cache: bytes da imagem + contexto do usuário + versão do prompt."""
+    context = (user_context or "").strip()
+    return hashlib.sha256(f"{image_hash}\0{context}\0{prompt_version}".encode("utf-8")).hexdigest()
+
+
+class KeywordCache:
+    """
+    Cache persistente (SQLite) das palavras-chave geradas pela IA.
+    Cada linha guarda o JSON das keywords e o último acesso; acima de
+    'max_entries' as entradas usadas há mais tempo são removidas.
+    """
+    def __init__(self, path=KEYWORD_CACHE_PATH, max_entries=KEYWORD_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Uma conexão compartilhada (protegida pelo lock) entre as threads do app
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS keywords ("
+                " key TEXT PRIMARY KEY, keywords TEXT NOT NULL,"
+                " created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS keywords_last_used ON keywords (last_used)")
+
+    def get(self, key):
+        """Keywords salvas para a chave, ou None."""
+        with self._lock:
+            row = self._conn.execute("SELECT keywords FROM keywords WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE keywords SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.stats["hits"] += 1
+            return json.loads(row[0])
+
+    def contains(self, key):
+        """Se a chave está salva, sem mexer nas estatísticas nem no último acesso."""
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM keywords WHERE key = ?", (key,)).fetchone() is not None
+
+    def put(self, key, keywords):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO keywords (key, keywords, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(keywords, ensure_ascii=False), now, now)
+            )
+            self.stats["stored"] += 1
+            self._evict()
+
+    def _evict(self):
+        """Mantém no máximo 'max_entries' linhas (chamar com o lock)."""
+        count = self._conn.execute("SELECT COUNT(*) FROM keywords").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM keywords WHERE key IN (SELECT key FROM keywords ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+            self.stats["evicted"] += excess
+
+    def hit_rate(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM keywords").fetchone()[0]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_keyword_cache():
+    """Cache de keywords do processo (None se ML_KEYWORD_CACHE_BYPASS=1)."""
+    global _cache
+    if KEYWORD_CACHE_BYPASS:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = KeywordCache()
+        return _cache
@@ -0,0 +1,112 @@
+import re
+import unicodedata
+from typing import Iterable, List, Optional
+import pandas as pd
+from search_query import fold_accents
+
+
+def _accent_classes():
+    """
+    Letra sem acento -> classe com as variantes acentuadas minúsculas
+    ("a" -> "[aàáâãäåāăą...]"), a partir dos blocos Latin-1 e Latin Extended.
+    Só entram letras que se decompõem em uma letra base + marcas combinantes:
+    ligaduras como "ĳ" ou "ǉ" (NFKD "ij", "lj") não viram variante de "i"/"l".
+    """
+    variants = {}
+    for code in range(0xC0, 0x250):
+        char = chr(code)
+        decomposed = unicodedata.normalize("NFKD", char)
+        base, marks = decomposed[0], decomposed[1:]
+        if not marks or not all(unicodedata.combining(mark) for mark in marks):
+            continue
+        if char == char.lower() and base.isascii() and base.isalpha():
+            variants.setdefault(base.lower(), []).append(char)
+    return {base: f"[{base}{''.join(chars)}]" for base, chars in variants.items()}
+
+
+_ACCENT_CLASSES = _accent_classes()
+# Fronteira de palavra explícita: o \w do motor do Arrow (RE2) não inclui letras acentuadas
+_NOT_WORD = "[^\\w\u00c0-\u024f]"
+
+
+def fold_keyword(keyword: str) -> str:
+    """Palavra da lista: sem acentos, minúscula e com espaços colapsados."""
+    return " ".join(fold_accents(keyword).lower().split())
+
+
+def _escape(char):
+    if char == " ":
+        # Espaço da palavra casa com qualquer sequência de espaços do título
+        return r"\s+"
+    return _ACCENT_CLASSES.get(char) or re.escape(char)
+
+
+def _trie_pattern(node) -> str:
+    """Regex de um nó da trie: prefixos comuns aparecem uma vez só."""
+    is_end = "" in node
+    branches = [_escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    if len(branches) == 1:
+        body = branches[0]
+        return f"(?:{body})?" if is_end else body
+    body = "(?:" + "|".join(branches) + ")"
+    return body + "?" if is_end else body
+
+
+def build_pattern(keywords: Iterable[str], whole_word: bool = False, capture: bool = False) -> Optional[str]:
+    """
+    Uma regex com todas as palavras, montada como trie: em cada posição do
+    texto o motor segue um único caminho de prefixos, então o custo por título
+    não cresce com o tamanho da lista. Cada letra aceita as variantes com
+    acento, então o título só precisa estar em minúsculas (sem normalizar).
+    None se não houver palavras. capture=True põe o trecho encontrado no grupo 1.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    if not trie:
+        return None
+    pattern = f"({_trie_pattern(trie)})" if capture else _trie_pattern(trie)
+    if whole_word:
+        # Palavra inteira: sem letra/dígito colado antes ou depois ("cabo" não casa com "cabochão").
+        # Sem lookbehind, que o RE2 não suporta e faria o pandas cair no 're' item a item
+        pattern = f"(?:^|{_NOT_WORD})(?:{pattern})(?:{_NOT_WORD}|$)"
+    return pattern
+
+
+class KeywordMatcher:
+    """
+    Lista de palavras compilada uma vez numa regex-trie que ignora acentos e
+    maiúsculas dos dois lados ("pelicula" casa com "Película" e vice-versa).
+    whole_word=True só casa palavras inteiras.
+    """
+    def __init__(self, keywords: Iterable[str], whole_word: bool = False):
+        self.keywords: List[str] = list(dict.fromkeys(k for k in map(fold_keyword, keywords) if k))
+        self.whole_word = whole_word
+        self.pattern = build_pattern(self.keywords, whole_word)
+        self._regex = re.compile(build_pattern(self.keywords, whole_word, capture=True)) if self.pattern else None
+
+    def __bool__(self):
+        return self._regex is not None
+
+    def search(self, text: str) -> Optional[str]:
+        """Primeiro trecho do texto (em minúsculas) que casa com alguma palavra, ou None."""
+        if self._regex is None:
+            return None
+        match = self._regex.search(text.lower())
+        return match.group(1) if match else None
+
+    def find_all(self, text: str) -> List[str]:
+        """Todas as palavras da lista presentes no texto (diagnóstico, ex: verify_filtering.py)."""
+        lowered = text.lower()
+        return [k for k in self.keywords if re.search(build_pattern([k], self.whole_word), lowered)]
+
+    def contains(self, lowered: pd.Series) -> pd.Series:
+        """Máscara vetorizada sobre uma coluna já em minúsculas (ProductBatch.lower)."""
+        if self._regex is None:
+            return pd.Series(False, index=lowered.index)
+        return lowered.str.contains(self.pattern, regex=True)
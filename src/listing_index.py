@@ -0,0 +1,107 @@
+import re
+import threading
+from dataclasses import replace
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, unquote
+
+# Parâmetros que escolhem a oferta na página de catálogo; o resto é rastreamento
+# (tracking_id, position, search_layout, c_id, sid...) e sai da URL canônica
+KEEP_PARAMS = ("pdp_filters", "wid")
+# Separador dos termos/imagens de origem quando o mesmo anúncio aparece mais de uma vez
+LIST_SEPARATOR = " | "
+
+# ID do anúncio: "item_id:MLB123" (pdp_filters) ou "wid=MLB123" (fragmento do polycard)
+_ITEM_PARAM = re.compile(r"(?:item_id[:=]|wid=)(ML[A-Z])-?(\d+)", re.IGNORECASE)
+# Página do anúncio: produto.mercadolivre.com.br/MLB-123-titulo-_JM
+_ITEM_PATH = re.compile(r"/(ML[A-Z])-(\d+)", re.IGNORECASE)
+
+
+def extract_item_id(url):
+    """
+    ID do anúncio ("MLB1234567890") a partir do link da listagem, ou None.
+    O ID de catálogo (/p/MLB123) não serve: é o mesmo para as ofertas de
+    vendedores diferentes; sem o anúncio no link, a chave fica sendo a URL canônica.
+    """
+    if not url:
+        return None
+    text = unquote(url)
+    for pattern in (_ITEM_PARAM, _ITEM_PATH):
+        match = pattern.search(text)
+        if match:
+            return match.group(1).upper() + match.group(2)
+    return None
+
+
+def canonical_url(url):
+    """Link sem rastreamento: host minúsculo, sem fragmento e só com KEEP_PARAMS na query."""
+    if not url:
+        return url
+    parts = urlsplit(url.strip())
+    if not parts.netloc:
+        return url
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k in KEEP_PARAMS],
+                      safe=":")
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ""))
+
+
+def listing_key(product):
+    """Chave do anúncio: ID (do JSON ou do link) ou a URL canônica. None se não houver link."""
+    return product.item_id or extract_item_id(product.link) or canonical_url(product.link) or None
+
+
+class ListingIndex:
+    """
+    Índice (dict) dos anúncios de uma execução, pela chave canônica.
+    O mesmo anúncio vindo de outro termo ou de outra imagem do grupo não vira
+    uma linha nova: os termos e as imagens de origem são unidos no registro
+    já existente (query/source_image separados por LIST_SEPARATOR).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records = {}
+        # Todos os registros (inclusive os sem chave), na ordem de chegada
+        self._order = []
+        self._terms = {}
+        self._sources = {}
+        self.stats = {"added": 0, "merged": 0}
+
+    def __len__(self):
+        return len(self._order)
+
+    def add(self, product, terms=(), sources=()):
+        """
+        Retorna (registro, is_new). O registro é uma cópia do produto (o mesmo
+        Product pode voltar da busca para termos equivalentes) e é atualizado
+        no lugar quando o anúncio aparece de novo. Sem chave, sempre é novo.
+        """
+        terms = list(terms) or [product.query]
+        sources = list(sources) or ([product.source_image] if product.source_image else [])
+        key = listing_key(product)
+        with self._lock:
+            record = self._records.get(key) if key is not None else None
+            is_new = record is None
+            if is_new:
+                record = replace(product, item_id=product.item_id or extract_item_id(product.link))
+                if key is not None:
+                    self._records[key] = record
+                self._order.append(record)
+                self._terms[id(record)] = record_terms = []
+                self._sources[id(record)] = record_sources = []
+                self.stats["added"] += 1
+            else:
+                record_terms = self._terms[id(record)]
+                record_sources = self._sources[id(record)]
+                self.stats["merged"] += 1
+            record_terms.extend(t for t in dict.fromkeys(terms) if t not in record_terms)
+            record_sources.extend(s for s in dict.fromkeys(sources) if s not in record_sources)
+            record.query = LIST_SEPARATOR.join(record_terms)
+            record.source_image = LIST_SEPARATOR.join(record_sources) or None
+        return record, is_new
+
+    def products(self):
+        """Registros únicos, na ordem em que apareceram pela primeira vez."""
+        with self._lock:
+            return list(self._order)
+
+    def summary(self):
+        return (f"{self.stats['added']} anúncios únicos, "
+                f"{self.stats['merged']} repetições unidas (outros termos/imagens)")
@@ -1,11 +1,21 @@
 
 import os
 import glob
-import time
+import threading
 from colorama import init, Fore, Style
-from analysis_ai import analyze_image
-from market_search import search_mercadolibre
-from report import ReportGenerator
+from analysis_ai import analyze_images, get_analyzer, has_cached_keywords
+from keyword_cache import get_keyword_cache
+from market_search import search_many, search_connection_stats, close_search_sessions
+from search_query import SearchRun
+from http_client import get_client, transfer_stats
+from http_cache import get_cache
+from rate_limit import controller_stats
+from card_fields import field_stats
+from report import ReportGenerator, fetch_thumbnail
+from image_hash import cluster_images
+from image_prep import ImagePreprocessor, prep_stats
+from pipeline import Pipeline, Stage
+from listing_index import ListingIndex
 
 from data_processing import DataProcessor, ConditionFilter, NegativeKeywordFilter, LogisticsFilter
 
@@ -14,6 +24,108 @@ init(autoreset=True)
 
 INPUT_DIR = "input"
 OUTPUT_DIR = "output"
+# Workers dos estágios de busca e de download das miniaturas (via .env)
+PIPELINE_SEARCH_WORKERS = int(os.getenv("ML_PIPELINE_SEARCH_WORKERS", "2"))
+PIPELINE_THUMBNAIL_WORKERS = int(os.getenv("ML_PIPELINE_THUMBNAIL_WORKERS", "4"))
+
+def build_processor():
+    """Processador de Dados (Filtros) usado pelo CLI."""
+    processor = DataProcessor()
+    # Exemplo: Filtrar apenas produtos novos para ter base de preço de revenda
+    processor.add_filter(ConditionFilter("Novo"))
+    # Exemplo: Remover acessórios que poluem a busca de eletrônicos
+    processor.add_filter(NegativeKeywordFilter(["capa", "capinha", "película", "vidro", "suporte", "cabo"]))
+    return processor
+
+
+def process_clusters(clusters, processor, search_run, listings=None):
+    """
+    Roda o pipeline análise de IA -> busca no ML -> filtros -> miniaturas
+    para os grupos de imagens. Retorna (produtos, miniaturas por URL, Pipeline).
+    Cada anúncio aparece uma vez só: repetições (outros termos, outras imagens)
+    são unidas no ListingIndex 'listings'.
+    Usado pelo main e pelo benchmark offline (benchmarks/bench_offline.py).
+    """
+    listings = ListingIndex() if listings is None else listings
+    # Redução/recodificação das imagens roda em paralelo, à frente das chamadas à IA;
+    # imagem com keywords no cache não vai à IA e não é preparada
+    preprocessor = ImagePreprocessor()
+    prepared_images = {cluster.representative: preprocessor.submit(cluster.representative, skip=has_cached_keywords)
+                       for cluster in clusters}
+
+    # Cada estágio tem seus workers e uma fila limitada; enquanto uma imagem é
+    # analisada, as keywords da anterior já estão sendo buscadas.
+    thumbnails = {}
+    thumbnails_lock = threading.Lock()
+
+    # A. Análise de IA em lote (representante = maior resolução), dentro da cota RPM/TPM:
+    # as imagens entram no pipeline na ordem em que a IA responde. As chamadas rodam
+    # no próprio iterador, que o Pipeline mede como a entrada "analise".
+    by_path = {cluster.representative: cluster for cluster in clusters}
+
+    def analyzed():
+        for img_path, keywords in analyze_images(list(by_path), prepared=prepared_images):
+            cluster = by_path[img_path]
+            filename = os.path.basename(img_path)
+            print(f"\n{Fore.GREEN}Processando: {filename}...")
+            duplicates = [os.path.basename(m) for m in cluster.members if m != img_path]
+            if duplicates:
+                print(f"  > Mesmo produto em: {', '.join(duplicates)}")
+
+            if not keywords:
+                print(Fore.RED + "  > Falha ao gerar palavras-chave.")
+                continue
+
+            print(f"  > Palavras-chave geradas: {Fore.YELLOW}{', '.join(keywords)}")
+            yield cluster, keywords
+
+    def search(job):
+        # B. Busca no Mercado Livre (termos em paralelo, com limite de taxa por host)
+        cluster, keywords = job
+        print(f"  > Buscando no ML por {len(keywords)} termos em paralelo...")
+        search_results = search_many(keywords, limit=10, run=search_run)
+        return [(cluster, term, raw_results) for term, raw_results in search_results.items()]
+
+    def filter_results(job):
+        # C. Filtragem e Processamento (SOLID)
+        cluster, term, raw_results = job
+        cleaned_results = processor.process(raw_results)
+
+        # Imagens de origem (todas do grupo) e termo entram no registro do anúncio;
+        # anúncio já visto só ganha o termo/imagens, sem linha nem miniatura nova
+        members = [os.path.basename(member) for member in cluster.members]
+        new_items = 0
+        for item in cleaned_results:
+            record, is_new = listings.add(item, terms=[term], sources=members)
+            if is_new:
+                new_items += 1
+                yield record
+        print(f"    ('{term}' filtrado: {len(raw_results)} -> {len(cleaned_results)} produtos relevantes, "
+              f"{new_items} novos)")
+
+    def prefetch_thumbnail(product):
+        # D. Miniatura do relatório baixada já durante as buscas (uma vez por URL)
+        url = product.image_url
+        if url:
+            with thumbnails_lock:
+                claimed = url not in thumbnails
+                if claimed:
+                    thumbnails[url] = None
+            if claimed:
+                thumbnails[url] = fetch_thumbnail(url)
+        return [product]
+
+    pipeline = Pipeline([
+        Stage("busca", search, workers=PIPELINE_SEARCH_WORKERS),
+        Stage("filtro", filter_results),
+        Stage("miniaturas", prefetch_thumbnail, workers=PIPELINE_THUMBNAIL_WORKERS),
+    ], source="analise")
+    try:
+        products = pipeline.run(analyzed())
+    finally:
+        preprocessor.shutdown()
+    return products, thumbnails, pipeline
+
 
 def main():
     print(Fore.CYAN + "=== Ferramenta de Análise de Mercado Livre ===")
@@ -21,11 +133,7 @@ def main():
     print("-" * 50)
 
     # 1. Configurar Processador de Dados (Filtros)
-    processor = DataProcessor()
-    # Exemplo: Filtrar apenas produtos novos para ter base de preço de revenda
-    processor.add_filter(ConditionFilter("Novo"))
-    # Exemplo: Remover acessórios que poluem a busca de eletrônicos
-    processor.add_filter(NegativeKeywordFilter(["capa", "capinha", "película", "vidro", "suporte", "cabo"]))
+    processor = build_processor()
 
     # 1. Verificar imagens
     image_extensions = ['*.jpg', '*.jpeg', '*.png', '*.webp']
@@ -39,45 +147,25 @@ def main():
         return
 
     print(f"Encontradas {len(image_files)} imagens para processar.")
-    
-    all_products = []
 
-    # 2. Processar cada imagem
-    for img_path in image_files:
-        filename = os.path.basename(img_path)
-        print(f"\n{Fore.GREEN}Processando: {filename}...")
-        
-        # A. Análise de IA
-        print("  > Analisando imagem com IA...")
-        keywords = analyze_image(img_path)
-        
-        if not keywords:
-            print(Fore.RED + "  > Falha ao gerar palavras-chave.")
-            continue
-            
-        print(f"  > Palavras-chave geradas: {Fore.YELLOW}{', '.join(keywords)}")
-        
-        # B. Busca no Mercado Livre e Processamento
-        for term in keywords:
-            print(f"  > Buscando no ML por: '{term}'...")
-            raw_results = search_mercadolibre(term, limit=10)
-            
-            # C. Filtragem e Processamento (SOLID)
-            cleaned_results = processor.process(raw_results)
-            print(f"    (Filtrado: {len(raw_results)} -> {len(cleaned_results)} produtos relevantes)")
-            
-            # Adicionar coluna da imagem de origem
-            for item in cleaned_results:
-                item["Imagem Origem"] = filename
-                
-            all_products.extend(cleaned_results)
-            time.sleep(0.5) 
+    # Pré-passo: agrupa fotos quase iguais (recortes, tamanhos, compressões)
+    # pelo hash perceptual; só uma por grupo vai para a IA
+    clusters = cluster_images(image_files)
+    if len(clusters) < len(image_files):
+        print(f"Imagens quase duplicadas agrupadas: {len(image_files)} imagens -> {len(clusters)} produtos distintos.")
+
+    # 2. Pipeline: análise de IA -> busca no ML -> filtros -> miniaturas do relatório.
+    # Termos repetidos entre imagens (após normalização) são buscados uma vez só
+    search_run = SearchRun()
+    listings = ListingIndex()
+    print(f"\n  > Analisando {len(clusters)} imagens com IA...")
+    all_products, thumbnails, pipeline = process_clusters(clusters, processor, search_run, listings)
             
     # 3. Gerar Relatório
     if all_products:
         print(f"\n{Fore.GREEN}Processamento concluído! Consolidando {len(all_products)} resultados...")
         generator = ReportGenerator(output_dir=OUTPUT_DIR)
-        filepath = generator.generate_excel(all_products)
+        filepath = generator.generate_excel(all_products, thumbnails=thumbnails)
         
         if filepath:
             print(f"{Fore.CYAN}Planilha salva em: {filepath}")
@@ -86,6 +174,72 @@ def main():
     else:
         print(Fore.RED + "\nNenhum produto encontrado ou erro no processamento.")
 
+    # Filas e ocupação de cada estágio (o mais ocupado é o gargalo)
+    for line in pipeline.summary():
+        print(f"{Fore.CYAN}Pipeline {line}")
+
+    # Quanto cada filtro removeu e quanto custou, na ordem final escolhida
+    for line in processor.summary():
+        print(f"{Fore.CYAN}Filtro {line}")
+
+    # 4. Estatísticas de conexão (reuso do pool HTTP): buscas (httpx) e cookies/miniaturas (requests)
+    stats = search_connection_stats()
+    print(f"\n{Fore.CYAN}Conexões das buscas: {stats['requests']} requisições, "
+          f"{stats['connections_opened']} conexões abertas, {stats['connections_reused']} reaproveitadas")
+    close_search_sessions()
+    stats = get_client().connection_stats()
+    print(f"{Fore.CYAN}Conexões de cookies/miniaturas: {stats['requests']} requisições, "
+          f"{stats['connections_opened']} conexões abertas, {stats['connections_reused']} reaproveitadas, "
+          f"{stats['cookie_refreshes']} renovações de cookies")
+
+    # Bytes na rede (comprimidos) x descomprimidos, por etapa
+    for line in transfer_stats.summary():
+        print(f"{Fore.CYAN}Tráfego {line}")
+
+    # Controle adaptativo: eventos de limitação e nível atual de concorrência por host
+    for host, cs in controller_stats().items():
+        print(f"{Fore.CYAN}{host}: concorrência {cs['concurrency']}, {cs['rate']} req/s, "
+              f"{cs['throttled']} limitações, {cs['failed']} falhas, {cs['circuit_opens']} pausas do circuito")
+
+    print(f"{Fore.CYAN}Anúncios: {listings.summary()}")
+
+    rs = search_run.stats
+    print(f"{Fore.CYAN}Buscas: {rs['requested']} pedidas, {rs['fetched']} executadas, "
+          f"{rs['reused'] + rs['coalesced']} reaproveitadas de termos equivalentes")
+
+    cache = get_cache()
+    if cache is not None:
+        cs = cache.stats
+        print(f"{Fore.CYAN}Cache de páginas: {cs['hits']} hits, {cs['revalidated']} revalidadas (304), "
+              f"{cs['misses']} baixadas, {cs['evicted']} removidas")
+
+    keyword_cache = get_keyword_cache()
+    if keyword_cache is not None:
+        ks = keyword_cache.stats
+        print(f"{Fore.CYAN}Cache de keywords: {ks['hits']} hits, {ks['misses']} misses "
+              f"({keyword_cache.hit_rate():.0%} de acerto), {len(keyword_cache)} imagens salvas")
+
+    prep_summary = prep_stats.summary()
+    if prep_summary:
+        print(f"{Fore.CYAN}Imagens para a IA: {prep_summary}")
+
+    analyzer = get_analyzer()
+    if analyzer is not None:
+        ai = analyzer.stats
+        print(f"{Fore.CYAN}IA: modelo {analyzer.model}, {ai['calls']} chamadas, "
+              f"{ai['discoveries']} descobertas de modelo, {ai['model_errors']} trocas por erro, "
+              f"{ai['retries']} novas tentativas por cota, {ai['skipped_models']} modelos pulados (cooldown)")
+        for line in analyzer.model_stats.summary():
+            print(f"  {line}")
+        # Histórico dos modelos é gravado periodicamente; aqui vai o que faltou
+        analyzer.model_stats.flush()
+
+    # 5. Diagnóstico de layout: quais seletores (clássico/poly) casaram por campo
+    if field_stats.cards:
+        print(f"{Fore.CYAN}Campos extraídos do HTML ({field_stats.cards} cards):")
+        for line in field_stats.summary():
+            print(f"  {line}")
+
 if __name__ == "__main__":
     try:
         main()
@@ -1,170 +1,403 @@
-
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import math
+import os
 import re
+import threading
+from dataclasses import replace
+from http_client import get_client, AsyncScrapingClient, DEFAULT_MAX_CONCURRENCY
+from html_parsers import select_result_cards
+from page_state import extract_state_products
+from card_fields import match_card, field_stats
+from search_query import SearchRun, normalize_query, query_slug
+from product import Product, Logistics, Condition, NO_TITLE
+from listing_index import extract_item_id, canonical_url
+
+# Itens por página de listagem (o offset da URL anda de PAGE_SIZE em PAGE_SIZE)
+PAGE_SIZE = 48
+# Orçamento padrão de páginas por termo na busca paginada
+MAX_PAGES = 10
+# Modo de extração: "json" (estado embutido na página, com fallback para o DOM) ou "dom"
+EXTRACTION_MODE = os.getenv("ML_EXTRACTION_MODE", "json")
 
-def search_mercadolibre(query, limit=10):
+def build_search_url(query, offset=0):
     """
-    Busca produtos no Mercado Livre via Web Scraping (HTML).
-    Contorna limitações da API pública.
+    Monta a URL de listagem para o termo de busca.
+    'offset' é a posição do primeiro item (0, PAGE_SIZE, 2*PAGE_SIZE...).
     """
-    # Formata a query para URL (ex: "caixa de som" -> "caixa-de-som")
-    formatted_query = query.replace(" ", "-")
-    url = f"https://lista.mercadolivre.com.br/{formatted_query}"
-    
-    # Headers de navegador real
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-        # "Accept-Encoding": "gzip, deflate, br", # Removido para evitar problemas de compressão não tratada
-        "Accept-Language": "pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7",
-        "Referer": "https://www.mercadolivre.com.br/",
-        "Upgrade-Insecure-Requests": "1",
-        "Sec-Fetch-Dest": "document",
-        "Sec-Fetch-Mode": "navigate",
-        "Sec-Fetch-Site": "same-origin",
-        "Connection": "keep-alive"
-    }
+    # Formata a query para URL (ex: "Caixa de Som" -> "caixa-de-som")
+    url = f"https://lista.mercadolivre.com.br/{query_slug(query)}"
+    if offset:
+        # Páginas seguintes: ..._Desde_49_NoIndex_True (posição 1-based)
+        url += f"_Desde_{offset + 1}_NoIndex_True"
+    return url
 
-    print(f"    (Scraping: {url})")
+def parse_search_results(html, query, limit=10, backend=None, mode=None):
+    """
+    Extrai os produtos do HTML de uma página de listagem.
+    Compartilhado entre a busca síncrona e a assíncrona.
+    limit=None extrai todos os cards da página.
+    backend: "html.parser", "lxml" ou "selectolax" (padrão: ML_PARSER_BACKEND).
+    mode: "json" lê o estado embutido (com ID e vendas) e só cai para o DOM
+    se ele não existir; "dom" percorre os cards direto (padrão: ML_EXTRACTION_MODE).
+    """
+    if (mode or EXTRACTION_MODE) == "json":
+        products = extract_state_products(html, query, limit)
+        if products is not None:
+            print(f"    (Items encontrados no estado JSON: {len(products)})")
+            return products
+
+    return parse_search_cards(html, query, limit, backend)
+
+def _field_node(fields, name):
+    """Nó casado para o campo no retorno de match_card (ou None)."""
+    match = fields.get(name)
+    return match[0] if match else None
+
+def parse_search_cards(html, query, limit=10, backend=None):
+    """Extração percorrendo os cards do DOM (fallback do modo JSON)."""
+    results = select_result_cards(html, limit=limit, backend=backend)
     
-    try:
-        session = requests.Session()
-        session.headers.update(headers)
+    print(f"    (Items encontrados no HTML: {len(results)})")
+
+    products = []
+    page_matches = []
+    for item in results:
+        try:
+            # Uma única varredura do card localiza todos os campos (tabela em card_fields)
+            fields = match_card(item)
+            page_matches.append(fields)
+
+            # TÍTULO & LINK
+            title_tag = _field_node(fields, "title")
+            title = title_tag.get_text().strip() if title_tag else NO_TITLE
+
+            link_tag = _field_node(fields, "link")
+            link = (link_tag.get("href") or "") if link_tag else ""
+            # ID do anúncio sai do link (path ou wid/pdp_filters) antes de tirar o rastreamento
+            item_id = extract_item_id(link)
+            link = canonical_url(link)
+            
+            # PREÇO
+            price_container = _field_node(fields, "price")
+            
+            price = 0.0
+            if price_container:
+                price_fraction = price_container.find('span', class_='andes-money-amount__fraction')
+                if price_fraction:
+                    price_text = price_fraction.get_text().strip()
+                    clean_price = price_text.replace('.', '').replace(',', '.')
+                    try:
+                        price = float(clean_price)
+                    except ValueError:
+                         price = 0.0
+
+            # LOGÍSTICA (Full, Flex, Normal)
+            # 1. Tenta identificar FULL explicitamente (Label ou Texto)
+            full_label = _field_node(fields, "full_label")
+            shipping_tag = _field_node(fields, "shipping")
+            
+            shipping_text = shipping_tag.get_text().strip().lower() if shipping_tag else ""
+            
+            is_full = bool(full_label) or "full" in shipping_text
+            
+            # 2. Tenta identificar FLEX
+            is_flex = "chegará hoje" in shipping_text or "chegará amanhã" in shipping_text or "flex" in shipping_text
+
+            # Se não for Full nem Flex, fica Normal
+            logistics = Logistics.from_flags(is_full, is_flex)
+
+            # CONDIÇÃO (Novo/Recondicionado)
+            condition_tag = _field_node(fields, "condition")
+            condition = Condition.parse(condition_tag.get_text()) if condition_tag else Condition.NOVO
+
+            # ATRIBUTOS (comum em list view, raro em grid)
+            attributes = []
+            attr_list = _field_node(fields, "attributes")
+            
+            if attr_list:
+                for li in attr_list.find_all('li'):
+                    attributes.append(li.get_text().strip())
+            
+            description = ", ".join(attributes) if attributes else ""
+
+            # IMAGEM (Extração da URL)
+            image_url = ""
+            image_tag = _field_node(fields, "image")
+            
+            if image_tag:
+                # Tenta pegar 'data-src' (lazy load) ou 'src'
+                image_url = image_tag.get('data-src') or image_tag.get('src') or ""
+
+            # Vendedor e vendas não aparecem no card (só no modo JSON)
+            products.append(Product(
+                query=query,
+                title=title,
+                price=price,
+                link=link,
+                logistics=logistics,
+                condition=condition,
+                attributes=description,
+                image_url=image_url,
+                item_id=item_id,
+            ))
         
-        # Visita a home primeiro para pegar cookies
-        print("    (Visitando home page para cookies...)")
-        session.get("https://www.mercadolivre.com.br/")
+        except Exception as e:
+            # Se falhar em um item, ignora
+            with open("scraping_errors.log", "a", encoding="utf-8") as err_file:
+                err_file.write(f"Item Error: {e}\n")
+                import traceback
+                err_file.write(traceback.format_exc() + "\n")
+            print(f"    [DEBUG] Erro gravado em log.")
+            continue
+
+    field_stats.record(page_matches)
+    return products
+
+def search_mercadolibre(query, limit=10, client=None, use_cache=True):
+    """
+    Busca produtos no Mercado Livre via Web Scraping (HTML).
+    Contorna limitações da API pública.
+    Para mais de uma página de resultados (limit > PAGE_SIZE), usa a busca paginada.
+    use_cache=False ignora o cache em disco de páginas.
+    """
+    try:
+        if limit > PAGE_SIZE:
+            return list(iter_search_results(query, max_items=limit, use_cache=use_cache))
 
-        response = session.get(url)
-        response.raise_for_status()
+        url = build_search_url(query)
+        print(f"    (Scraping: {url})")
+
+        # Cliente compartilhado: pool de conexões e cookies reaproveitados entre buscas
+        client = client or get_client()
+        html = client.fetch_text(url, use_cache=use_cache)
         
         # Debug: Salvar HTML para análise
         # with open("debug_last_search.html", "w", encoding="utf-8") as f:
-        #     f.write(response.text)
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Tenta encontrar os cards de produtos
-        results = soup.find_all('li', class_='ui-search-layout__item', limit=limit)
+        #     f.write(html)
         
-        # Fallback para div que agrupa items no layout novo "Poly" (grid)
-        if not results:
-             results = soup.find_all('div', class_='poly-card', limit=limit)
-        
-        print(f"    (Items encontrados no HTML: {len(results)})")
+        return parse_search_results(html, query, limit)
+
+    except Exception as e:
+        print(f"Erro no scraping para '{query}': {e}")
+        return []
+
+async def _fetch_page_items(client, query, page, use_cache=None):
+    """
+    Busca e extrai uma página da listagem (page=0 é a primeira).
+    Erros de rede/HTTP sobem para quem chamou: uma falha não pode virar
+    uma lista vazia memorizada como resultado da busca.
+    """
+    url = build_search_url(query, offset=page * PAGE_SIZE)
+    print(f"    (Scraping: {url})")
+
+    html = await client.fetch_text(url, use_cache=use_cache)
+    # O parsing é CPU-bound: roda em thread para não travar as outras buscas
+    return await asyncio.to_thread(parse_search_results, html, query, None)
+
+async def stream_search_async(query, max_items=200, max_pages=MAX_PAGES, client=None, use_cache=None):
+    """
+    Gerador assíncrono de produtos com paginação.
+    Dispara as páginas necessárias (até 'max_pages') em paralelo e entrega os
+    itens na ordem das páginas: uma página que chega antes da anterior fica
+    guardada (só os produtos, o HTML é descartado) até a vez dela. Assim o
+    corte em 'max_items' fica com os primeiros resultados da listagem.
+    use_cache=None segue a configuração do cliente (com cache, se o cliente for aberto aqui).
+    """
+    if client is None:
+        async with AsyncScrapingClient(use_cache=True if use_cache is None else use_cache) as own_client:
+            async for item in stream_search_async(query, max_items, max_pages, own_client, use_cache=use_cache):
+                yield item
+        return
+
+    pages = min(math.ceil(max_items / PAGE_SIZE), max_pages)
+    tasks = [asyncio.ensure_future(_fetch_page_items(client, query, page, use_cache)) for page in range(pages)]
+    remaining = max_items
 
-        products = []
-        for item in results:
+    try:
+        # Aguarda na ordem das páginas; as seguintes continuam baixando em paralelo
+        for task in tasks:
+            items = await task
+            for item in items[:remaining]:
+                yield item
+            remaining -= min(len(items), remaining)
+            if remaining <= 0:
+                break
+    finally:
+        # Orçamento atingido (ou consumidor parou): cancela as páginas pendentes
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+def iter_search_results(query, max_items=200, max_pages=MAX_PAGES, use_cache=True):
+    """
+    Versão síncrona de stream_search_async: um gerador comum que já entrega
+    os itens da primeira página enquanto as demais ainda estão sendo baixadas.
+    """
+    loop = asyncio.new_event_loop()
+    stream = stream_search_async(query, max_items, max_pages, use_cache=use_cache)
+    try:
+        while True:
             try:
-                # TÍTULO & LINK
-                title_tag = item.find('a', class_='poly-component__title') or \
-                            item.find('h2', class_='ui-search-item__title') or \
-                            item.find('a', class_='ui-search-item__group__element ui-search-link__title-card')
-                
-                if title_tag:
-                    title = title_tag.get_text().strip()
-                    link = title_tag['href']
-                else:
-                    title = "Título não encontrado"
-                    link = ""
-                
-                # PREÇO
-                price_container = item.find('div', class_='ui-search-price__second-line') or \
-                                  item.find('div', class_='poly-price__current') or \
-                                  item.find('div', class_='ui-search-price__second-line') # Fallback
-                
-                price = 0.0
-                if price_container:
-                    price_fraction = price_container.find('span', class_='andes-money-amount__fraction')
-                    if price_fraction:
-                        price_text = price_fraction.get_text().strip()
-                        clean_price = price_text.replace('.', '').replace(',', '.')
-                        try:
-                            price = float(clean_price)
-                        except ValueError:
-                             price = 0.0
-
-                # VENDEDOR
-                seller = "N/A (Via Scraping)"
-
-                # LOGÍSTICA (Full, Flex, Normal)
-                logistics_types = []
-                
-                # 1. Tenta identificar FULL explicitamente (Label ou Texto)
-                full_label = item.find('span', class_='ui-search-item__fulfillment-label')
-                shipping_tag = item.find('span', class_='poly-component__shipping') or \
-                               item.find('div', class_='poly-component__shipping')
-                
-                shipping_text = shipping_tag.get_text().strip().lower() if shipping_tag else ""
-                
-                if full_label or "full" in shipping_text:
-                    logistics_types.append("Full")
-                
-                # 2. Tenta identificar FLEX
-                if "chegará hoje" in shipping_text or "chegará amanhã" in shipping_text or "flex" in shipping_text:
-                    logistics_types.append("Flex")
-
-                # Se não for Full nem Flex, assume Normal se houver info de envio, ou deixa vazio/Normal
-                if not logistics_types:
-                    logistics_types.append("Normal")
-                
-                logistics = ", ".join(logistics_types)
-
-                # CONDIÇÃO (Novo/Recondicionado)
-                condition_tag = item.find('span', class_='poly-component__item-condition')
-                condition = condition_tag.get_text().strip() if condition_tag else "Novo"
-
-                # ATRIBUTOS (Tentativa de extração)
-                attributes = []
-                # Tenta achar lista de atributos (comum em list view, raro em grid)
-                attr_list = item.find('ul', class_='ui-search-card-attributes') or \
-                            item.find('ul', class_='poly-component__attributes-list')
-                
-                if attr_list:
-                    for li in attr_list.find_all('li'):
-                        attributes.append(li.get_text().strip())
-                
-                description = ", ".join(attributes) if attributes else ""
-
-                # IMAGEM (Extração da URL)
-                image_url = ""
-                image_tag = item.find('img', class_='ui-search-result-image__element') or \
-                            item.find('img', class_='poly-component__picture')
-                
-                if image_tag:
-                    # Tenta pegar 'data-src' (lazy load) ou 'src'
-                    image_url = image_tag.get('data-src') or image_tag.get('src') or ""
-
-                products.append({
-                    "Termo de Busca": query,
-                    "Título": title,
-                    "Preço (R$)": price,
-                    "Link": link,
-                    "Vendedor": seller, 
-                    "Logística": logistics,
-                    "Condição": condition,
-                    "Descrição/Atributos": description,
-                    "Vendas (Aprox)": "Ver no Site",
-                    "Imagem URL": image_url,
-                    "ID": "N/A"
-                })
-            
-            except Exception as e:
-                # Se falhar em um item, ignora
-                with open("scraping_errors.log", "a", encoding="utf-8") as err_file:
-                    err_file.write(f"Item Error: {e}\n")
-                    import traceback
-                    err_file.write(traceback.format_exc() + "\n")
-                print(f"    [DEBUG] Erro gravado em log.")
-                continue
-                
-        return products
+                item = loop.run_until_complete(stream.__anext__())
+            except StopAsyncIteration:
+                break
+            yield item
+    finally:
+        loop.run_until_complete(stream.aclose())
+        loop.run_until_complete(loop.shutdown_default_executor())
+        loop.close()
 
+async def search_mercadolibre_async(query, limit=10, client=None, use_cache=None):
+    """
+    Versão assíncrona de search_mercadolibre (usa um AsyncScrapingClient aberto).
+    Se 'limit' passar de uma página, busca as páginas seguintes em paralelo.
+    """
+    if limit > PAGE_SIZE:
+        return [item async for item in stream_search_async(query, max_items=limit, client=client,
+                                                           use_cache=use_cache)]
+
+    items = await _fetch_page_items(client, query, 0, use_cache)
+    return items[:limit]
+
+async def _search_once(run, term, limit, client, use_cache=None):
+    """
+    Busca o termo passando pela SearchRun: termos equivalentes (após normalização)
+    compartilham uma única requisição. Cada chamador recebe cópias dos produtos,
+    com o seu próprio termo de busca.
+    """
+    key = (normalize_query(term), limit)
+    future, is_owner = run.claim(key)
+
+    if is_owner:
+        try:
+            run.resolve(key, await search_mercadolibre_async(term, limit=limit, client=client, use_cache=use_cache))
+        except BaseException as e:
+            # Dono cancelado (ou interrompido) também libera quem espera: sem isso
+            # o future nunca termina. Quem espera recebe um erro comum, não o cancelamento.
+            run.fail(key, e if isinstance(e, Exception) else RuntimeError(f"busca de '{term}' interrompida"))
+            raise
+
+    products = await asyncio.wrap_future(future)
+    return [replace(product, query=term) for product in products]
+
+async def _search_term(run, term, limit, client, use_cache=None):
+    """Fronteira de erro por termo: a falha de um termo não derruba o lote (e não fica no SearchRun)."""
+    try:
+        return await _search_once(run, term, limit, client, use_cache)
     except Exception as e:
-        print(f"Erro no scraping para '{query}': {e}")
+        print(f"Erro no scraping para '{term}': {e}")
         return []
 
+async def search_many_async(terms, limit=10, max_concurrency=DEFAULT_MAX_CONCURRENCY, rate_limiter=None,
+                            use_cache=True, run=None, client=None):
+    """
+    Busca vários termos em paralelo, respeitando o limite de concorrência
+    e o token bucket por host. Retorna {termo: [produtos]} na ordem de 'terms',
+    com uma entrada por termo normalizado (duplicatas como "JBL Flip 6" e
+    "jbl flip 6 " ficam só com a primeira grafia).
+    'run' (SearchRun) permite compartilhar resultados entre lotes da mesma execução.
+    Termo que falha volta como [] e pode ser buscado de novo num lote seguinte.
+    'client' (AsyncScrapingClient já aberto) reaproveita o pool entre chamadas;
+    sem ele, um cliente é aberto e fechado só para este lote.
+    """
+    run = run or SearchRun()
+    unique_terms = []
+    seen = set()
+    for term in terms:
+        key = normalize_query(term)
+        if key not in seen:
+            seen.add(key)
+            unique_terms.append(term)
+
+    if client is None:
+        async with AsyncScrapingClient(max_concurrency=max_concurrency, rate_limiter=rate_limiter,
+                                       use_cache=use_cache) as own_client:
+            return await search_many_async(unique_terms, limit, run=run, use_cache=use_cache, client=own_client)
+
+    results = await asyncio.gather(
+        *(_search_term(run, term, limit, client, use_cache) for term in unique_terms)
+    )
+    return dict(zip(unique_terms, results))
+
+
+class SearchSession:
+    """
+    Event loop (numa thread própria) e AsyncScrapingClient abertos uma vez e
+    reaproveitados por todas as chamadas de search_many: o pool do httpx e as
+    conexões TLS sobrevivem entre as imagens do CLI e entre os cliques do app.
+    Pode ser usada de várias threads ao mesmo tempo (workers do pipeline).
+    """
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY, rate_limiter=None, **client_kwargs):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="ml-busca", daemon=True)
+        self._thread.start()
+        self.client = AsyncScrapingClient(max_concurrency=max_concurrency, rate_limiter=rate_limiter,
+                                          **client_kwargs)
+        self.run(self.client.__aenter__())
+
+    def run(self, coroutine):
+        """Executa a corrotina no loop da sessão e espera o resultado (de qualquer outra thread)."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def connection_stats(self):
+        return self.client.connection_stats()
+
+    def close(self):
+        if self.loop.is_closed():
+            return
+        self.run(self.client.__aexit__(None, None, None))
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.run_until_complete(self.loop.shutdown_default_executor())
+        self.loop.close()
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_search_session(max_concurrency=DEFAULT_MAX_CONCURRENCY, rate_limiter=None):
+    """SearchSession do processo para essa configuração (criada na primeira chamada)."""
+    key = (max_concurrency, rate_limiter)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = SearchSession(max_concurrency, rate_limiter)
+            _sessions[key] = session
+        return session
+
+
+def close_search_sessions():
+    """Fecha os clientes e loops das buscas (fim da execução do CLI)."""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+def search_connection_stats():
+    """Contadores de conexão do pool das buscas (somados entre as sessões abertas)."""
+    totals = {"requests": 0, "connections_opened": 0, "connections_reused": 0, "rejected": 0}
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+    for session in sessions:
+        for name, value in session.connection_stats().items():
+            totals[name] += value
+    return totals
+
+
+def search_many(terms, limit=10, max_concurrency=DEFAULT_MAX_CONCURRENCY, rate_limiter=None, use_cache=True,
+                run=None, session=None):
+    """
+    Ponto de entrada síncrono para search_many_async (CLI e Streamlit).
+    Roda na SearchSession do processo (ou em 'session'), sem abrir loop nem pool novos a cada chamada.
+    """
+    if not terms:
+        return {}
+    session = session or get_search_session(max_concurrency, rate_limiter)
+    return session.run(search_many_async(terms, limit, use_cache=use_cache, run=run, client=session.client))
+
 if __name__ == "__main__":
     import json
     # Teste rápido com termo problemático
@@ -173,5 +406,5 @@ if __name__ == "__main__":
     res = search_mercadolibre(query, limit=10)
     
     with open("results.json", "w", encoding="utf-8") as f:
-        json.dump(res, f, ensure_ascii=False, indent=2)
+        json.dump([p.to_row() for p in res], f, ensure_ascii=False, indent=2)
     print("Resultados salvos em results.json")
@@ -0,0 +1,206 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Estatísticas por modelo da IA, guardadas entre execuções (via .env)
+MODEL_STATS_PATH = os.getenv("ML_MODEL_STATS", os.path.join(".cache", "gemini_model_stats.json"))
+# Quantas latências recentes entram nos percentis
+MODEL_STATS_WINDOW = int(os.getenv("ML_MODEL_STATS_WINDOW", "50"))
+# Modelo com erro persistente (404/403) fica fora da lista de candidatos por este tempo (s)
+MODEL_COOLDOWN = float(os.getenv("ML_MODEL_COOLDOWN", "3600"))
+# Intervalo mínimo entre gravações do JSON (s); o resto vai no flush() do fim da execução
+MODEL_STATS_SAVE_INTERVAL = float(os.getenv("ML_MODEL_STATS_SAVE_INTERVAL", "30"))
+
+
+def percentile(values, fraction):
+    """Percentil por interpolação linear (values não precisa estar ordenado)."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class ModelRecord:
+    """Latências recentes (só sucessos), contagens e a última falha de um modelo."""
+    __slots__ = ("latencies", "successes", "failures", "last_success", "last_failure", "last_error")
+
+    def __init__(self, window=MODEL_STATS_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.successes = 0
+        self.failures = 0
+        self.last_success = 0.0
+        self.last_failure = 0.0
+        self.last_error = None
+
+    @property
+    def p50(self):
+        return percentile(self.latencies, 0.5)
+
+    @property
+    def p95(self):
+        return percentile(self.latencies, 0.95)
+
+    @property
+    def error_rate(self):
+        total = self.successes + self.failures
+        return self.failures / total if total else 0.0
+
+    def expected_latency(self):
+        """
+        Tempo esperado até uma resposta válida: a mediana dividida pela
+        chance de sucesso (cada falha custa mais uma tentativa). None sem dados.
+        """
+        if self.p50 is None:
+            return None
+        return self.p50 / max(1.0 - self.error_rate, 0.05)
+
+    def to_dict(self):
+        return {"latencies": list(self.latencies), "successes": self.successes, "failures": self.failures,
+                "last_success": self.last_success, "last_failure": self.last_failure,
+                "last_error": self.last_error}
+
+    @classmethod
+    def from_dict(cls, data, window=MODEL_STATS_WINDOW):
+        record = cls(window)
+        record.latencies.extend(data.get("latencies", []))
+        record.successes = data.get("successes", 0)
+        record.failures = data.get("failures", 0)
+        record.last_success = data.get("last_success", 0.0)
+        record.last_failure = data.get("last_failure", 0.0)
+        record.last_error = data.get("last_error")
+        return record
+
+
+class ModelStats:
+    """
+    Histórico de cada modelo (p50/p95 de latência, taxa de erro, última falha)
+    salvo em JSON. Usado para ordenar os candidatos pela latência esperada e
+    pular, por MODEL_COOLDOWN segundos, os que deram erro persistente — assim um
+    lote não paga de novo pelos IDs de modelo que não existem mais.
+    As chamadas só marcam o histórico como alterado: o arquivo é regravado no
+    máximo a cada 'save_interval' segundos e no flush() do fim da execução.
+    """
+    def __init__(self, path=MODEL_STATS_PATH, cooldown=MODEL_COOLDOWN, window=MODEL_STATS_WINDOW,
+                 save_interval=MODEL_STATS_SAVE_INTERVAL):
+        self.path = path
+        self.cooldown = cooldown
+        self.window = window
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._dirty = False
+        # A primeira alteração já é gravada
+        self._last_save = time.monotonic() - save_interval
+        self.records = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return {name: ModelRecord.from_dict(record, self.window) for name, record in data.items()}
+
+    def save(self):
+        with self._lock:
+            data = {name: record.to_dict() for name, record in self.records.items()}
+            self._dirty = False
+            self._last_save = time.monotonic()
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            temp_path = f"{self.path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Aviso: não foi possível salvar as estatísticas dos modelos: {e}")
+
+    def flush(self):
+        """Grava o arquivo se houver alterações ainda não salvas (fim da execução)."""
+        with self._lock:
+            dirty = self._dirty
+        if dirty:
+            self.save()
+
+    def _record(self, model_name):
+        """Registro do modelo (chamar com o lock); marca o histórico como alterado."""
+        self._dirty = True
+        if model_name not in self.records:
+            self.records[model_name] = ModelRecord(self.window)
+        return self.records[model_name]
+
+    def _save_if_due(self):
+        with self._lock:
+            due = self._dirty and time.monotonic() - self._last_save >= self.save_interval
+        if due:
+            self.save()
+
+    def record_success(self, model_name, seconds):
+        with self._lock:
+            record = self._record(model_name)
+            record.latencies.append(seconds)
+            record.successes += 1
+            record.last_success = time.time()
+        self._save_if_due()
+
+    def record_failure(self, model_name, error, persistent=True):
+        """
+        Conta a falha na taxa de erro. Só a persistente (modelo inexistente, sem
+        permissão) marca 'last_failure' e põe o modelo em cooldown; uma falha
+        temporária (500, timeout) não tira o modelo da lista.
+        """
+        with self._lock:
+            record = self._record(model_name)
+            record.failures += 1
+            if persistent:
+                record.last_failure = time.time()
+            record.last_error = str(error)[:200]
+        self._save_if_due()
+
+    def in_cooldown(self, model_name, now=None):
+        """Falhou por último (depois do último sucesso) há menos de 'cooldown' segundos."""
+        with self._lock:
+            record = self.records.get(model_name)
+            if record is None or record.last_failure <= record.last_success:
+                return False
+            return (now or time.time()) - record.last_failure < self.cooldown
+
+    def order(self, candidates):
+        """
+        Candidatos fora do cooldown, os já medidos primeiro por latência esperada
+        e os sem histórico depois, na ordem recebida. Se todos estiverem em
+        cooldown, devolve todos (a falha mais antiga primeiro) para não ficar sem modelo.
+        """
+        now = time.time()
+        available = [m for m in candidates if not self.in_cooldown(m, now)]
+        with self._lock:
+            if not available:
+                return sorted(candidates, key=lambda m: self.records[m].last_failure)
+            expected = {m: self.records[m].expected_latency() if m in self.records else None for m in available}
+        measured = sorted((m for m in available if expected[m] is not None), key=expected.get)
+        return measured + [m for m in available if expected[m] is None]
+
+    def skipped(self, candidates):
+        """Candidatos em cooldown (para o log)."""
+        now = time.time()
+        return [m for m in candidates if self.in_cooldown(m, now)]
+
+    def summary(self):
+        """Uma linha por modelo: 'gemini-2.5-flash: p50 1.20s, p95 2.10s, 3% erros, 40 chamadas'."""
+        lines = []
+        with self._lock:
+            records = sorted(self.records.items(),
+                             key=lambda item: (item[1].expected_latency() is None, item[1].expected_latency() or 0))
+            for name, record in records:
+                latency = (f"p50 {record.p50:.2f}s, p95 {record.p95:.2f}s" if record.p50 is not None
+                           else "sem latência medida")
+                line = (f"{name}: {latency}, {record.error_rate:.0%} erros, "
+                        f"{record.successes + record.failures} chamadas")
+                if record.last_failure > record.last_success:
+                    line += f", última falha: {record.last_error}"
+                lines.append(line)
+        return lines
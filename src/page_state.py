@@ -0,0 +1,177 @@
+import json
+import re
+from product import Product, Logistics, Condition, NO_TITLE
+from listing_index import canonical_url
+
+# Marcadores do estado inicial embutido na página de busca. A página pode trazer
+# o blob como <script id="__PRELOADED_STATE__" type="application/json">{...}</script>
+# ou como atribuição JS (window.__PRELOADED_STATE__ = {...};)
+STATE_MARKERS = ('id="__PRELOADED_STATE__"', "window.__PRELOADED_STATE__")
+
+CONDITIONS = {
+    "new": Condition.NOVO,
+    "used": Condition.USADO,
+    "refurbished": Condition.RECONDICIONADO,
+}
+
+PICTURE_URL = "https://http2.mlstatic.com/D_NQ_NP_{id}-O.webp"
+
+SOLD_PATTERN = re.compile(r"\+?\s*([\d.,]+)\s*(mil)?\s*vendid", re.IGNORECASE)
+
+_decoder = json.JSONDecoder()
+
+
+def find_state_blob(html):
+    """
+    Localiza e decodifica apenas o objeto JSON do estado embutido.
+    Não monta árvore DOM: procura o marcador e usa raw_decode a partir da
+    primeira '{', que para exatamente no fim do objeto.
+    Retorna o dict ou None se a página não tiver o blob.
+    """
+    for marker in STATE_MARKERS:
+        pos = html.find(marker)
+        if pos == -1:
+            continue
+        start = html.find("{", pos)
+        # Evita pegar uma '{' de outro script quando o blob é 'null'
+        end_of_script = html.find("</script>", pos)
+        if start == -1 or (end_of_script != -1 and start > end_of_script):
+            continue
+        try:
+            state, _ = _decoder.raw_decode(html, start)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(state, dict):
+            return state
+    return None
+
+
+def _state_results(state):
+    """A lista de resultados pode vir na raiz ou dentro de pageState."""
+    for root in (state, state.get("pageState") or {}):
+        initial = root.get("initialState") or {}
+        results = initial.get("results")
+        if isinstance(results, list):
+            return results
+    return None
+
+
+def parse_sold_quantity(text):
+    """Converte textos como '+1000 vendidos' ou '+5mil vendidos' em número."""
+    match = SOLD_PATTERN.search(text or "")
+    if not match:
+        return None
+    number = match.group(1).replace(".", "").replace(",", ".")
+    try:
+        value = float(number)
+    except ValueError:
+        return None
+    if match.group(2):
+        value *= 1000
+    return int(value)
+
+
+def _components(polycard):
+    """Indexa os componentes do card pelo tipo (title, price, shipping...)."""
+    indexed = {}
+    for component in polycard.get("components") or []:
+        ctype = component.get("type")
+        if ctype:
+            indexed[ctype] = component.get(ctype) or {}
+    return indexed
+
+
+def _logistics(metadata, shipping):
+    logistic_type = shipping.get("logistic_type") or metadata.get("logistic_type")
+    shipping_text = (shipping.get("text") or "").lower()
+
+    # Mesmas regras do parsing por DOM, reforçadas pelo tipo de logística do blob
+    is_full = logistic_type == "fulfillment" or "full" in shipping_text
+    is_flex = logistic_type == "self_service" or "chegará hoje" in shipping_text \
+        or "chegará amanhã" in shipping_text or "flex" in shipping_text
+    return Logistics.from_flags(is_full, is_flex)
+
+
+def _map_result(result, query):
+    polycard = result.get("polycard") or {}
+    metadata = polycard.get("metadata") or {}
+    item_id = metadata.get("id")
+    if not item_id:
+        # Banners, anúncios de loja etc. não são itens
+        return None
+
+    components = _components(polycard)
+
+    link = metadata.get("url") or ""
+    if link and not link.startswith("http"):
+        link = "https://" + link.lstrip("/")
+    link = canonical_url(link)
+
+    price = 0.0
+    current_price = (components.get("price") or {}).get("current_price") or {}
+    try:
+        price = float(current_price.get("value") or 0.0)
+    except (TypeError, ValueError):
+        price = 0.0
+
+    condition_text = (components.get("item_condition") or {}).get("text")
+    if condition_text:
+        condition = Condition.parse(condition_text)
+    else:
+        condition = CONDITIONS.get(metadata.get("condition"), Condition.NOVO)
+
+    seller_text = (components.get("seller") or {}).get("text") or ""
+    seller = re.sub(r"^Por\s+", "", seller_text).strip() or None
+
+    attributes = (components.get("attributes_list") or {}).get("texts") or []
+
+    pictures = (polycard.get("pictures") or {}).get("pictures") or []
+    image_url = ""
+    if pictures:
+        image_url = pictures[0].get("url") or PICTURE_URL.format(id=pictures[0].get("id", ""))
+
+    sold = metadata.get("sold_quantity")
+    if sold is None:
+        review = components.get("review_compacted") or {}
+        sold = parse_sold_quantity(" ".join(
+            (value.get("label") or {}).get("text", "") for value in review.get("values") or []
+        ))
+
+    return Product(
+        query=query,
+        title=((components.get("title") or {}).get("text") or NO_TITLE).strip(),
+        price=price,
+        link=link,
+        seller=seller,
+        logistics=_logistics(metadata, components.get("shipping") or {}),
+        condition=condition,
+        attributes=", ".join(attributes),
+        sales=sold,
+        image_url=image_url,
+        item_id=item_id,
+    )
+
+
+def extract_state_products(html, query, limit=10):
+    """
+    Extrai os produtos (Product) do estado JSON embutido, como o parsing por DOM.
+    Retorna None se o blob não existir ou não tiver resultados (o chamador usa o DOM).
+    """
+    state = find_state_blob(html)
+    if state is None:
+        return None
+
+    results = _state_results(state)
+    if not results:
+        return None
+
+    products = []
+    for result in results:
+        product = _map_result(result, query)
+        if product is None:
+            continue
+        products.append(product)
+        if limit and len(products) >= limit:
+            break
+
+    return products or None
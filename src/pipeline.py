@@ -0,0 +1,238 @@
+import os
+import queue
+import threading
+import time
+
+# Pipeline do CLI (via .env)
+PIPELINE_QUEUE_SIZE = int(os.getenv("ML_PIPELINE_QUEUE_SIZE", "8"))
+# Intervalo (s) do log de filas/ocupação; 0 desliga o log periódico
+PIPELINE_LOG_INTERVAL = float(os.getenv("ML_PIPELINE_LOG_INTERVAL", "5"))
+
+# Marca de fim de fila (um por worker do estágio)
+_DONE = object()
+
+
+class Stage:
+    """
+    Um estágio do pipeline: 'workers' threads lendo de uma fila limitada.
+    func(item) devolve os itens do próximo estágio (lista/gerador) ou None.
+    Se a fila do próximo estágio estiver cheia, o estágio espera (backpressure).
+    """
+    def __init__(self, name, func, workers=1, queue_size=PIPELINE_QUEUE_SIZE):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.next = None
+        self._lock = threading.Lock()
+        self._active = {}
+        self._threads = []
+        self.stats = {"processed": 0, "emitted": 0, "errors": 0, "busy": 0.0,
+                      "blocked": 0.0, "max_depth": 0}
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def put(self, item):
+        """Enfileira no estágio; devolve o tempo (s) esperando por espaço na fila."""
+        start = time.perf_counter()
+        self.queue.put(item)
+        waited = time.perf_counter() - start
+        depth = self.queue.qsize()
+        with self._lock:
+            if depth > self.stats["max_depth"]:
+                self.stats["max_depth"] = depth
+        return waited
+
+    def close(self):
+        """Sem mais entradas: espera os workers terminarem o que está na fila."""
+        for _ in self._threads:
+            self.queue.put(_DONE)
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self):
+        ident = threading.get_ident()
+        while True:
+            item = self.queue.get()
+            if item is _DONE:
+                return
+            start = time.perf_counter()
+            with self._lock:
+                self._active[ident] = start
+            try:
+                outputs = list(self.func(item) or ())
+            except Exception as e:
+                outputs = []
+                with self._lock:
+                    self.stats["errors"] += 1
+                print(f"Erro no estágio '{self.name}': {e}")
+            finally:
+                with self._lock:
+                    del self._active[ident]
+                    self.stats["busy"] += time.perf_counter() - start
+                    self.stats["processed"] += 1
+
+            blocked = 0.0
+            if self.next is not None:
+                for output in outputs:
+                    blocked += self.next.put(output)
+            with self._lock:
+                self.stats["emitted"] += len(outputs)
+                self.stats["blocked"] += blocked
+
+    def busy_seconds(self):
+        """Tempo ocupado somado dos workers, incluindo os itens em andamento."""
+        now = time.perf_counter()
+        with self._lock:
+            return self.stats["busy"] + sum(now - start for start in self._active.values())
+
+    def status(self, busy_delta, elapsed):
+        """'busca: fila 3/8, 2 workers, 95% ocupado'."""
+        utilisation = busy_delta / (elapsed * self.workers) if elapsed > 0 else 0.0
+        return (f"{self.name}: fila {self.queue.qsize()}/{self.queue.maxsize}, "
+                f"{self.workers} workers, {min(utilisation, 1.0):.0%} ocupado")
+
+
+class Source:
+    """
+    Entrada do pipeline: mede o tempo gasto produzindo cada item (next() do
+    iterador), para que um gerador lento apareça na ocupação e no gargalo.
+    """
+    workers = 1
+
+    def __init__(self, name, items):
+        self.name = name
+        self._items = iter(items)
+        self._lock = threading.Lock()
+        self._started = None
+        self.stats = {"processed": 0, "busy": 0.0, "blocked": 0.0}
+
+    def __iter__(self):
+        while True:
+            start = time.perf_counter()
+            with self._lock:
+                self._started = start
+            try:
+                item = next(self._items)
+            except StopIteration:
+                return
+            finally:
+                with self._lock:
+                    self._started = None
+                    self.stats["busy"] += time.perf_counter() - start
+            with self._lock:
+                self.stats["processed"] += 1
+            yield item
+
+    def busy_seconds(self):
+        """Tempo produzindo itens, incluindo o item em andamento."""
+        now = time.perf_counter()
+        with self._lock:
+            return self.stats["busy"] + (now - self._started if self._started is not None else 0.0)
+
+    def status(self, busy_delta, elapsed):
+        """'analise: entrada, 95% ocupado'."""
+        utilisation = busy_delta / elapsed if elapsed > 0 else 0.0
+        return f"{self.name}: entrada, {min(utilisation, 1.0):.0%} ocupado"
+
+
+class Pipeline:
+    """
+    Estágios ligados por filas limitadas: enquanto a imagem N+1 é analisada,
+    as keywords da imagem N são buscadas e as miniaturas da N-1 são baixadas.
+    Os itens que saem do último estágio são devolvidos por run().
+    Com 'source', o tempo gasto gerando as entradas (ex.: análise de IA feita
+    pelo próprio iterador) entra na ocupação e no gargalo com esse nome.
+    """
+    def __init__(self, stages, log_interval=PIPELINE_LOG_INTERVAL, source=None):
+        self.stages = stages
+        self.source = source
+        self._source = None
+        self.log_interval = log_interval
+        self.results = []
+        self.elapsed = 0.0
+        for stage, following in zip(stages, stages[1:]):
+            stage.next = following
+        # Saída do último estágio: coletor sem limite
+        self._sink = Stage("saida", lambda item: self.results.append(item), queue_size=0)
+        stages[-1].next = self._sink
+        self._stop = threading.Event()
+
+    def run(self, items):
+        start = time.perf_counter()
+        self._sink.start()
+        for stage in self.stages:
+            stage.start()
+        monitor = None
+        if self.log_interval > 0:
+            monitor = threading.Thread(target=self._monitor, name="pipeline-monitor", daemon=True)
+            monitor.start()
+
+        if self.source is not None:
+            self._source = items = Source(self.source, items)
+        try:
+            for item in items:
+                waited = self.stages[0].put(item)
+                if self._source is not None:
+                    self._source.stats["blocked"] += waited
+            # Fecha na ordem: cada estágio só termina depois que o anterior esvaziou
+            for stage in self.stages:
+                stage.close()
+            self._sink.close()
+        finally:
+            self._stop.set()
+            if monitor is not None:
+                monitor.join()
+            self.elapsed = time.perf_counter() - start
+        return self.results
+
+    def _measured(self):
+        """Entrada medida (se houver) seguida dos estágios."""
+        return ([self._source] if self._source is not None else []) + self.stages
+
+    def _monitor(self):
+        measured = self._measured()
+        last = time.perf_counter()
+        last_busy = [part.busy_seconds() for part in measured]
+        while not self._stop.wait(self.log_interval):
+            now = time.perf_counter()
+            busy = [part.busy_seconds() for part in measured]
+            line = " | ".join(part.status(b - lb, now - last)
+                              for part, b, lb in zip(measured, busy, last_busy))
+            print(f"[pipeline] {line}")
+            last, last_busy = now, busy
+
+    def utilisation(self):
+        """{estágio: fração do tempo total em que os workers estiveram ocupados}, entrada inclusa."""
+        measured = self._measured()
+        if self.elapsed <= 0:
+            return {part.name: 0.0 for part in measured}
+        return {part.name: part.stats["busy"] / (self.elapsed * part.workers) for part in measured}
+
+    def bottleneck(self):
+        """Estágio (ou entrada) mais ocupado: o que limita a vazão."""
+        utilisation = self.utilisation()
+        return max(utilisation, key=utilisation.get) if utilisation else None
+
+    def summary(self):
+        """Uma linha por estágio, mais o gargalo."""
+        utilisation = self.utilisation()
+        lines = []
+        if self._source is not None:
+            s = self._source.stats
+            lines.append(f"{self.source}: {s['processed']} itens gerados (entrada), "
+                         f"{utilisation[self.source]:.0%} ocupado, "
+                         f"{s['blocked']:.1f}s esperando o próximo estágio")
+        for stage in self.stages:
+            s = stage.stats
+            lines.append(f"{stage.name}: {s['processed']} itens, {s['errors']} erros, "
+                         f"{utilisation[stage.name]:.0%} ocupado, fila máx {s['max_depth']}/{stage.queue.maxsize}, "
+                         f"{s['blocked']:.1f}s esperando o próximo estágio")
+        bottleneck = self.bottleneck()
+        if bottleneck is not None:
+            lines.append(f"gargalo: {bottleneck} ({self.elapsed:.1f}s no total)")
+        return lines
@@ -0,0 +1,152 @@
+import os
+from operator import attrgetter
+import numpy as np
+import pandas as pd
+from product import Product, Logistics, COLUMNS, products_to_dataframe
+from listing_index import LIST_SEPARATOR
+
+# Preços fora de [P25 - k*IQR, P75 + k*IQR] não entram na média (via .env)
+PRICE_IQR_FACTOR = float(os.getenv("ML_PRICE_IQR_FACTOR", "1.5"))
+
+# Colunas da aba de resumo (a primeira é o agrupamento: termo ou imagem de origem)
+SUMMARY_COLUMNS = ["Anúncios", "Com preço", "Preço 0.0 (falha)", "Mínimo", "P25", "Mediana", "P75",
+                   "Média sem outliers", "Outliers", "% Full", "% Flex"]
+
+_FULL = frozenset(id(m) for m in (Logistics.FULL, Logistics.FULL_FLEX))
+_FLEX = frozenset(id(m) for m in (Logistics.FLEX, Logistics.FULL_FLEX))
+
+
+def _columns_from_products(products, by):
+    """Só as colunas usadas no resumo, lidas direto dos Products (sem montar o relatório)."""
+    count = len(products)
+    keys = list(map(attrgetter(by), products))
+    prices = np.fromiter(map(attrgetter("price"), products), dtype=np.float64, count=count)
+    # Logística por identidade do membro do enum (sem ler .value item a item)
+    logistics = np.fromiter(map(id, map(attrgetter("logistics"), products)), dtype=np.int64, count=count)
+    is_full = np.isin(logistics, list(_FULL))
+    is_flex = np.isin(logistics, list(_FLEX))
+    return keys, prices, is_full, is_flex
+
+
+def _columns_from_frame(frame, by):
+    """Mesmas colunas a partir do DataFrame do relatório (nomes em português)."""
+    keys = frame[COLUMNS[by]] if COLUMNS[by] in frame.columns else pd.Series([None] * len(frame))
+    prices = pd.to_numeric(frame[COLUMNS["price"]], errors="coerce").fillna(0.0).to_numpy(np.float64)
+    logistics = frame[COLUMNS["logistics"]].astype(str).str.lower()
+    is_full = logistics.str.contains("full", regex=False).to_numpy(dtype=bool)
+    is_flex = logistics.str.contains("flex", regex=False).to_numpy(dtype=bool)
+    return keys, prices, is_full, is_flex
+
+
+def _explode(keys):
+    """
+    Uma linha por (grupo, anúncio): registros unidos pelo ListingIndex trazem
+    vários termos/imagens ("a | b"). Retorna (códigos do grupo, posição da linha, grupos).
+    O texto só é separado nos valores distintos; as linhas são repetidas pelos códigos.
+    """
+    raw_codes, raw_keys = pd.factorize(np.asarray(keys, dtype=object))
+    parts = [str(key).split(LIST_SEPARATOR) for key in raw_keys]
+    groups = sorted({part for key_parts in parts for part in key_parts})
+    position = {group: code for code, group in enumerate(groups)}
+    part_codes = [np.array([position[part] for part in key_parts], dtype=np.int64) for key_parts in parts]
+
+    rows = np.flatnonzero(raw_codes >= 0)  # sem grupo (ex: sem imagem de origem) fica de fora
+    row_keys = raw_codes[rows]
+    lengths = np.array([len(p) for p in part_codes], dtype=np.int64)
+    if not len(lengths) or (lengths == 1).all():
+        first = np.array([p[0] for p in part_codes], dtype=np.int64)
+        return first[row_keys], rows, groups
+    flat = np.concatenate(part_codes)
+    offsets = np.cumsum(lengths) - lengths
+    repeats = lengths[row_keys]
+    exploded_keys = np.repeat(row_keys, repeats)
+    within = np.arange(len(exploded_keys)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    return flat[offsets[exploded_keys] + within], np.repeat(rows, repeats), groups
+
+
+def _group_order(codes, prices, size):
+    """
+    Índices que ordenam por (grupo, preço): argsort dos preços e depois um sort
+    estável pelos códigos — com códigos de 16 bits o numpy usa radix sort,
+    bem mais rápido que np.lexsort nas duas chaves.
+    """
+    by_price = np.argsort(prices)
+    code_dtype = np.int16 if size <= np.iinfo(np.int16).max else np.int64
+    return by_price[np.argsort(codes[by_price].astype(code_dtype), kind="stable")]
+
+
+def _sorted_quantile(sorted_prices, starts, counts, fraction):
+    """Quantil (interpolação linear, como o numpy) de cada grupo num vetor ordenado por grupo e preço."""
+    position = starts + (counts - 1) * fraction
+    last = len(sorted_prices) - 1
+    low = np.clip(np.floor(position).astype(np.int64), 0, last)
+    high = np.clip(np.minimum(low + 1, starts + counts - 1), 0, last)
+    low_values = sorted_prices[low]
+    high_values = sorted_prices[high]
+    return low_values + (high_values - low_values) * (position - low)
+
+
+def price_summary(data, by="query", iqr_factor=PRICE_IQR_FACTOR):
+    """
+    Distribuição de preços por termo (by="query") ou por imagem de origem
+    (by="source_image"): anúncios, mínimo, P25/mediana/P75, média sem outliers
+    (fora de P25/P75 -/+ iqr_factor*IQR), % Full/Flex e quantos vieram com
+    preço 0.0 (falha no parsing, fora das estatísticas de preço).
+    data: lista de Product ou o DataFrame do relatório. Tudo em operações
+    agrupadas do numpy (uma ordenação), sem laço por grupo.
+    """
+    if not isinstance(data, pd.DataFrame):
+        data = list(data)
+        if not all(isinstance(p, Product) for p in data):
+            # Dicts no formato do relatório
+            data = products_to_dataframe(data)
+    if isinstance(data, pd.DataFrame):
+        keys, prices, is_full, is_flex = _columns_from_frame(data, by)
+    else:
+        keys, prices, is_full, is_flex = _columns_from_products(data, by)
+
+    label = COLUMNS[by]
+    codes, rows, groups = _explode(keys)
+    if not len(groups):
+        return pd.DataFrame(columns=[label] + SUMMARY_COLUMNS)
+    size = len(groups)
+    prices, is_full, is_flex = prices[rows], is_full[rows], is_flex[rows]
+
+    listings = np.bincount(codes, minlength=size)
+    valid = prices > 0
+    valid_codes, valid_prices = codes[valid], prices[valid]
+    counts = np.bincount(valid_codes, minlength=size)
+
+    # Ordena uma vez por (grupo, preço): cada grupo vira uma fatia contínua
+    order = _group_order(valid_codes, valid_prices, size)
+    sorted_prices = valid_prices[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    # Grupo sem nenhum preço válido: índices ficam presos ao vetor e o resultado vira NaN
+    padded = sorted_prices if len(sorted_prices) else np.zeros(1)
+    has_price = counts > 0
+    minimum, p25, median, p75 = (np.where(has_price, _sorted_quantile(padded, starts, counts, q), np.nan)
+                                 for q in (0.0, 0.25, 0.5, 0.75))
+
+    # Média sem outliers: limites do grupo levados de volta a cada linha pelo código
+    spread = (p75 - p25) * iqr_factor
+    low, high = (p25 - spread)[valid_codes], (p75 + spread)[valid_codes]
+    inlier = (valid_prices >= low) & (valid_prices <= high)
+    inliers = np.bincount(valid_codes[inlier], minlength=size)
+    totals = np.bincount(valid_codes[inlier], weights=valid_prices[inlier], minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        trimmed_mean = np.where(inliers > 0, totals / inliers, np.nan)
+
+    return pd.DataFrame({
+        label: groups,
+        "Anúncios": listings,
+        "Com preço": counts,
+        "Preço 0.0 (falha)": listings - counts,
+        "Mínimo": minimum,
+        "P25": p25,
+        "Mediana": median,
+        "P75": p75,
+        "Média sem outliers": trimmed_mean,
+        "Outliers": counts - inliers,
+        "% Full": np.bincount(codes, weights=is_full, minlength=size) / listings,
+        "% Flex": np.bincount(codes, weights=is_flex, minlength=size) / listings,
+    })
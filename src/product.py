@@ -0,0 +1,156 @@
+from dataclasses import dataclass, fields
+from enum import Enum
+from typing import Optional
+import pandas as pd
+
+# Textos exibidos no relatório quando o dado não veio na página
+NO_SELLER = "N/A (Via Scraping)"
+NO_SALES = "Ver no Site"
+NO_ID = "N/A"
+NO_TITLE = "Título não encontrado"
+
+
+class Logistics(str, Enum):
+    """Tipo de envio do anúncio. Membros são únicos: cada produto só guarda a referência."""
+    NORMAL = "Normal"
+    FULL = "Full"
+    FLEX = "Flex"
+    FULL_FLEX = "Full, Flex"
+
+    @classmethod
+    def from_flags(cls, full, flex):
+        if full and flex:
+            return cls.FULL_FLEX
+        if full:
+            return cls.FULL
+        if flex:
+            return cls.FLEX
+        return cls.NORMAL
+
+    @classmethod
+    def parse(cls, text):
+        """'Full', 'full, flex', '' ... -> membro (texto desconhecido vira NORMAL)."""
+        text = (text or "").lower()
+        return cls.from_flags("full" in text, "flex" in text)
+
+
+class Condition(str, Enum):
+    NOVO = "Novo"
+    USADO = "Usado"
+    RECONDICIONADO = "Recondicionado"
+
+    @classmethod
+    def parse(cls, text):
+        """Texto do card ('Novo', 'Recondicionado', 'Usado - Bom estado'...) -> membro (padrão NOVO)."""
+        text = (text or "").lower()
+        if "recondicionado" in text:
+            return cls.RECONDICIONADO
+        if "usado" in text:
+            return cls.USADO
+        return cls.NOVO
+
+
+# Atributo -> coluna do relatório (a ordem é a ordem das colunas exportadas)
+COLUMNS = {
+    "query": "Termo de Busca",
+    "title": "Título",
+    "price": "Preço (R$)",
+    "link": "Link",
+    "seller": "Vendedor",
+    "logistics": "Logística",
+    "condition": "Condição",
+    "attributes": "Descrição/Atributos",
+    "sales": "Vendas (Aprox)",
+    "image_url": "Imagem URL",
+    "item_id": "ID",
+    "source_image": "Imagem Origem",
+}
+
+
+@dataclass(slots=True)
+class Product:
+    """
+    Um anúncio da listagem. Campos numéricos de verdade (preço, vendas) e
+    logística/condição como enums; os nomes em português e os textos de
+    "sem dado" só aparecem na exportação (to_row / products_to_dataframe).
+    """
+    query: str
+    title: str
+    price: float = 0.0
+    link: str = ""
+    seller: Optional[str] = None
+    logistics: Logistics = Logistics.NORMAL
+    condition: Condition = Condition.NOVO
+    attributes: str = ""
+    sales: Optional[int] = None
+    image_url: str = ""
+    item_id: Optional[str] = None
+    source_image: Optional[str] = None
+
+    def to_row(self):
+        """Dict com as colunas do relatório ("Título", "Preço (R$)"...)."""
+        row = {
+            COLUMNS["query"]: self.query,
+            COLUMNS["title"]: self.title,
+            COLUMNS["price"]: self.price,
+            COLUMNS["link"]: self.link,
+            COLUMNS["seller"]: self.seller or NO_SELLER,
+            COLUMNS["logistics"]: self.logistics.value,
+            COLUMNS["condition"]: self.condition.value,
+            COLUMNS["attributes"]: self.attributes,
+            COLUMNS["sales"]: self.sales if self.sales is not None else NO_SALES,
+            COLUMNS["image_url"]: self.image_url,
+            COLUMNS["item_id"]: self.item_id or NO_ID,
+        }
+        if self.source_image is not None:
+            row[COLUMNS["source_image"]] = self.source_image
+        return row
+
+    @classmethod
+    def from_row(cls, row):
+        """Inverso de to_row (ex: resultados antigos salvos em JSON)."""
+        values = {attr: row[column] for attr, column in COLUMNS.items() if column in row}
+        values.setdefault("query", "")
+        values.setdefault("title", NO_TITLE)
+        if values.get("seller") == NO_SELLER:
+            values["seller"] = None
+        if values.get("item_id") == NO_ID:
+            values["item_id"] = None
+        sales = values.get("sales")
+        values["sales"] = int(sales) if isinstance(sales, (int, float)) or str(sales).isdigit() else None
+        values["price"] = float(values.get("price") or 0.0)
+        values["logistics"] = Logistics.parse(values.get("logistics"))
+        values["condition"] = Condition.parse(values.get("condition"))
+        return cls(**values)
+
+
+def as_row(item):
+    """Aceita Product ou dict já no formato do relatório."""
+    return item.to_row() if isinstance(item, Product) else item
+
+
+def products_to_dataframe(products):
+    """DataFrame com as colunas do relatório, montado coluna a coluna (sem dict por linha)."""
+    products = list(products)
+    if not products:
+        return pd.DataFrame()
+    if not all(isinstance(p, Product) for p in products):
+        return pd.DataFrame([as_row(p) for p in products])
+
+    attrs = [f.name for f in fields(Product)]
+    if all(p.source_image is None for p in products):
+        attrs.remove("source_image")
+
+    data = {}
+    for attr in attrs:
+        column = [getattr(p, attr) for p in products]
+        if attr == "seller":
+            column = [v or NO_SELLER for v in column]
+        elif attr in ("logistics", "condition"):
+            column = [v.value for v in column]
+        elif attr == "sales":
+            column = [v if v is not None else NO_SALES for v in column]
+        elif attr == "item_id":
+            column = [v or NO_ID for v in column]
+        data[COLUMNS[attr]] = column
+    return pd.DataFrame(data)
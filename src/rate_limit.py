@@ -0,0 +1,276 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Taxa padrão de requisições por segundo por host (configurável via .env)
+DEFAULT_REQUESTS_PER_SECOND = float(os.getenv("ML_REQUESTS_PER_SECOND", "2"))
+DEFAULT_BURST = int(os.getenv("ML_BURST", "4"))
+# Limite de requisições simultâneas por host (teto do controle adaptativo)
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("ML_MAX_CONCURRENCY", "4"))
+
+# Retentativas com backoff exponencial e jitter
+MAX_ATTEMPTS = int(os.getenv("ML_MAX_ATTEMPTS", "4"))
+BACKOFF_BASE = float(os.getenv("ML_BACKOFF_BASE", "1.0"))
+BACKOFF_MAX = float(os.getenv("ML_BACKOFF_MAX", "30"))
+
+# Circuit breaker: falhas seguidas até pausar o host, e por quanto tempo
+CIRCUIT_FAILURES = int(os.getenv("ML_CIRCUIT_FAILURES", "5"))
+CIRCUIT_COOLDOWN = float(os.getenv("ML_CIRCUIT_COOLDOWN", "60"))
+
+# Cota da API de IA (Gemini): requisições e tokens por minuto
+GEMINI_RPM = int(os.getenv("ML_GEMINI_RPM", "15"))
+GEMINI_TPM = int(os.getenv("ML_GEMINI_TPM", "1000000"))
+
+# Resultado de uma requisição, do ponto de vista do controle adaptativo
+SUCCESS = "success"
+THROTTLED = "throttled"
+FAILED = "failed"
+
+
+class ThrottledError(Exception):
+    """O site continuou limitando (429/403/desafio) depois de todas as tentativas."""
+
+
+class TokenBucket:
+    """
+    Token bucket simples: 'rate' tokens por segundo, até 'burst' acumulados.
+    Funciona tanto em código assíncrono (acquire) quanto síncrono (acquire_blocking),
+    pois o estado é protegido por um lock de thread e não depende do event loop.
+    """
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = max(int(burst), 1)
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate):
+        with self._lock:
+            self.rate = float(rate)
+
+    def _reserve(self, amount=1):
+        """Reserva 'amount' tokens e retorna quanto tempo esperar até eles estarem disponíveis."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    async def acquire(self, amount=1):
+        wait = self._reserve(amount)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_blocking(self, amount=1):
+        wait = self._reserve(amount)
+        if wait > 0:
+            time.sleep(wait)
+
+    def charge(self, amount):
+        """Ajusta o saldo sem esperar (ex: custo real maior/menor que o estimado)."""
+        self._reserve(amount)
+
+
+class HostRateLimiter:
+    """Mantém um token bucket por host, criado sob demanda."""
+    def __init__(self, rate=DEFAULT_REQUESTS_PER_SECOND, burst=DEFAULT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket_for(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+                self._buckets[host] = bucket
+            return bucket
+
+    async def acquire(self, url):
+        await self.bucket_for(url).acquire()
+
+    def acquire_blocking(self, url):
+        self.bucket_for(url).acquire_blocking()
+
+
+class QuotaLimiter:
+    """
+    Cota por minuto de uma API paga por requisição e por token (Gemini):
+    um token bucket de requisições (RPM) e outro de tokens (TPM).
+    Cada chamada reserva 1 requisição e uma estimativa dos tokens; depois,
+    charge_tokens() acerta a diferença com o consumo real informado pela API.
+    """
+    def __init__(self, rpm=GEMINI_RPM, tpm=GEMINI_TPM):
+        # Até um quarto da cota de uma vez; o resto é distribuído ao longo do minuto
+        self.requests = TokenBucket(rpm / 60.0, burst=max(1, rpm // 4))
+        self.tokens = TokenBucket(tpm / 60.0, burst=max(1, tpm // 4))
+
+    def acquire_blocking(self, tokens):
+        self.requests.acquire_blocking()
+        self.tokens.acquire_blocking(tokens)
+
+    def charge_tokens(self, tokens):
+        self.tokens.charge(tokens)
+
+
+def backoff_delay(attempt, retry_after=None):
+    """
+    Espera antes da próxima tentativa: exponencial com jitter
+    (base * 2^tentativa * [0.5, 1.5)), respeitando o Retry-After do servidor.
+    """
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)) * random.uniform(0.5, 1.5)
+    try:
+        delay = max(delay, float(retry_after))
+    except (TypeError, ValueError):
+        pass
+    return min(delay, BACKOFF_MAX)
+
+
+class AdaptiveController:
+    """
+    Controle AIMD de concorrência e taxa para um host.
+    Sinal de limitação (429, 403 persistente, página de desafio) corta a
+    concorrência e a taxa do token bucket pela metade; cada sucesso soma
+    1/limite (≈ +1 por "janela"), voltando até o teto configurado.
+    O corte vale uma vez por janela: acquire() devolve a janela em que a
+    requisição saiu, e limitações de requisições que já estavam em voo antes
+    do último corte (ex: uma rajada de 429 simultâneos) não cortam de novo.
+    Após CIRCUIT_FAILURES falhas seguidas o circuito abre e o host fica
+    pausado por CIRCUIT_COOLDOWN segundos; depois disso passa uma requisição
+    de teste por vez (sucesso fecha o circuito, falha reabre).
+    """
+    def __init__(self, bucket, max_limit=DEFAULT_MAX_CONCURRENCY, max_rate=DEFAULT_REQUESTS_PER_SECOND,
+                 min_limit=1, min_rate=0.1, failure_threshold=CIRCUIT_FAILURES, cooldown=CIRCUIT_COOLDOWN):
+        self.bucket = bucket
+        self.max_limit = max(int(max_limit), 1)
+        self.max_rate = max_rate
+        self.min_limit = min_limit
+        self.min_rate = min_rate
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        # Janela atual: avança a cada corte
+        self.window = 0
+        self.counters = {"successes": 0, "throttled": 0, "failed": 0, "circuit_opens": 0}
+        self._lock = threading.Lock()
+
+    def _try_acquire(self):
+        """
+        Ocupa uma vaga se possível e retorna (0.0, janela); senão (quanto
+        esperar antes de tentar de novo, None).
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self.open_until:
+                return self.open_until - now, None
+            if self.consecutive_failures >= self.failure_threshold and self.in_flight > 0:
+                # Circuito "meio aberto": uma requisição de teste por vez
+                return 0.05, None
+            if self.in_flight < max(int(self.limit), self.min_limit):
+                self.in_flight += 1
+                return 0.0, self.window
+            return 0.05, None
+
+    async def acquire(self):
+        """Espera uma vaga; retorna a janela, a ser passada para release()."""
+        while True:
+            wait, window = self._try_acquire()
+            if wait == 0.0:
+                return window
+            await asyncio.sleep(wait)
+
+    def acquire_blocking(self):
+        while True:
+            wait, window = self._try_acquire()
+            if wait == 0.0:
+                return window
+            time.sleep(wait)
+
+    def release(self, outcome=None, window=None):
+        """
+        Libera a vaga e ajusta os limites conforme o resultado (None = neutro).
+        'window' é o valor devolvido por acquire(); sem ele, toda limitação corta.
+        """
+        with self._lock:
+            self.in_flight -= 1
+            if outcome == SUCCESS:
+                self.counters["successes"] += 1
+                self.consecutive_failures = 0
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                rate = self.bucket.rate
+                self.bucket.set_rate(min(self.max_rate, rate + self.max_rate / (10 * self.limit)))
+            elif outcome in (THROTTLED, FAILED):
+                self.counters[outcome] += 1
+                self.consecutive_failures += 1
+                if outcome == THROTTLED and (window is None or window == self.window):
+                    self.window += 1
+                    old_limit = int(self.limit)
+                    self.limit = max(float(self.min_limit), self.limit / 2)
+                    self.bucket.set_rate(max(self.min_rate, self.bucket.rate / 2))
+                    print(f"    (Limitado pelo site: concorrência {old_limit} -> {int(self.limit)}, "
+                          f"taxa {self.bucket.rate:.2f} req/s)")
+                if self.consecutive_failures >= self.failure_threshold:
+                    self.open_until = time.monotonic() + self.cooldown
+                    self.counters["circuit_opens"] += 1
+                    print(f"    (Circuito aberto: host pausado por {self.cooldown:.0f}s "
+                          f"após {self.consecutive_failures} falhas seguidas)")
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "concurrency": int(self.limit),
+                "rate": round(self.bucket.rate, 2),
+                "in_flight": self.in_flight,
+                "circuit_open": time.monotonic() < self.open_until,
+                **self.counters,
+            }
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+_controllers = {}
+
+
+def get_rate_limiter():
+    """Limitador de taxa do processo (compartilhado por todas as buscas)."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = HostRateLimiter()
+        return _limiter
+
+
+def get_controller(url):
+    """Controle adaptativo do host da URL (compartilhado pelo processo)."""
+    host = urlsplit(url).netloc
+    with _limiter_lock:
+        controller = _controllers.get(host)
+    if controller is not None:
+        return controller
+
+    limiter = get_rate_limiter()
+    with _limiter_lock:
+        controller = _controllers.get(host)
+        if controller is None:
+            controller = AdaptiveController(limiter.bucket_for(url), max_rate=limiter.rate)
+            _controllers[host] = controller
+        return controller
+
+
+def controller_stats():
+    """Estado atual por host: concorrência, taxa, eventos de limitação e circuito."""
+    with _limiter_lock:
+        controllers = dict(_controllers)
+    return {host: controller.snapshot() for host, controller in controllers.items()}
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import threading
+import httpx
+import requests
+from requests.adapters import BaseAdapter
+from http_cache import normalize_url
+
+# Gravação/reprodução de páginas de listagem (via .env)
+# ML_RECORD_DIR: salva cada página baixada nesse diretório
+# ML_REPLAY_DIR: serve as páginas desse diretório em vez de acessar o site
+RECORD_DIR = os.getenv("ML_RECORD_DIR") or None
+REPLAY_DIR = os.getenv("ML_REPLAY_DIR") or None
+
+INDEX_FILE = "index.json"
+
+
+class ReplayStore:
+    """
+    Diretório de páginas gravadas: um .html por URL e um index.json
+    (URL normalizada -> arquivo), fácil de inspecionar e versionar.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._index = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self, url, html):
+        key = normalize_url(url)
+        filename = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16] + ".html"
+        with open(os.path.join(self.directory, filename), "w", encoding="utf-8") as f:
+            f.write(html)
+
+        with self._lock:
+            self._index[key] = filename
+            with open(os.path.join(self.directory, INDEX_FILE), "w", encoding="utf-8") as f:
+                json.dump(self._index, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+    def load(self, url):
+        """HTML gravado para a URL, ou None."""
+        filename = self._index.get(normalize_url(url))
+        if filename is None:
+            return None
+        with open(os.path.join(self.directory, filename), "r", encoding="utf-8") as f:
+            return f.read()
+
+    def urls(self):
+        return list(self._index)
+
+
+def _replay_body(store, url):
+    """(status, corpo) para a URL: 200 com a página gravada ou 404."""
+    html = store.load(url)
+    if html is None:
+        return 404, b"Nao gravado"
+    return 200, html.encode("utf-8")
+
+
+class ReplayAdapter(BaseAdapter):
+    """Adapter do requests que responde com as páginas gravadas (sem rede)."""
+    def __init__(self, store):
+        super().__init__()
+        self.store = store
+
+    def send(self, request, **kwargs):
+        status, body = _replay_body(self.store, request.url)
+        response = requests.Response()
+        response.status_code = status
+        response.url = request.url
+        response.request = request
+        response.headers["Content-Type"] = "text/html; charset=utf-8"
+        response.encoding = "utf-8"
+        response._content = body
+        response.raw = _RawBody(len(body))
+        return response
+
+    def close(self):
+        pass
+
+
+class _RawBody:
+    """Substituto mínimo de response.raw (transfer_stats lê raw.tell())."""
+    def __init__(self, size):
+        self._size = size
+
+    def tell(self):
+        return self._size
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Transport do httpx que responde com as páginas gravadas (sem rede)."""
+    def __init__(self, store):
+        self.store = store
+
+    async def handle_async_request(self, request):
+        status, body = _replay_body(self.store, str(request.url))
+        return httpx.Response(status, headers={"Content-Type": "text/html; charset=utf-8"},
+                              content=body, request=request)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(directory):
+    """ReplayStore compartilhado por diretório (None se directory for None)."""
+    if not directory:
+        return None
+    with _stores_lock:
+        store = _stores.get(directory)
+        if store is None:
+            store = ReplayStore(directory)
+            _stores[directory] = store
+        return store
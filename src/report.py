@@ -2,7 +2,34 @@
 import pandas as pd
 import os
 from datetime import datetime
+from io import BytesIO
 import PIL.Image
+from http_client import get_client
+from product import products_to_dataframe, COLUMNS
+from price_summary import price_summary, SUMMARY_COLUMNS
+
+# Aba com a distribuição de preços por termo e por imagem de origem
+SUMMARY_SHEET = "Resumo de Preços"
+
+def fetch_thumbnail(img_url, client=None):
+    """
+    Baixa a imagem do produto e converte para PNG (o Excel não lê WebP).
+    Retorna (bytes PNG, (largura, altura)) ou None se falhar.
+    """
+    # Reaproveita o pool de conexões do scraping (mesmo host de imagens)
+    client = client or get_client()
+    try:
+        response = client.get(img_url, stage="imagens", timeout=5)
+        if response.status_code != 200:
+            return None
+        with PIL.Image.open(BytesIO(response.content)) as img:
+            png_buffer = BytesIO()
+            img.save(png_buffer, format="PNG")
+            return png_buffer.getvalue(), img.size
+    except Exception as e:
+        print(f"Erro ao baixar imagem {img_url}: {e}")
+        return None
+
 
 class ReportGenerator:
     def __init__(self, output_dir="output"):
@@ -10,21 +37,24 @@ class ReportGenerator:
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-    def generate_excel(self, data):
+    def generate_excel(self, data, thumbnails=None):
         """
         Gera um arquivo Excel com os dados dos produtos.
-        data: Lista de dicionários
+        data: Lista de Product (ou de dicionários já com as colunas do relatório)
+        thumbnails: {url: retorno de fetch_thumbnail} já baixadas (opcional);
+        as que faltarem são baixadas aqui.
         """
         if not data:
             print("Nenhum dado para gerar relatório.")
             return None
 
-        df = pd.DataFrame(data)
+        df = products_to_dataframe(data)
         
         # Ordenar por vendas (se possível) ou preço
         if "Vendas (Aprox)" in df.columns:
             # Converter para numérico forçando erros a NaN e depois 0
-            df.loc[:, "Vendas (Aprox)"] = pd.to_numeric(df["Vendas (Aprox)"], errors='coerce').fillna(0)
+            # (sem vendas conhecidas a coluna traz "Ver no Site")
+            df["Vendas (Aprox)"] = pd.to_numeric(df["Vendas (Aprox)"], errors='coerce').fillna(0)
             df = df.sort_values(by="Vendas (Aprox)", ascending=False)
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -44,6 +74,15 @@ class ReportGenerator:
                 
                 # Ajustar largura das colunas e formatar
                 worksheet.set_column('A:Z', 20, format_center) 
+
+                if COLUMNS["price"] in df.columns:
+                    # Preço 0.0 = falha no parsing: destacado aqui e fora das estatísticas do resumo
+                    price_col_idx = df.columns.get_loc(COLUMNS["price"])
+                    worksheet.conditional_format(1, price_col_idx, len(df), price_col_idx, {
+                        'type': 'cell', 'criteria': '==', 'value': 0,
+                        'format': workbook.add_format({'bg_color': '#FFC7CE', 'font_color': '#9C0006'}),
+                    })
+                    self._write_price_summary(writer, data)
                 
                 # Encontrar índice da coluna 'Imagem URL' e 'Imagem'
                 img_url_col_idx = df.columns.get_loc("Imagem URL") if "Imagem URL" in df.columns else -1
@@ -57,57 +96,39 @@ class ReportGenerator:
                     worksheet.set_default_row(100)  # Altura em pixels (aprox)
                     worksheet.set_column(img_url_col_idx, img_url_col_idx, 30) # Largura da coluna de imagem
 
-                    import requests
-                    from io import BytesIO
-
                     for i, (idx, row) in enumerate(df.iterrows()):
                         img_url = row.get("Imagem URL")
                         if img_url:
-                            try:
-                                response = requests.get(img_url, timeout=5)
-                                if response.status_code == 200:
-                                    image_data = BytesIO(response.content)
-                                    
-                                    # Converter imagem para PNG se necessário (ex: WebP)
-                                    try:
-                                        with PIL.Image.open(image_data) as img:
-                                            # Converter para RGB se for RGBA/P para salvar como JPEG ou manter PNG
-                                            # Vamos salvar como PNG em memória para compatibilidade total
-                                            png_buffer = BytesIO()
-                                            img.save(png_buffer, format="PNG")
-                                            image_data = png_buffer
-                                    except Exception as img_err:
-                                        print(f"Erro ao converter imagem, tentando usar original: {img_err}")
-                                        image_data.seek(0) # Resetar ponteiro se falhar
-
-                                    # Inserir imagem na célula (Compatibilidade com versões antigas do Excel)
-                                    # Usamos insert_image com redimensionamento calculado para caber na célula
-                                    
-                                    # Definir tamanho da célula em pixels (aproximado)
-                                    # Altura 100 ~ 133px, Largura 30 ~ 210px (depende da fonte, mas é uma boa base)
-                                    cell_width_px = 210 
-                                    cell_height_px = 133
-                                    
-                                    # Obter tamanho original da imagem
-                                    img_width, img_height = img.size
-                                    
-                                    # Calcular fator de escala para caber na célula
-                                    x_scale = cell_width_px / img_width
-                                    y_scale = cell_height_px / img_height
-                                    
-                                    # Usar o menor fator para manter proporção e caber totalmente
-                                    scale = min(x_scale, y_scale) * 0.9 # 0.9 para deixar uma margem de 10%
-                                    
-                                    # Centralizar (opcional, requer calculo de offset, mas vamos simplificar primeiro)
-
-                                    worksheet.insert_image(i + 1, img_url_col_idx, img_url, {
-                                        'image_data': image_data,
-                                        'x_scale': scale, 
-                                        'y_scale': scale,
-                                        'object_position': 1 # Mover e redimensionar com as células
-                                    })
-                            except Exception as e:
-                                print(f"Erro ao baixar imagem {img_url}: {e}")
+                            # Miniatura já baixada pelo pipeline; senão baixa agora
+                            if thumbnails is not None and img_url in thumbnails:
+                                thumbnail = thumbnails[img_url]
+                            else:
+                                thumbnail = fetch_thumbnail(img_url)
+                            if thumbnail is None:
+                                continue
+                            png_data, (img_width, img_height) = thumbnail
+
+                            # Inserir imagem na célula (Compatibilidade com versões antigas do Excel)
+                            # Usamos insert_image com redimensionamento calculado para caber na célula
+                            
+                            # Definir tamanho da célula em pixels (aproximado)
+                            # Altura 100 ~ 133px, Largura 30 ~ 210px (depende da fonte, mas é uma boa base)
+                            cell_width_px = 210 
+                            cell_height_px = 133
+                            
+                            # Calcular fator de escala para caber na célula
+                            x_scale = cell_width_px / img_width
+                            y_scale = cell_height_px / img_height
+                            
+                            # Usar o menor fator para manter proporção e caber totalmente
+                            scale = min(x_scale, y_scale) * 0.9 # 0.9 para deixar uma margem de 10%
+
+                            worksheet.insert_image(i + 1, img_url_col_idx, img_url, {
+                                'image_data': BytesIO(png_data),
+                                'x_scale': scale, 
+                                'y_scale': scale,
+                                'object_position': 1 # Mover e redimensionar com as células
+                            })
 
             print(f"Relatório gerado com sucesso: {filepath}")
             return filepath
@@ -115,6 +136,33 @@ class ReportGenerator:
             print(f"Erro ao gerar Excel: {e}")
             return None
 
+    @staticmethod
+    def _write_price_summary(writer, data):
+        """Aba SUMMARY_SHEET: tabela por termo e, abaixo dela, por imagem de origem."""
+        workbook = writer.book
+        format_currency = workbook.add_format({'num_format': 'R$ #,##0.00'})
+        format_percent = workbook.add_format({'num_format': '0%'})
+        row = 0
+        for by in ("query", "source_image"):
+            summary = price_summary(data, by=by)
+            if summary.empty:
+                continue
+            summary.to_excel(writer, index=False, sheet_name=SUMMARY_SHEET, startrow=row)
+            row += len(summary) + 2
+
+        worksheet = writer.sheets.get(SUMMARY_SHEET)
+        if worksheet is None:
+            return
+        # Coluna 0 é o termo/imagem; as demais seguem SUMMARY_COLUMNS
+        worksheet.set_column(0, 0, 40)
+        worksheet.set_column(1, len(SUMMARY_COLUMNS), 14)
+        for name in ("Mínimo", "P25", "Mediana", "P75", "Média sem outliers"):
+            col = SUMMARY_COLUMNS.index(name) + 1
+            worksheet.set_column(col, col, 14, format_currency)
+        for name in ("% Full", "% Flex"):
+            col = SUMMARY_COLUMNS.index(name) + 1
+            worksheet.set_column(col, col, 10, format_percent)
+
 if __name__ == "__main__":
     # Teste
     gen = ReportGenerator(output_dir="../../output") # Ajuste path relativo para teste
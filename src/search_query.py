@@ -0,0 +1,70 @@
+import re
+import threading
+import unicodedata
+from concurrent.futures import Future
+
+_SPACES = re.compile(r"\s+")
+_SLUG_SEPARATORS = re.compile(r"[^a-z0-9]+")
+
+
+def fold_accents(text):
+    """Remove acentos/diacríticos ("Lâmpada" -> "Lampada")."""
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def normalize_query(term):
+    """
+    Forma canônica de um termo de busca: sem acentos, minúsculo e com
+    espaços colapsados. " JBL  Flip 6 " e "jbl flip 6" viram a mesma chave.
+    """
+    return _SPACES.sub(" ", fold_accents(term).lower()).strip()
+
+
+def query_slug(term):
+    """Slug usado na URL de listagem ("Lâmpada LED WJ-L2" -> "lampada-led-wj-l2")."""
+    return _SLUG_SEPARATORS.sub("-", normalize_query(term)).strip("-")
+
+
+class SearchRun:
+    """
+    Deduplicação de buscas dentro de uma execução.
+    Cada termo normalizado é buscado uma única vez: quem chega enquanto a busca
+    está em andamento espera o mesmo Future (single-flight) e quem chega depois
+    reaproveita o resultado. Funciona entre threads e event loops diferentes.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.stats = {"requested": 0, "fetched": 0, "coalesced": 0, "reused": 0}
+
+    def claim(self, key):
+        """
+        Retorna (future, is_owner). Se is_owner, o chamador deve executar a busca
+        e publicar o resultado com resolve()/fail(); senão só aguarda o future.
+        """
+        with self._lock:
+            self.stats["requested"] += 1
+            future = self._entries.get(key)
+            if future is None:
+                future = Future()
+                self._entries[key] = future
+                self.stats["fetched"] += 1
+                return future, True
+
+            if future.done():
+                self.stats["reused"] += 1
+            else:
+                self.stats["coalesced"] += 1
+            return future, False
+
+    def resolve(self, key, result):
+        self._entries[key].set_result(result)
+
+    def fail(self, key, error):
+        """Falha não fica memorizada: a próxima chamada tenta de novo."""
+        with self._lock:
+            future = self._entries.pop(key)
+        future.set_exception(error)
@@ -1,7 +1,11 @@
 
-from src.analysis_ai import analyze_image
 import os
+import sys
 import glob
+# Os módulos de src/ se importam pelo nome (layout plano), como em tests/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
+
+from src.analysis_ai import analyze_image
 
 def test():
     files = glob.glob("input/*.png")
@@ -0,0 +1,272 @@
+import os
+import sys
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import threading
+import time
+import PIL.Image
+import analysis_ai
+import keyword_cache
+import rate_limit
+from analysis_ai import (GeminiAnalyzer, analyze_images, is_model_error, is_retryable_error, is_transient_error,
+                         retry_delay_hint)
+from rate_limit import QuotaLimiter
+from model_stats import ModelStats
+
+
+class FakeModel:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeResponse:
+    text = '{"keywords": ["jbl flip 6", "caixa de som jbl", "jbl flip 6 preta"]}'
+
+
+class QuotaError(Exception):
+    """Mesmo formato do google.genai.errors.ClientError para 429."""
+    code = 429
+
+    def __init__(self):
+        super().__init__("429 RESOURCE_EXHAUSTED. {'retryDelay': '0s'}")
+
+
+class ServerError(Exception):
+    """Mesmo formato do google.genai.errors.ServerError para 500."""
+    code = 500
+
+    def __init__(self):
+        super().__init__("500 INTERNAL. An internal error has occurred.")
+
+
+class FakeModels:
+    """Simula client.models: conta listagens e chamadas, com modelos que falham."""
+    def __init__(self, broken=(), quota_errors=0, latency=0.0):
+        self.broken = set(broken)
+        self.quota_errors = quota_errors
+        self.server_errors = 0
+        self.latency = latency
+        self.list_calls = 0
+        self.generate_calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def list(self):
+        self.list_calls += 1
+        return [FakeModel("models/gemini-2.5-flash"), FakeModel("models/gemini-2.0-flash"),
+                FakeModel("models/gemini-2.5-pro"), FakeModel("models/embedding-001")]
+
+    def generate_content(self, model, contents):
+        with self._lock:
+            self.generate_calls.append(model)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            quota_error = self.quota_errors > 0
+            self.quota_errors -= 1
+            server_error = self.server_errors > 0
+            self.server_errors -= 1
+        try:
+            time.sleep(self.latency)
+            if quota_error:
+                raise QuotaError()
+            if server_error:
+                raise ServerError()
+            if model in self.broken:
+                raise RuntimeError("404 model not found")
+            return FakeResponse()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+class FakeClient:
+    def __init__(self, broken=(), quota_errors=0, latency=0.0):
+        self.models = FakeModels(broken, quota_errors, latency)
+
+
+def make_analyzer(client, cache_path, **kwargs):
+    """Analisador sem espera de cota (limites altos)."""
+    kwargs.setdefault("model_stats", ModelStats(os.path.join(os.path.dirname(cache_path), "model_stats.json")))
+    kwargs.setdefault("quota", QuotaLimiter(rpm=60000, tpm=10 ** 9))
+    return GeminiAnalyzer(client=client, cache_path=cache_path, **kwargs)
+
+
+def make_image(tmp):
+    path = os.path.join(tmp, "produto.png")
+    PIL.Image.new("RGB", (8, 8), "red").save(path)
+    return path
+
+
+def test_model_discovered_once_per_batch():
+    with tempfile.TemporaryDirectory() as tmp:
+        image = make_image(tmp)
+        client = FakeClient(broken={"models/gemini-2.5-flash"})
+        analyzer = make_analyzer(client, os.path.join(tmp, "model.json"))
+
+        for _ in range(5):
+            assert analyzer.analyze(image)[0] == "jbl flip 6"
+
+        assert client.models.list_calls == 1
+        # 1 falha na descoberta + 5 chamadas no modelo escolhido
+        assert client.models.generate_calls.count("models/gemini-2.0-flash") == 5
+        assert analyzer.model == "models/gemini-2.0-flash"
+
+
+def test_persisted_model_skips_discovery_until_it_fails():
+    with tempfile.TemporaryDirectory() as tmp:
+        image = make_image(tmp)
+        cache_path = os.path.join(tmp, "model.json")
+        make_analyzer(FakeClient(), cache_path).analyze(image)
+
+        # Nova execução: lê o modelo do disco, sem listar
+        client = FakeClient()
+        analyzer = make_analyzer(client, cache_path)
+        analyzer.analyze(image)
+        assert client.models.list_calls == 0
+        assert analyzer.stats["cache_hits"] == 1
+
+        # O modelo salvo passa a falhar: redescobre e troca
+        client.models.broken.add("models/gemini-2.5-flash")
+        assert analyzer.analyze(image)
+        assert client.models.list_calls == 1
+        assert analyzer.model == "models/gemini-2.0-flash"
+
+        # TTL vencido também força nova descoberta
+        expired = make_analyzer(FakeClient(), cache_path, cache_ttl=-1)
+        expired.analyze(image)
+        assert expired.stats["discoveries"] == 1
+
+
+def test_failed_model_is_skipped_in_next_run():
+    with tempfile.TemporaryDirectory() as tmp:
+        image = make_image(tmp)
+        cache_path = os.path.join(tmp, "model.json")
+        first_run = make_analyzer(FakeClient(broken={"models/gemini-2.5-flash"}), cache_path)
+        first_run.analyze(image)
+        # Fim da execução (como no main): grava o histórico pendente
+        first_run.model_stats.flush()
+
+        # Próxima execução (sem modelo salvo): o modelo que falhou está em cooldown
+        client = FakeClient()
+        analyzer = make_analyzer(client, cache_path, cache_ttl=-1)
+        assert analyzer.analyze(image)[0] == "jbl flip 6"
+        assert "models/gemini-2.5-flash" not in client.models.generate_calls
+        assert analyzer.stats["skipped_models"] == 1
+        assert analyzer.model_stats.records["models/gemini-2.0-flash"].successes == 2
+
+
+def test_quota_errors_are_retried_without_rediscovery():
+    assert is_retryable_error(QuotaError()) and retry_delay_hint(QuotaError()) == 0.0
+    assert not is_retryable_error(RuntimeError("404 model not found"))
+
+    saved_base = rate_limit.BACKOFF_BASE
+    rate_limit.BACKOFF_BASE = 0.01
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            image = make_image(tmp)
+            client = FakeClient(quota_errors=2)
+            analyzer = make_analyzer(client, os.path.join(tmp, "model.json"))
+
+            assert analyzer.analyze(image)[0] == "jbl flip 6"
+            assert analyzer.stats["retries"] == 2
+            assert analyzer.stats["model_errors"] == 0
+            assert client.models.list_calls == 1
+            # O modelo da primeira tentativa (sem cota) continuou sendo o escolhido
+            assert set(client.models.generate_calls) == {"models/gemini-2.5-flash"}
+    finally:
+        rate_limit.BACKOFF_BASE = saved_base
+
+
+def test_transient_error_is_retried_without_cooldown():
+    assert is_transient_error(ServerError()) and is_transient_error(TimeoutError("read timed out"))
+    assert not is_model_error(ServerError()) and is_model_error(RuntimeError("404 model not found"))
+
+    saved_base = rate_limit.BACKOFF_BASE
+    rate_limit.BACKOFF_BASE = 0.01
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            image = make_image(tmp)
+            client = FakeClient()
+            analyzer = make_analyzer(client, os.path.join(tmp, "model.json"))
+            assert analyzer.analyze(image)
+
+            # Um 500 no modelo escolhido: nova tentativa nele, sem redescobrir nem cooldown
+            client.models.server_errors = 1
+            assert analyzer.analyze(image)[0] == "jbl flip 6"
+            assert analyzer.stats["retries"] == 1 and analyzer.stats["model_errors"] == 0
+            assert client.models.list_calls == 1
+            assert set(client.models.generate_calls) == {"models/gemini-2.5-flash"}
+            record = analyzer.model_stats.records["models/gemini-2.5-flash"]
+            assert record.failures == 1
+            assert not analyzer.model_stats.in_cooldown("models/gemini-2.5-flash")
+    finally:
+        rate_limit.BACKOFF_BASE = saved_base
+
+
+class CountingQuota(QuotaLimiter):
+    """Cota sem espera que registra as reservas e os acertos de tokens."""
+    def __init__(self):
+        super().__init__(rpm=60000, tpm=10 ** 9)
+        self.acquired = []
+        self.charged = []
+
+    def acquire_blocking(self, tokens):
+        self.acquired.append(tokens)
+        super().acquire_blocking(tokens)
+
+    def charge_tokens(self, tokens):
+        self.charged.append(tokens)
+        super().charge_tokens(tokens)
+
+
+def test_quota_is_charged_per_api_call():
+    with tempfile.TemporaryDirectory() as tmp:
+        image = make_image(tmp)
+        # Descoberta: o primeiro candidato falha, o segundo responde -> duas chamadas reais
+        client = FakeClient(broken={"models/gemini-2.5-flash"})
+        quota = CountingQuota()
+        analyzer = make_analyzer(client, os.path.join(tmp, "model.json"), quota=quota)
+
+        assert analyzer.analyze(image)[0] == "jbl flip 6"
+        assert len(client.models.generate_calls) == 2
+        assert len(quota.acquired) == 2 and quota.acquired[0] > 0
+        # A chamada que falhou devolve os tokens estimados
+        assert quota.charged == [-quota.acquired[0]]
+
+
+def test_analyze_images_runs_concurrently_and_yields_all():
+    with tempfile.TemporaryDirectory() as tmp:
+        images = []
+        for i in range(6):
+            path = os.path.join(tmp, f"produto{i}.png")
+            PIL.Image.new("RGB", (8, 8), (i * 40, 0, 0)).save(path)
+            images.append(path)
+
+        client = FakeClient(latency=0.05)
+        had_key = "GEMINI_API_KEY" in os.environ
+        os.environ.setdefault("GEMINI_API_KEY", "teste")
+        saved = analysis_ai._analyzer
+        analysis_ai._analyzer = make_analyzer(client, os.path.join(tmp, "model.json"))
+        try:
+            results = dict(analyze_images(images, contexts="caixa de som", max_workers=3, use_cache=False))
+        finally:
+            analysis_ai._analyzer = saved
+            if not had_key:
+                del os.environ["GEMINI_API_KEY"]
+
+        assert sorted(results) == sorted(images)
+        assert all(keywords[0] == "jbl flip 6" for keywords in results.values())
+        assert 1 < client.models.max_in_flight <= 3
+
+
+if __name__ == "__main__":
+    test_model_discovered_once_per_batch()
+    test_persisted_model_skips_discovery_until_it_fails()
+    test_failed_model_is_skipped_in_next_run()
+    test_quota_errors_are_retried_without_rediscovery()
+    test_transient_error_is_retried_without_cooldown()
+    test_quota_is_charged_per_api_call()
+    test_analyze_images_runs_concurrently_and_yields_all()
+    print("Analyzer OK")
@@ -0,0 +1,136 @@
+import os
+import random
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from product import Product, Logistics, Condition
+from data_processing import (DataProcessor, FilterStrategy, ConditionFilter, NegativeKeywordFilter,
+                             LogisticsFilter, ProductBatch)
+
+WORDS = ["JBL", "Flip", "6", "Capa", "Película", "Cabo", "Preta", "Suporte", "Original", "CAPINHA"]
+
+
+def make_products(rows, seed=1):
+    rng = random.Random(seed)
+    return [
+        Product("jbl", " ".join(rng.choices(WORDS, k=5)), float(i),
+                logistics=rng.choice(list(Logistics)), condition=rng.choice(list(Condition)))
+        for i in range(rows)
+    ]
+
+
+def make_processor(mode, *filters):
+    processor = DataProcessor(mode=mode)
+    for f in filters:
+        processor.add_filter(f)
+    return processor
+
+
+def test_columnar_matches_list_path():
+    products = make_products(500)
+    filters = [ConditionFilter("Novo"), NegativeKeywordFilter(["capa", "película", "cabo"]),
+               LogisticsFilter(["Full", "flex"])]
+    expected = make_processor("list", *filters).process(products)
+    result = make_processor("columnar", *filters).process(products)
+    assert result == expected
+    assert 0 < len(result) < len(products)
+
+
+def test_batch_columns_are_computed_once():
+    batch = ProductBatch(make_products(20))
+    assert batch.lower("title") is batch.lower("title")
+    assert list(batch.column("logistics").cat.categories) == [m.value for m in Logistics]
+    assert batch.select([i % 2 == 0 for i in range(20)]) == batch.products[::2]
+
+
+def test_filter_without_mask_falls_back_to_apply():
+    class CheapFilter(FilterStrategy):
+        def apply(self, data):
+            return [item for item in data if item.price < 100]
+
+    products = make_products(300)
+    processor = make_processor("columnar", CheapFilter(), ConditionFilter("Novo"))
+    assert processor.process(products) == make_processor("list", CheapFilter(), ConditionFilter("Novo")).process(products)
+
+
+def test_auto_mode_switches_on_batch_size():
+    processor = DataProcessor(mode="auto", columnar_min_rows=100)
+    assert not processor._use_columnar(10)
+    assert processor._use_columnar(100)
+    assert DataProcessor(mode="list")._use_columnar(10 ** 6) is False
+    # Lote já em colunas sempre vai pelo caminho vetorizado
+    processor.add_filter(ConditionFilter("Usado"))
+    batch = ProductBatch(make_products(10))
+    assert all(p.condition is Condition.USADO for p in processor.process(batch))
+    assert processor.process([]) == []
+
+
+class SlowPassFilter(FilterStrategy):
+    """Caro e quase nunca remove nada: deveria ir para o fim do plano."""
+    def apply(self, data):
+        return [item for item in data if self.predicate()(item)]
+
+    def predicate(self):
+        def keep(item):
+            sum(range(300))
+            return item.price >= 0
+        return keep
+
+
+def test_fused_pass_matches_sequential_filters():
+    products = make_products(400)
+    filters = [SlowPassFilter(), LogisticsFilter(["full"]), NegativeKeywordFilter(["capa", "cabo"]),
+               ConditionFilter("Novo")]
+    expected = products
+    for f in filters:
+        expected = f.apply(expected)
+    processor = make_processor("list", *filters)
+    for _ in range(3):
+        assert processor.process(products) == expected
+
+
+def test_planner_moves_cheap_selective_filters_first():
+    processor = DataProcessor(mode="list", profile_every=1)
+    slow, condition = SlowPassFilter(), ConditionFilter("Novo")
+    processor.add_filter(slow)
+    processor.add_filter(condition)
+    products = make_products(200)
+    processor.process(products)
+    assert processor.plan() == [condition, slow]
+    # Sem reordenação a ordem de cadastro fica
+    fixed = DataProcessor(mode="list", reorder=False, profile_every=1)
+    fixed.add_filter(slow)
+    fixed.add_filter(condition)
+    fixed.process(products)
+    assert fixed.plan() == [slow, condition]
+
+
+def test_filter_stats_count_drops_in_both_modes():
+    products = make_products(600)
+    filters = [ConditionFilter("Novo"), NegativeKeywordFilter(["capa", "película"]), LogisticsFilter(["Full"])]
+    by_mode = {}
+    for mode in ("list", "columnar"):
+        processor = DataProcessor(mode=mode, reorder=False)
+        for f in filters:
+            processor.add_filter(f)
+        kept = processor.process(products)
+        stats = processor.filter_stats()
+        assert stats[0]["vistos"] == len(products)
+        assert sum(s["removidos"] for s in stats) + len(kept) == len(products)
+        # Cada filtro vê só o que sobrou do anterior
+        assert stats[1]["vistos"] == stats[0]["vistos"] - stats[0]["removidos"]
+        assert all(s["us_por_item"] is not None for s in stats)
+        by_mode[mode] = [(s["vistos"], s["removidos"]) for s in stats]
+    assert by_mode["list"] == by_mode["columnar"]
+    assert processor.summary()[0].startswith("Condição = Novo: 600 vistos")
+
+
+if __name__ == "__main__":
+    test_columnar_matches_list_path()
+    test_batch_columns_are_computed_once()
+    test_filter_without_mask_falls_back_to_apply()
+    test_auto_mode_switches_on_batch_size()
+    test_fused_pass_matches_sequential_filters()
+    test_planner_moves_cheap_selective_filters_first()
+    test_filter_stats_count_drops_in_both_modes()
+    print("Data processing OK")
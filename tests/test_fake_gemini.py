@@ -0,0 +1,75 @@
+import os
+import sys
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import PIL.Image
+import analysis_ai
+import fake_gemini
+import rate_limit
+from analysis_ai import GeminiAnalyzer, get_analyzer, is_retryable_error
+from fake_gemini import FakeAPIError, FakeGeminiClient
+from model_stats import ModelStats
+from rate_limit import QuotaLimiter
+
+
+def make_analyzer(client, tmp):
+    return GeminiAnalyzer(client=client, cache_path=os.path.join(tmp, "model.json"),
+                          quota=QuotaLimiter(rpm=60000, tpm=10 ** 9),
+                          model_stats=ModelStats(os.path.join(tmp, "model_stats.json")))
+
+
+def make_image(tmp, name, color):
+    path = os.path.join(tmp, name)
+    PIL.Image.new("RGB", (16, 16), color).save(path)
+    return path
+
+
+def test_canned_keywords_are_deterministic_per_image():
+    keywords = [["a 1", "a 2"], ["b 1", "b 2"], ["c 1", "c 2"]]
+    with tempfile.TemporaryDirectory() as tmp:
+        analyzer = make_analyzer(FakeGeminiClient(keywords=keywords, latency=0), tmp)
+        red, blue = make_image(tmp, "red.png", "red"), make_image(tmp, "blue.png", "blue")
+        first = analyzer.analyze(red)
+        assert first in keywords
+        assert analyzer.analyze(red) == first
+        assert analyzer.analyze(blue) in keywords
+
+
+def test_injected_errors_follow_analyzer_policy():
+    saved_base = rate_limit.BACKOFF_BASE
+    rate_limit.BACKOFF_BASE = 0.0
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            image = make_image(tmp, "red.png", "red")
+            # Todas as chamadas dão 429: tenta até o limite e desiste, sem trocar de modelo
+            client = FakeGeminiClient(latency=0, quota_error_rate=1.0, retry_delay=0)
+            analyzer = make_analyzer(client, tmp)
+            assert analyzer.analyze(image) == []
+            assert client.models.stats["quota_errors"] == analyzer.max_attempts
+            assert analyzer.stats["model_errors"] == 0
+
+            # Modelo quebrado (404) fica de fora; o próximo responde
+            client = FakeGeminiClient(latency=0, broken={"models/gemini-2.5-flash"})
+            analyzer = make_analyzer(client, tmp)
+            assert analyzer.analyze(image)
+            assert analyzer.model == "models/gemini-2.0-flash"
+    finally:
+        rate_limit.BACKOFF_BASE = saved_base
+
+    assert is_retryable_error(FakeAPIError(429, "RESOURCE_EXHAUSTED"))
+    assert not is_retryable_error(FakeAPIError(500, "INTERNAL"))
+
+
+def test_get_analyzer_uses_fake_without_api_key(monkeypatch):
+    monkeypatch.setattr(fake_gemini, "GEMINI_FAKE", True)
+    monkeypatch.setattr(analysis_ai, "_analyzer", None)
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    analyzer = get_analyzer()
+    assert isinstance(analyzer.client, FakeGeminiClient)
+
+
+if __name__ == "__main__":
+    test_canned_keywords_are_deterministic_per_image()
+    test_injected_errors_follow_analyzer_policy()
+    print("Fake Gemini OK")
@@ -0,0 +1,61 @@
+import os
+import sys
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from http_cache import ResponseCache, normalize_url
+
+
+def test_normalized_urls_share_an_entry():
+    assert normalize_url("HTTPS://Lista.MercadoLivre.com.br/jbl?b=2&a=1#frag") == \
+        "https://lista.mercadolivre.com.br/jbl?a=1&b=2"
+
+    cache = ResponseCache(tempfile.mkdtemp(), ttl=3600)
+    cache.put("https://lista.mercadolivre.com.br/jbl?b=2&a=1", "Lâmpada".encode("utf-8"), "utf-8",
+              {"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+
+    cached = cache.get("https://LISTA.mercadolivre.com.br/jbl?a=1&b=2#x")
+    assert cached.text == "Lâmpada"
+    assert cached.is_fresh(cache.ttl)
+    assert cached.validators() == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+
+
+def test_expired_entry_is_kept_for_revalidation():
+    cache = ResponseCache(tempfile.mkdtemp(), ttl=0)
+    cache.put("https://lista.mercadolivre.com.br/jbl", b"<html></html>", "utf-8", {"ETag": '"v1"'})
+
+    cached = cache.get("https://lista.mercadolivre.com.br/jbl")
+    assert not cached.is_fresh(cache.ttl)
+    assert cached.validators() == {"If-None-Match": '"v1"'}
+
+
+def test_no_store_responses_are_not_cached():
+    cache = ResponseCache(tempfile.mkdtemp())
+    cache.put("https://lista.mercadolivre.com.br/jbl", b"x", "utf-8", {"Cache-Control": "no-store"})
+    assert cache.get("https://lista.mercadolivre.com.br/jbl") is None
+
+
+def test_lru_eviction_keeps_recently_used_entries():
+    cache_dir = tempfile.mkdtemp()
+    body = os.urandom(20_000)  # incompressível: cada entrada ocupa ~20 KB
+    cache = ResponseCache(cache_dir, max_bytes=70_000)
+
+    for i in range(3):
+        cache.put(f"https://lista.mercadolivre.com.br/termo-{i}", body)
+        os.utime(cache._path(f"https://lista.mercadolivre.com.br/termo-{i}"), (i, i))
+    cache.get("https://lista.mercadolivre.com.br/termo-0")  # termo-0 passa a ser o mais recente
+
+    cache.put("https://lista.mercadolivre.com.br/termo-3", body)
+
+    assert cache.stats["evicted"] >= 1
+    assert cache.get("https://lista.mercadolivre.com.br/termo-1") is None
+    assert cache.get("https://lista.mercadolivre.com.br/termo-0") is not None
+    assert cache.get("https://lista.mercadolivre.com.br/termo-3") is not None
+
+
+if __name__ == "__main__":
+    test_normalized_urls_share_an_entry()
+    test_expired_entry_is_kept_for_revalidation()
+    test_no_store_responses_are_not_cached()
+    test_lru_eviction_keeps_recently_used_entries()
+    print("SUCCESS: response cache")
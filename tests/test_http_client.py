@@ -0,0 +1,155 @@
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+import requests
+from requests.adapters import BaseAdapter
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import http_client
+from http_client import ScrapingClient, AsyncScrapingClient, BASE_URL
+from rate_limit import AdaptiveController, TokenBucket, ThrottledError, MAX_ATTEMPTS
+
+PAGE_URL = "https://lista.mercadolivre.com.br/jbl-flip-6"
+
+
+class FakeAdapter(BaseAdapter):
+    """Responde com o status da fila de cada URL (200 quando a fila acaba) e guarda as URLs pedidas."""
+    def __init__(self, statuses=None):
+        super().__init__()
+        self.statuses = {url: list(codes) for url, codes in (statuses or {}).items()}
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        with self._lock:
+            self.calls.append(request.url)
+            queue = self.statuses.get(request.url)
+            status = queue.pop(0) if queue else 200
+        response = requests.Response()
+        response.status_code = status
+        response.url = request.url
+        response.request = request
+        response.encoding = "utf-8"
+        response._content = b"<html>ok</html>"
+        response.raw = _Raw()
+        return response
+
+    def close(self):
+        pass
+
+
+class _Raw:
+    def tell(self):
+        return 15
+
+
+def make_client(tmp, adapter):
+    # replay_dir: sem limitador de taxa nem rede; o adapter falso substitui o de replay
+    client = ScrapingClient(replay_dir=tmp)
+    client.session.mount("https://", adapter)
+    return client
+
+
+def test_cookies_are_warmed_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        adapter = FakeAdapter()
+        client = make_client(tmp, adapter)
+        for _ in range(3):
+            client.fetch_page(PAGE_URL)
+        assert adapter.calls.count(BASE_URL) == 1
+        assert client.connection_stats()["cookie_refreshes"] == 1
+
+
+def test_rejected_session_refreshes_cookies_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        adapter = FakeAdapter({PAGE_URL: [403]})
+        client = make_client(tmp, adapter)
+        assert client.fetch_page(PAGE_URL).status_code == 200
+        # home -> 403 -> home de novo -> 200
+        assert adapter.calls == [BASE_URL, PAGE_URL, BASE_URL, PAGE_URL]
+        stats = client.connection_stats()
+        assert stats["rejected"] == 1 and stats["cookie_refreshes"] == 2
+
+
+def test_request_counter_is_thread_safe():
+    with tempfile.TemporaryDirectory() as tmp:
+        client = make_client(tmp, FakeAdapter())
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda _: client.get(PAGE_URL), range(400)))
+        assert client.connection_stats()["requests"] == 400
+
+
+def test_no_backoff_after_last_attempt(monkeypatch):
+    # Controle próprio (sem circuito): os cortes daqui não afetam os outros testes
+    url = "https://limitado.exemplo.test/busca"
+    controller = AdaptiveController(TokenBucket(rate=1000, burst=1000), max_rate=1000, failure_threshold=100)
+    monkeypatch.setattr(http_client, "get_controller", lambda url: controller)
+    delays = []
+    monkeypatch.setattr(http_client, "backoff_delay", lambda attempt, retry_after=None: delays.append(attempt) or 0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        client = make_client(tmp, FakeAdapter({url: [429] * MAX_ATTEMPTS}))
+        try:
+            client.fetch_page(url)
+            assert False, "esperava ThrottledError"
+        except ThrottledError:
+            pass
+        assert delays == list(range(MAX_ATTEMPTS - 1))
+
+        delays.clear()
+        transport = httpx.MockTransport(lambda request: httpx.Response(429, request=request))
+
+        async def run():
+            async with AsyncScrapingClient(sync_client=client, transport=transport) as async_client:
+                await async_client.fetch_page(url)
+
+        try:
+            asyncio.run(run())
+            assert False, "esperava ThrottledError"
+        except ThrottledError:
+            pass
+        assert delays == list(range(MAX_ATTEMPTS - 1))
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_pool_reuses_connections():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        client = ScrapingClient()
+        url = f"http://127.0.0.1:{server.server_address[1]}/imagem"
+        for _ in range(5):
+            assert client.get(url).status_code == 200
+        stats = client.connection_stats()
+        assert stats["requests"] == 5
+        assert stats["connections_opened"] == 1 and stats["connections_reused"] == 4
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    test_cookies_are_warmed_once()
+    test_rejected_session_refreshes_cookies_once()
+    test_request_counter_is_thread_safe()
+    test_pool_reuses_connections()
+    print("HTTP client OK")
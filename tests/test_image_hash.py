@@ -0,0 +1,125 @@
+import os
+import sys
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import numpy as np
+import PIL.Image
+import PIL.ImageDraw
+import image_hash
+from image_hash import cluster_images, compute_hashes, popcount, _POPCOUNT_TABLE
+
+
+def make_product(seed, size=(800, 600)):
+    """Imagem 'de produto' sintética: fundo claro e formas coloridas em posições aleatórias."""
+    rng = np.random.default_rng(seed)
+    image = PIL.Image.new("RGB", size, (235, 235, 235))
+    draw = PIL.ImageDraw.Draw(image)
+    for _ in range(12):
+        x, y = rng.integers(0, size[0] - 200), rng.integers(0, size[1] - 200)
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        draw.ellipse((x, y, x + rng.integers(60, 200), y + rng.integers(60, 200)), fill=color)
+    return image
+
+
+def make_centered_product(kind, size=(800, 800)):
+    """Foto típica de anúncio: um produto só, centralizado em fundo branco."""
+    image = PIL.Image.new("RGB", size, (255, 255, 255))
+    draw = PIL.ImageDraw.Draw(image)
+    w, h = size
+    if kind == "garrafa":
+        draw.rounded_rectangle((w * 0.4, h * 0.15, w * 0.6, h * 0.85), radius=40, fill=(30, 90, 160))
+        draw.rectangle((w * 0.46, h * 0.08, w * 0.54, h * 0.15), fill=(20, 20, 20))
+    elif kind == "caixa de som":
+        draw.ellipse((w * 0.15, h * 0.3, w * 0.85, h * 0.7), fill=(20, 20, 20))
+        draw.ellipse((w * 0.4, h * 0.4, w * 0.6, h * 0.6), fill=(200, 40, 40))
+    elif kind == "lampada":
+        draw.ellipse((w * 0.3, h * 0.15, w * 0.7, h * 0.6), fill=(240, 210, 90))
+        draw.rectangle((w * 0.42, h * 0.6, w * 0.58, h * 0.8), fill=(120, 120, 120))
+    else:
+        draw.polygon([(w * 0.5, h * 0.2), (w * 0.8, h * 0.8), (w * 0.2, h * 0.8)], fill=(60, 140, 60))
+    return image
+
+
+def save_variants(image, tmp, name):
+    """Original, reduzida em JPEG, recorte leve em WebP."""
+    w, h = image.size
+    original = os.path.join(tmp, f"{name}.png")
+    image.save(original)
+    small = os.path.join(tmp, f"{name}_pequena.jpg")
+    image.resize((w // 2, h // 2)).save(small, quality=60)
+    crop = os.path.join(tmp, f"{name}_recorte.webp")
+    image.crop((w // 50, h // 50, w - w // 50, h - h // 50)).save(crop, quality=70)
+    return [original, small, crop]
+
+
+def group_names(clusters):
+    return sorted(sorted(os.path.basename(m).split(".")[0].split("_")[0] for m in c.members) for c in clusters)
+
+
+def test_popcount_matches_table_fallback():
+    values = np.array([0, 1, 0xFF, 2 ** 64 - 1, 0x0F0F0F0F0F0F0F0F], dtype=np.uint64)
+    as_bytes = values.reshape(-1, 1).view(np.uint8)
+    assert popcount(values).tolist() == [0, 1, 8, 64, 32]
+    assert _POPCOUNT_TABLE[as_bytes].sum(axis=1).tolist() == [0, 1, 8, 64, 32]
+
+
+def test_hashes_are_stable_for_identical_samples():
+    samples = np.random.default_rng(1).random((3, 32, 32)).astype(np.float32) * 255
+    samples[2] = samples[0]
+    hashes = compute_hashes(samples)
+    for values in hashes.values():
+        assert values[0] == values[2]
+
+
+def test_near_duplicates_are_clustered():
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for seed in range(3):
+            image = make_product(seed)
+            original = os.path.join(tmp, f"p{seed}.png")
+            image.save(original)
+            small = os.path.join(tmp, f"p{seed}_pequena.jpg")
+            image.resize((400, 300)).save(small, quality=60)
+            crop = os.path.join(tmp, f"p{seed}_recorte.webp")
+            image.crop((16, 12, 784, 588)).save(crop, quality=70)
+            paths += [original, small, crop]
+
+        clusters = cluster_images(paths)
+        assert len(clusters) == 3
+        for cluster in clusters:
+            names = sorted(os.path.basename(m) for m in cluster.members)
+            prefix = names[0].split(".")[0].split("_")[0]
+            assert all(name.startswith(prefix) for name in names) and len(names) == 3
+            # Representante é a imagem de maior resolução
+            assert cluster.representative.endswith(".png")
+
+
+def test_distinct_centered_products_are_not_merged():
+    kinds = ["garrafa", "caixa de som", "lampada", "triangulo"]
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for kind in kinds:
+            paths += save_variants(make_centered_product(kind), tmp, kind.replace(" ", "-"))
+        clusters = cluster_images(paths)
+        # Fundo branco deixa aHash/dHash quase iguais entre produtos; só o pHash separa
+        assert group_names(clusters) == sorted([name.replace(" ", "-")] * 3 for name in kinds)
+        assert all(c.representative.endswith(".png") for c in clusters)
+
+
+def test_clusters_do_not_chain_through_intermediate_images(monkeypatch):
+    # a ~ b e b ~ c, mas a e c longe: c não pode entrar no grupo de a por tabela
+    hashes = {"ahash": np.zeros(3, dtype=np.uint64), "dhash": np.zeros(3, dtype=np.uint64),
+              "phash": np.array([0, 0b1111, 0b11111111], dtype=np.uint64)}
+    monkeypatch.setattr(image_hash, "hash_images", lambda paths: (list(paths), hashes, [300, 200, 100]))
+    clusters = cluster_images(["a.jpg", "b.jpg", "c.jpg"], thresholds={"ahash": 8, "dhash": 10, "phash": 5})
+    assert [c.members for c in clusters] == [["a.jpg", "b.jpg"], ["c.jpg"]]
+    assert clusters[0].representative == "a.jpg"
+
+
+if __name__ == "__main__":
+    test_popcount_matches_table_fallback()
+    test_hashes_are_stable_for_identical_samples()
+    test_near_duplicates_are_clustered()
+    test_distinct_centered_products_are_not_merged()
+    print("Image hash OK")
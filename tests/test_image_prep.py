@@ -0,0 +1,103 @@
+import io
+import os
+import sys
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import numpy as np
+import PIL.Image
+from image_prep import prepare_image, ImagePreprocessor, PrepStats
+
+
+def save_photo(path, size, mode="RGB"):
+    rng = np.random.default_rng(0)
+    base = (rng.random((size[1] // 50, size[0] // 50, len(mode))) * 255).astype(np.uint8)
+    image = PIL.Image.fromarray(base, mode).resize(size, PIL.Image.BILINEAR)
+    exif = PIL.Image.Exif()
+    exif[0x0112] = 6  # Orientação: girar 90°
+    exif[0x010F] = "Camera Fornecedor"
+    image.save(path, exif=exif.tobytes()) if path.endswith(".jpg") else image.save(path)
+
+
+def test_large_photo_is_downscaled_and_stripped():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "foto.jpg")
+        save_photo(path, (4000, 3000))
+
+        prepared = prepare_image(path, max_edge=1024, fmt="JPEG", quality=85)
+        image = PIL.Image.open(io.BytesIO(prepared.data))
+
+        # EXIF de orientação aplicado antes de remover os metadados
+        assert image.size == (768, 1024) == prepared.size
+        assert prepared.original_size == (4000, 3000)
+        assert not image.getexif()
+        assert prepared.mime_type == "image/jpeg"
+        assert prepared.saved_bytes > 0
+
+
+def test_transparent_png_becomes_jpeg_on_white():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "recorte.png")
+        save_photo(path, (800, 800), mode="RGBA")
+
+        prepared = prepare_image(path, max_edge=512, fmt="JPEG")
+        assert PIL.Image.open(io.BytesIO(prepared.data)).mode == "RGB"
+        assert prepared.size == (512, 512)
+
+
+def test_small_image_keeps_original_when_smaller():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "mini.png")
+        PIL.Image.new("RGB", (8, 8), "red").save(path)
+
+        prepared = prepare_image(path, max_edge=1024, fmt="JPEG")
+        with open(path, "rb") as f:
+            original = f.read()
+        assert prepared.data == original and prepared.mime_type == "image/png"
+
+
+def test_preprocessor_pool_and_stats():
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(3):
+            path = os.path.join(tmp, f"foto{i}.jpg")
+            save_photo(path, (1600, 1200))
+            paths.append(path)
+
+        with ImagePreprocessor(max_workers=2) as preprocessor:
+            results = [f.result() for f in [preprocessor.submit(p) for p in paths]]
+        assert [r.path for r in results] == paths
+
+        stats = PrepStats()
+        for result in results:
+            stats.record_prep(result)
+        stats.record_api(0.5)
+        assert stats.images == 3 and stats.prepared_bytes < stats.original_bytes
+        assert "0.50s por chamada" in stats.summary()
+
+
+def test_stats_compare_latency_with_and_without_preparation():
+    with tempfile.TemporaryDirectory() as tmp:
+        big, small = os.path.join(tmp, "grande.jpg"), os.path.join(tmp, "mini.png")
+        save_photo(big, (3000, 2000))
+        PIL.Image.new("RGB", (8, 8), "red").save(small)
+        reduced, original = prepare_image(big, max_edge=512), prepare_image(small, max_edge=512)
+        assert reduced.reduced and not original.reduced
+
+        stats = PrepStats()
+        for prepared in (reduced, original):
+            stats.record_prep(prepared)
+        stats.record_api(0.4, reduced)
+        stats.record_api(1.0, original)
+        assert stats.api_latency() == (0.4, 1.0)
+        summary = stats.summary()
+        assert "por imagem)" in summary and "0.40s por imagem reduzida x 1.00s com o original" in summary
+
+
+if __name__ == "__main__":
+    test_large_photo_is_downscaled_and_stripped()
+    test_transparent_png_becomes_jpeg_on_white()
+    test_small_image_keeps_original_when_smaller()
+    test_preprocessor_pool_and_stats()
+    test_stats_compare_latency_with_and_without_preparation()
+    print("Image prep OK")
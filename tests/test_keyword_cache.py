@@ -0,0 +1,94 @@
+import os
+import sys
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import PIL.Image
+import analysis_ai
+import image_prep
+import keyword_cache
+from keyword_cache import KeywordCache, keyword_key, hash_file
+from test_analysis_ai import FakeClient, make_analyzer
+
+
+def test_get_put_and_lru_eviction():
+    cache = KeywordCache(":memory:", max_entries=2)
+    cache.put("a", ["jbl flip 6"])
+    cache.put("b", ["jbl charge 5"])
+    assert cache.get("a") == ["jbl flip 6"]  # 'a' passa a ser o mais recente
+
+    cache.put("c", ["jbl go 3"])
+    assert cache.get("b") is None
+    assert cache.get("a") == ["jbl flip 6"] and cache.get("c") == ["jbl go 3"]
+    assert cache.stats["evicted"] == 1
+    assert cache.hit_rate() == 0.75
+
+
+def test_key_depends_on_context_and_prompt_version():
+    base = keyword_key("abc", "JBL preta", "v1")
+    assert keyword_key("abc", " JBL preta ", "v1") == base
+    assert keyword_key("abc", "JBL azul", "v1") != base
+    assert keyword_key("abc", "JBL preta", "v2") != base
+
+
+def test_analyze_image_uses_cache_for_same_bytes():
+    with tempfile.TemporaryDirectory() as tmp:
+        first = os.path.join(tmp, "a.png")
+        PIL.Image.new("RGB", (8, 8), "blue").save(first)
+        # Mesma foto com outro nome
+        copy = os.path.join(tmp, "copia.png")
+        with open(first, "rb") as src, open(copy, "wb") as dst:
+            dst.write(src.read())
+        assert hash_file(first) == hash_file(copy)
+
+        client = FakeClient()
+        saved = analysis_ai._analyzer, keyword_cache._cache
+        analysis_ai._analyzer = make_analyzer(client, os.path.join(tmp, "m.json"))
+        keyword_cache._cache = KeywordCache(os.path.join(tmp, "kw.sqlite3"))
+        had_key = "GEMINI_API_KEY" in os.environ
+        os.environ.setdefault("GEMINI_API_KEY", "teste")
+        try:
+            assert analysis_ai.analyze_image(first)[0] == "jbl flip 6"
+            assert analysis_ai.analyze_image(copy)[0] == "jbl flip 6"
+            assert len(client.models.generate_calls) == 1
+
+            # Outro contexto = outra chave
+            analysis_ai.analyze_image(copy, user_context="cor azul")
+            assert len(client.models.generate_calls) == 2
+            assert keyword_cache._cache.stats["hits"] == 1
+        finally:
+            analysis_ai._analyzer, keyword_cache._cache = saved
+            if not had_key:
+                del os.environ["GEMINI_API_KEY"]
+
+
+def test_cached_images_are_not_prepared():
+    with tempfile.TemporaryDirectory() as tmp:
+        cached, new = os.path.join(tmp, "cache.png"), os.path.join(tmp, "nova.png")
+        PIL.Image.new("RGB", (8, 8), "blue").save(cached)
+        PIL.Image.new("RGB", (8, 8), "green").save(new)
+
+        saved = keyword_cache._cache, image_prep.prep_stats
+        keyword_cache._cache = KeywordCache(os.path.join(tmp, "kw.sqlite3"))
+        image_prep.prep_stats = image_prep.PrepStats()
+        try:
+            keyword_cache._cache.put(keyword_key(hash_file(cached), None, analysis_ai.PROMPT_VERSION), ["jbl"])
+            assert analysis_ai.has_cached_keywords(cached) and not analysis_ai.has_cached_keywords(new)
+            # Consulta do preparo não conta como hit/miss do cache
+            assert keyword_cache._cache.stats["hits"] == keyword_cache._cache.stats["misses"] == 0
+
+            with image_prep.ImagePreprocessor(max_workers=2) as preprocessor:
+                futures = [preprocessor.submit(p, skip=analysis_ai.has_cached_keywords) for p in (cached, new)]
+                results = [f.result() for f in futures]
+            assert results[0] is None and results[1].path == new
+            assert image_prep.prep_stats.images == 1 and image_prep.prep_stats.skipped == 1
+        finally:
+            keyword_cache._cache, image_prep.prep_stats = saved
+
+
+if __name__ == "__main__":
+    test_get_put_and_lru_eviction()
+    test_key_depends_on_context_and_prompt_version()
+    test_analyze_image_uses_cache_for_same_bytes()
+    test_cached_images_are_not_prepared()
+    print("Keyword cache OK")
@@ -0,0 +1,83 @@
+import os
+import random
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import re
+import pandas as pd
+from keyword_matcher import KeywordMatcher, build_pattern
+from data_processing import DataProcessor, NegativeKeywordFilter
+from product import Product
+
+
+def test_trie_pattern_shares_prefixes():
+    pattern = build_pattern(["capa", "capinha", "cabo", "cabos"])
+    # Prefixo comum "ca" aparece uma vez só; cada letra aceita as variantes com acento
+    assert pattern.count("[cç") == 1 and pattern.count("b") == 1
+    assert all(re.fullmatch(pattern, word) for word in ["capa", "capinha", "cabos", "cápa", "cabo"])
+    assert build_pattern([]) is None
+
+
+def test_matches_like_substring_search():
+    rng = random.Random(3)
+    alphabet = "abcde "
+    keywords = ["".join(rng.choices(alphabet[:-1], k=rng.randint(1, 4))) for _ in range(40)]
+    matcher = KeywordMatcher(keywords)
+    for _ in range(500):
+        title = "".join(rng.choices(alphabet, k=20))
+        expected = any(k in title for k in keywords)
+        assert (matcher.search(title) is not None) == expected
+
+
+def test_accents_case_and_whole_words():
+    matcher = KeywordMatcher(["Película", "cabo", "para  carro"])
+    assert matcher.search("Kit PELICULA de vidro") == "pelicula"
+    assert matcher.search("Kit Película") == "película"
+    assert KeywordMatcher(["pelicula"]).search("Kit Película") == "película"
+    assert matcher.search("Suporte Para  Carro") == "para  carro"
+    assert matcher.search("Cabochão azul") == "cabo"
+
+    whole = KeywordMatcher(["película", "cabo"], whole_word=True)
+    assert whole.search("Cabochão azul") is None
+    assert whole.search("Caboção") is None
+    assert whole.search("Cabo-USB") == "cabo"
+    assert whole.search("cabo") == "cabo"
+    assert whole.find_all("Película + cabo") == ["pelicula", "cabo"]
+
+
+def test_ligatures_are_not_accent_variants():
+    # NFKD de "ĳ"/"ǉ"/"ǌ" começa com i/l/n, mas são duas letras: não casam com "i", "l" ou "n"
+    assert KeywordMatcher(["kit"]).search("kĳt") is None
+    assert KeywordMatcher(["cabo lan"]).search("cabo ǉaǌ") is None
+    assert KeywordMatcher(["kit"]).search("kït") == "kït"
+
+
+def test_vectorized_matches_per_title():
+    titles = ["Kit Película", "Cabochão", "CABO usb", "Capa", "Fone   JBL", "", "caboção", "ção cabo"]
+    for whole_word in (False, True):
+        matcher = KeywordMatcher(["pelicula", "cabo", "fone jbl"], whole_word=whole_word)
+        column = matcher.contains(pd.Series(titles).str.lower()).tolist()
+        assert column == [matcher.search(t) is not None for t in titles]
+
+
+def test_large_lists_in_filter_modes():
+    rng = random.Random(5)
+    keywords = [f"termo{i}" for i in range(500)] + ["capa"]
+    products = [Product("q", f"Produto {rng.choice(['capa', 'termo42', 'termo4200', 'jbl'])} {i}") for i in range(300)]
+    results = []
+    for mode in ("list", "columnar"):
+        processor = DataProcessor(mode=mode)
+        processor.add_filter(NegativeKeywordFilter(keywords, whole_word=True))
+        results.append(processor.process(products))
+    assert results[0] == results[1]
+    assert {p.title.split()[1] for p in results[0]} == {"termo4200", "jbl"}
+
+
+if __name__ == "__main__":
+    test_trie_pattern_shares_prefixes()
+    test_matches_like_substring_search()
+    test_accents_case_and_whole_words()
+    test_ligatures_are_not_accent_variants()
+    test_vectorized_matches_per_title()
+    test_large_lists_in_filter_modes()
+    print("Keyword matcher OK")
@@ -0,0 +1,80 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from listing_index import extract_item_id, canonical_url, listing_key, ListingIndex, LIST_SEPARATOR
+from market_search import parse_search_results
+from product import Product
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+ITEM_URL = "https://produto.mercadolivre.com.br/MLB-2233445566-jbl-flip-6-azul-_JM"
+
+
+def test_item_id_from_listing_links():
+    assert extract_item_id(ITEM_URL + "?searchVariation=1#position=2&type=item&tracking_id=abc") == "MLB2233445566"
+    # Catálogo: o anúncio vem no pdp_filters (codificado) ou no wid do fragmento
+    assert extract_item_id("https://www.mercadolivre.com.br/jbl/p/MLB18766655"
+                           "?pdp_filters=item_id%3AMLB3344556677#position=1") == "MLB3344556677"
+    assert extract_item_id("https://www.mercadolivre.com.br/jbl/p/MLB18766655"
+                           "#polycard_client=search-nordic&wid=MLB998877&sid=search") == "MLB998877"
+    # Só o ID de catálogo: vale para ofertas de vários vendedores, não identifica o anúncio
+    assert extract_item_id("https://www.mercadolivre.com.br/jbl/p/MLB18766655") is None
+    assert extract_item_id("https://www.mercadolivre.com.br/ofertas") is None
+    assert extract_item_id("") is None
+
+
+def test_canonical_url_strips_tracking():
+    assert canonical_url(ITEM_URL + "?searchVariation=1&c_id=9#position=2&tracking_id=abc") == ITEM_URL
+    assert canonical_url("https://WWW.mercadolivre.com.br/jbl/p/MLB1?tracking_id=x&pdp_filters=item_id%3AMLB2") == \
+        "https://www.mercadolivre.com.br/jbl/p/MLB1?pdp_filters=item_id:MLB2"
+    assert canonical_url("") == ""
+
+
+def test_index_merges_terms_and_source_images():
+    index = ListingIndex()
+    first = Product("jbl flip 6", "JBL Flip 6 Azul", 599.0, link=ITEM_URL + "#position=1")
+    again = Product("caixa jbl flip 6", "JBL Flip 6 Azul", 599.0, link=ITEM_URL + "?tracking_id=z")
+
+    record, is_new = index.add(first, terms=["jbl flip 6"], sources=["a.jpg", "b.jpg"])
+    assert is_new and record is not first and record.item_id == "MLB2233445566"
+    merged, is_new = index.add(again, terms=["caixa jbl flip 6"], sources=["a.jpg"])
+    assert not is_new and merged is record
+    assert record.query == LIST_SEPARATOR.join(["jbl flip 6", "caixa jbl flip 6"])
+    assert record.source_image == LIST_SEPARATOR.join(["a.jpg", "b.jpg"])
+    # Produto original (pode ser compartilhado entre buscas) não é alterado
+    assert first.query == "jbl flip 6" and first.source_image is None
+
+    # Sem link nem ID não há como saber se é repetido: entra sempre
+    index.add(Product("x", "Sem link"))
+    index.add(Product("x", "Sem link"))
+    assert len(index) == 3 and index.products()[0] is record
+    assert index.stats == {"added": 3, "merged": 1}
+
+
+def test_catalog_offers_from_different_sellers_stay_apart():
+    catalog = "https://www.mercadolivre.com.br/jbl/p/MLB18766655"
+    index = ListingIndex()
+    _, first_new = index.add(Product("jbl", "JBL loja A", 599.0, link=catalog + "?pdp_filters=item_id%3AMLB1"))
+    _, second_new = index.add(Product("jbl", "JBL loja B", 579.0, link=catalog + "?pdp_filters=item_id%3AMLB2"))
+    assert first_new and second_new
+    # Sem o anúncio no link: chave é a URL canônica (sem rastreamento)
+    assert listing_key(Product("jbl", "JBL", 599.0, link=catalog + "?tracking_id=x")) == catalog
+
+
+def test_dom_parsing_fills_item_id_and_clean_link():
+    with open(os.path.join(FIXTURES, "listing_classic.html"), encoding="utf-8") as f:
+        products = parse_search_results(f.read(), "jbl flip 6", limit=None, mode="dom")
+    assert products[0].item_id == "MLB3344556677"
+    assert products[1].item_id == "MLB2233445566"
+    assert products[1].link == ITEM_URL
+    assert all("#" not in p.link and "tracking_id" not in p.link for p in products)
+
+
+if __name__ == "__main__":
+    test_item_id_from_listing_links()
+    test_canonical_url_strips_tracking()
+    test_index_merges_terms_and_source_images()
+    test_catalog_offers_from_different_sellers_stay_apart()
+    test_dom_parsing_fills_item_id_and_clean_link()
+    print("Listing index OK")
@@ -0,0 +1,187 @@
+import asyncio
+import os
+import sys
+import time
+import httpx
+import requests
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import http_client
+import market_search
+from http_client import AsyncScrapingClient
+from market_search import SearchSession, search_many, build_search_url, iter_search_results, PAGE_SIZE
+from search_query import SearchRun
+from rate_limit import HostRateLimiter
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+class StubCookies:
+    """Cliente síncrono mínimo: sem visita à home nem gravação/replay."""
+    def __init__(self):
+        self.session = requests.Session()
+        self.recorder = None
+        self.replay = None
+
+    def warm_cookies(self, force=False):
+        pass
+
+
+class SlowTransport(httpx.AsyncBaseTransport):
+    """Serve páginas por URL com atraso, medindo quantas ficam em andamento ao mesmo tempo."""
+    def __init__(self, pages, delay=0.05):
+        self.pages = pages
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.started = []
+
+    async def handle_async_request(self, request):
+        self.started.append((str(request.url), time.monotonic()))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        html = self.pages.get(str(request.url))
+        if html is None:
+            return httpx.Response(404, content=b"nao gravado", request=request)
+        return httpx.Response(200, headers={"Content-Type": "text/html; charset=utf-8"},
+                              content=html.encode("utf-8"), request=request)
+
+
+def make_session(pages, max_concurrency=4, rate_limiter=None, delay=0.05):
+    transport = SlowTransport(pages, delay)
+    limiter = rate_limiter or HostRateLimiter(rate=1000, burst=1000)
+    session = SearchSession(max_concurrency, limiter, sync_client=StubCookies(), transport=transport)
+    return session, transport
+
+
+def test_search_many_maps_terms_to_their_results():
+    pages = {build_search_url("jbl flip 6"): load_fixture("listing_classic.html"),
+             build_search_url("lampada led"): load_fixture("listing_grid.html")}
+    session, _ = make_session(pages)
+    try:
+        results = search_many(["jbl flip 6", "lampada led", "JBL  Flip 6", "nao existe"], limit=10,
+                              use_cache=False, session=session)
+        # Termo repetido (após normalização) fica só com a primeira grafia
+        assert list(results) == ["jbl flip 6", "lampada led", "nao existe"]
+        assert len(results["jbl flip 6"]) == 6 and all(p.query == "jbl flip 6" for p in results["jbl flip 6"])
+        assert results["lampada led"] and all(p.query == "lampada led" for p in results["lampada led"])
+        assert results["nao existe"] == []
+    finally:
+        session.close()
+
+
+def test_search_many_caps_concurrency_and_reuses_the_session():
+    terms = [f"termo {i}" for i in range(8)]
+    session, transport = make_session({}, max_concurrency=2)
+    try:
+        search_many(terms, use_cache=False, session=session)
+        assert transport.max_in_flight == 2
+        # Segunda chamada usa o mesmo cliente (contadores acumulam)
+        search_many(["outro termo"], use_cache=False, session=session)
+        assert session.connection_stats()["requests"] == 9
+    finally:
+        session.close()
+
+
+def test_search_many_respects_rate_limit():
+    # 10 req/s sem burst: 5 buscas levam pelo menos ~0.4s para começar
+    limiter = HostRateLimiter(rate=10, burst=1)
+    session, transport = make_session({}, max_concurrency=5, rate_limiter=limiter, delay=0)
+    try:
+        search_many([f"termo {i}" for i in range(5)], use_cache=False, session=session)
+        starts = sorted(t for _, t in transport.started)
+        assert starts[-1] - starts[0] >= 0.35
+    finally:
+        session.close()
+
+
+def test_failed_term_is_not_memoized():
+    pages = {build_search_url("lampada led"): load_fixture("listing_grid.html")}
+    session, transport = make_session(pages, delay=0)
+    run = SearchRun()
+    try:
+        # 404: o termo que falhou volta vazio sem derrubar os outros
+        results = search_many(["jbl flip 6", "lampada led"], use_cache=False, run=run, session=session)
+        assert results["jbl flip 6"] == [] and results["lampada led"]
+
+        # A falha não fica no SearchRun: a próxima busca tenta de novo
+        pages[build_search_url("jbl flip 6")] = load_fixture("listing_classic.html")
+        results = search_many(["jbl flip 6", "lampada led"], use_cache=False, run=run, session=session)
+        assert len(results["jbl flip 6"]) == 6
+        assert run.stats["fetched"] == 3 and run.stats["reused"] == 1
+    finally:
+        session.close()
+
+
+def test_cancelled_owner_releases_waiters(monkeypatch):
+    async def hang(term, **kwargs):
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(market_search, "search_mercadolibre_async", hang)
+    run = SearchRun()
+
+    async def scenario():
+        owner = asyncio.create_task(market_search._search_once(run, "jbl flip 6", 10, None))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(market_search._search_term(run, "JBL  Flip 6", 10, None))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        # Quem esperava recebe erro (termo vazio) em vez de ficar bloqueado
+        assert await asyncio.wait_for(waiter, 1) == []
+        assert owner.cancelled()
+
+    asyncio.run(scenario())
+    # O cancelamento não fica memorizado: a próxima chamada busca de novo
+    _, is_owner = run.claim(("jbl flip 6", 10))
+    assert is_owner
+
+
+class RecordingCache:
+    """Cache falso: registra leituras e gravações."""
+    ttl = 3600
+
+    def __init__(self):
+        self.calls = []
+
+    def record(self, name):
+        self.calls.append(name)
+
+    def get(self, url):
+        self.calls.append("get")
+
+    def put(self, url, *args):
+        self.calls.append("put")
+
+
+def test_paginated_search_without_cache_never_touches_it(monkeypatch):
+    pages = {build_search_url("jbl flip 6", offset=page * PAGE_SIZE): load_fixture("listing_classic.html")
+             for page in range(2)}
+    transport = SlowTransport(pages, delay=0)
+    cache = RecordingCache()
+    monkeypatch.setattr(http_client, "get_cache", lambda: cache)
+    # Cliente aberto pela própria busca paginada, servido pelo transport local
+    monkeypatch.setattr(market_search, "AsyncScrapingClient",
+                        lambda **kwargs: AsyncScrapingClient(sync_client=StubCookies(), transport=transport,
+                                                             rate_limiter=HostRateLimiter(rate=1000, burst=1000),
+                                                             **kwargs))
+
+    products = list(iter_search_results("jbl flip 6", max_items=PAGE_SIZE + 1, use_cache=False))
+    assert len(products) == 12 and len(transport.started) == 2
+    assert cache.calls == ["bypassed", "bypassed"]
+
+
+if __name__ == "__main__":
+    test_search_many_maps_terms_to_their_results()
+    test_search_many_caps_concurrency_and_reuses_the_session()
+    test_search_many_respects_rate_limit()
+    test_failed_term_is_not_memoized()
+    print("Market search OK")
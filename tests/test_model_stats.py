@@ -0,0 +1,102 @@
+import os
+import sys
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from model_stats import ModelStats, percentile
+
+
+def test_percentile():
+    assert percentile([], 0.5) is None
+    assert percentile([3, 1, 2], 0.5) == 2
+    assert percentile([0, 10], 0.95) == 9.5
+
+
+def test_candidates_ordered_by_expected_latency():
+    with tempfile.TemporaryDirectory() as tmp:
+        stats = ModelStats(os.path.join(tmp, "stats.json"))
+        for _ in range(5):
+            stats.record_success("lento", 2.0)
+            stats.record_success("rapido", 0.5)
+            stats.record_success("instavel", 0.4)
+        # Rápido mas falhando muito: latência esperada sobe (0.4 / 0.375)
+        for _ in range(3):
+            stats.record_failure("instavel", RuntimeError("500"))
+        stats.record_success("instavel", 0.4)
+
+        order = stats.order(["novo", "lento", "instavel", "rapido"])
+        assert order == ["rapido", "instavel", "lento", "novo"]
+
+
+def test_recent_failure_is_skipped_until_cooldown_ends():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "stats.json")
+        stats = ModelStats(path, cooldown=3600)
+        stats.record_success("a", 1.0)
+        stats.record_failure("b", RuntimeError("404 model not found"))
+        assert stats.order(["b", "a"]) == ["a"]
+        assert stats.skipped(["b", "a"]) == ["b"]
+
+        # Persistido entre execuções (flush do fim da execução)
+        stats.flush()
+        reloaded = ModelStats(path, cooldown=3600)
+        assert reloaded.in_cooldown("b")
+        assert reloaded.records["a"].p50 == 1.0
+        assert "404 model not found" in reloaded.summary()[-1]
+
+        # Cooldown vencido: volta a ser candidato
+        assert ModelStats(path, cooldown=0).order(["b", "a"]) == ["a", "b"]
+
+        # Um sucesso depois da falha tira o modelo do cooldown
+        reloaded.record_success("b", 0.2)
+        assert reloaded.order(["a", "b"]) == ["b", "a"]
+
+
+def test_transient_failure_counts_but_does_not_cool_down():
+    with tempfile.TemporaryDirectory() as tmp:
+        stats = ModelStats(os.path.join(tmp, "stats.json"), cooldown=3600)
+        stats.record_success("a", 1.0)
+        stats.record_failure("a", RuntimeError("500 INTERNAL"), persistent=False)
+        assert not stats.in_cooldown("a")
+        assert stats.records["a"].error_rate == 0.5
+
+
+def test_all_models_failing_still_returns_candidates():
+    with tempfile.TemporaryDirectory() as tmp:
+        stats = ModelStats(os.path.join(tmp, "stats.json"))
+        stats.record_failure("a", RuntimeError("x"))
+        stats.record_failure("b", RuntimeError("x"))
+        assert stats.order(["b", "a"]) == ["a", "b"]
+
+
+def test_saves_are_batched_until_flush():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "stats.json")
+        stats = ModelStats(path, save_interval=3600)
+        stats.record_success("a", 1.0)
+        # Primeira alteração grava; as seguintes ficam em memória até o intervalo ou o flush
+        assert ModelStats(path).records["a"].successes == 1
+        mtime = os.stat(path).st_mtime_ns
+        for _ in range(20):
+            stats.record_success("a", 1.0)
+        stats.record_failure("b", RuntimeError("500"))
+        assert os.stat(path).st_mtime_ns == mtime
+        assert "b" not in ModelStats(path).records
+
+        stats.flush()
+        reloaded = ModelStats(path)
+        assert reloaded.records["a"].successes == 21 and reloaded.records["b"].failures == 1
+        # Nada pendente: flush não regrava
+        mtime = os.stat(path).st_mtime_ns
+        stats.flush()
+        assert os.stat(path).st_mtime_ns == mtime
+
+
+if __name__ == "__main__":
+    test_percentile()
+    test_candidates_ordered_by_expected_latency()
+    test_recent_failure_is_skipped_until_cooldown_ends()
+    test_transient_failure_counts_but_does_not_cool_down()
+    test_all_models_failing_still_returns_candidates()
+    test_saves_are_batched_until_flush()
+    print("Model stats OK")
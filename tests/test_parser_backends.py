@@ -0,0 +1,94 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from market_search import parse_search_results
+from html_parsers import PARSER_BACKENDS
+from card_fields import field_stats
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+FIXTURES = ["listing_classic.html", "listing_grid.html"]
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def test_backends_extract_identical_products():
+    for fixture in FIXTURES:
+        html = load_fixture(fixture)
+        reference = parse_search_results(html, "jbl flip 6", limit=None, backend="html.parser", mode="dom")
+        assert reference, f"Nenhum produto extraído de {fixture}"
+
+        for backend in PARSER_BACKENDS:
+            products = parse_search_results(html, "jbl flip 6", limit=None, backend=backend, mode="dom")
+            assert products == reference, f"{backend} divergiu em {fixture}"
+
+
+def test_classic_fixture_fields():
+    products = parse_search_results(load_fixture("listing_classic.html"), "jbl flip 6", limit=None)
+    titles = [p.title for p in products]
+
+    assert titles[0] == "Caixa De Som Jbl Flip 6 Bluetooth À Prova D'água Preta"
+    assert products[0].price == 649.0
+    assert products[0].logistics == "Full"
+    assert products[0].attributes == "Potência: 20 W, Bateria: 12 h"
+    assert products[0].image_url.startswith("https://http2.mlstatic.com/D_NQ_NP_111111")
+
+    assert products[1].price == 1299.0
+    assert products[1].condition == "Recondicionado"
+    assert products[1].logistics == "Flex"
+    assert products[2].title == "Capa Case Para JBL Flip 6"
+    assert products[3].price == 0.0
+    assert products[4].title == "Título não encontrado"
+    assert products[5].title == "JBL Flip 6 Vermelha"
+    assert products[5].link == "https://produto.mercadolivre.com.br/MLB-5566001122-jbl-flip-6-vermelha-_JM"
+
+
+def test_field_stats_report_layout_variants():
+    field_stats.reset()
+    parse_search_results(load_fixture("listing_classic.html"), "jbl flip 6", limit=None, mode="dom")
+
+    assert field_stats.cards == 6
+    assert field_stats.hits[("title", "poly")] == 3
+    assert field_stats.hits[("title", "classic")] == 2
+    assert field_stats.misses["title"] == 1
+    assert field_stats.summary()[0] == "title: classic=2 poly=3 miss=1"
+
+
+def test_limit_applies_to_cards():
+    html = load_fixture("listing_grid.html")
+    for backend in PARSER_BACKENDS:
+        assert len(parse_search_results(html, "lampada", limit=2, backend=backend, mode="dom")) == 2
+
+
+def test_state_blob_extraction():
+    products = parse_search_results(load_fixture("listing_state.html"), "jbl flip 6", limit=None, mode="json")
+
+    assert [p.item_id for p in products] == ["MLB3344556677", "MLB2233445566"]
+    assert products[0].price == 649.9
+    assert products[0].sales == 5000
+    assert products[0].seller == "JBL"
+    assert products[0].logistics == "Full"
+    assert products[0].link == "https://www.mercadolivre.com.br/caixa-de-som-jbl-flip-6/p/MLB18766655"
+    assert products[0].image_url == "https://http2.mlstatic.com/D_NQ_NP_111111-MLB1111111111_012024-O.webp"
+    assert products[1].sales == 37
+    assert products[1].condition == "Recondicionado"
+    assert products[1].logistics == "Flex"
+
+
+def test_state_mode_falls_back_to_dom():
+    html = load_fixture("listing_classic.html")
+    assert parse_search_results(html, "jbl flip 6", limit=None, mode="json") == \
+        parse_search_results(html, "jbl flip 6", limit=None, mode="dom")
+
+
+if __name__ == "__main__":
+    test_backends_extract_identical_products()
+    test_classic_fixture_fields()
+    test_field_stats_report_layout_variants()
+    test_limit_applies_to_cards()
+    test_state_blob_extraction()
+    test_state_mode_falls_back_to_dom()
+    print("SUCCESS: parser backends produce identical products")
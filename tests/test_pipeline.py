@@ -0,0 +1,116 @@
+import os
+import sys
+import threading
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from pipeline import Pipeline, Stage
+import report
+from report import ReportGenerator
+from product import Product
+
+
+def test_all_items_flow_through_stages():
+    pipeline = Pipeline([
+        Stage("dobra", lambda x: [x * 2], workers=3),
+        Stage("expande", lambda x: [x, x + 1], workers=2),
+    ], log_interval=0)
+    results = pipeline.run(range(20))
+    assert sorted(results) == sorted([y for x in range(20) for y in (2 * x, 2 * x + 1)])
+    assert pipeline.stages[0].stats["processed"] == 20
+    assert pipeline.stages[1].stats["emitted"] == 40
+
+
+def test_stages_overlap():
+    # 3 estágios de 50ms com 8 itens: sequencial ~1.2s, em pipeline ~0.5s
+    def slow(x):
+        time.sleep(0.05)
+        return [x]
+
+    pipeline = Pipeline([Stage(name, slow) for name in ("a", "b", "c")], log_interval=0)
+    start = time.perf_counter()
+    assert sorted(pipeline.run(range(8))) == list(range(8))
+    assert time.perf_counter() - start < 0.9
+
+
+def test_bounded_queue_applies_backpressure():
+    release = threading.Event()
+
+    def blocked(x):
+        release.wait()
+        return [x]
+
+    pipeline = Pipeline([
+        Stage("rapido", lambda x: [x]),
+        Stage("lento", blocked, queue_size=2),
+    ], log_interval=0)
+    timer = threading.Timer(0.3, release.set)
+    timer.start()
+    pipeline.run(range(10))
+    slow = pipeline.stages[1]
+    assert slow.stats["max_depth"] <= 2
+    # O estágio rápido ficou esperando espaço na fila do lento
+    assert pipeline.stages[0].stats["blocked"] > 0.1
+    assert pipeline.bottleneck() == "lento"
+
+
+def test_stage_error_does_not_stop_pipeline():
+    def fragile(x):
+        if x == 3:
+            raise ValueError("falhou")
+        return [x]
+
+    pipeline = Pipeline([Stage("fragil", fragile, workers=2)], log_interval=0)
+    assert sorted(pipeline.run(range(6))) == [0, 1, 2, 4, 5]
+    assert pipeline.stages[0].stats["errors"] == 1
+    assert any("gargalo" in line for line in pipeline.summary())
+
+
+def test_slow_source_is_reported_as_bottleneck():
+    # Entrada lenta (ex.: IA chamada pelo gerador): os estágios ficam ociosos
+    def slow_source():
+        for i in range(5):
+            time.sleep(0.05)
+            yield i
+
+    pipeline = Pipeline([Stage("busca", lambda x: [x])], log_interval=0, source="analise")
+    assert sorted(pipeline.run(slow_source())) == [0, 1, 2, 3, 4]
+    utilisation = pipeline.utilisation()
+    assert utilisation["analise"] > 0.7 and utilisation["busca"] < 0.2
+    assert pipeline.bottleneck() == "analise"
+    assert pipeline.summary()[0].startswith("analise: 5 itens gerados")
+
+
+def test_monitor_logs_queue_depth(capsys):
+    def slow(x):
+        time.sleep(0.03)
+        return [x]
+
+    Pipeline([Stage("lento", slow)], log_interval=0.05).run(range(6))
+    out = capsys.readouterr().out
+    assert "[pipeline] lento: fila" in out and "ocupado" in out
+
+
+def test_report_uses_prefetched_thumbnails(tmp_path, monkeypatch):
+    import PIL.Image
+    from io import BytesIO
+    buffer = BytesIO()
+    PIL.Image.new("RGB", (40, 30), (200, 10, 10)).save(buffer, format="PNG")
+
+    def no_download(url, client=None):
+        raise AssertionError(f"não deveria baixar {url}")
+
+    monkeypatch.setattr(report, "fetch_thumbnail", no_download)
+    products = [Product(query="q", title="Item", price=10.0, image_url="http://img/1.webp")]
+    thumbnails = {"http://img/1.webp": (buffer.getvalue(), (40, 30))}
+    filepath = ReportGenerator(output_dir=str(tmp_path)).generate_excel(products, thumbnails=thumbnails)
+    assert filepath and os.path.exists(filepath)
+
+
+if __name__ == "__main__":
+    test_all_items_flow_through_stages()
+    test_stages_overlap()
+    test_bounded_queue_applies_backpressure()
+    test_stage_error_does_not_stop_pipeline()
+    test_slow_source_is_reported_as_bottleneck()
+    print("OK")
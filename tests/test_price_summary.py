@@ -0,0 +1,72 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from price_summary import price_summary
+from product import Product, Logistics, products_to_dataframe
+import report
+from report import ReportGenerator, SUMMARY_SHEET
+
+
+def make_products():
+    prices = [100.0, 110.0, 120.0, 130.0, 5000.0, 0.0]
+    products = [Product("jbl flip 6", f"JBL {i}", price, logistics=Logistics.FULL if i < 2 else Logistics.NORMAL,
+                        source_image="a.jpg | b.jpg")
+                for i, price in enumerate(prices)]
+    products.append(Product("echo dot", "Echo", 300.0, logistics=Logistics.FULL_FLEX, source_image="b.jpg"))
+    products.append(Product("echo dot", "Echo sem imagem", 0.0))
+    return products
+
+
+def test_term_summary_rejects_outliers_and_flags_zero_prices():
+    summary = price_summary(make_products()).set_index("Termo de Busca")
+    jbl = summary.loc["jbl flip 6"]
+    valid = np.array([100.0, 110.0, 120.0, 130.0, 5000.0])
+    assert jbl["Anúncios"] == 6 and jbl["Com preço"] == 5 and jbl["Preço 0.0 (falha)"] == 1
+    assert jbl["Mínimo"] == 100.0
+    assert jbl["Mediana"] == np.median(valid)
+    assert jbl["P25"] == np.percentile(valid, 25) and jbl["P75"] == np.percentile(valid, 75)
+    # 5000 fica acima de P75 + 1.5*IQR: fora da média
+    assert jbl["Outliers"] == 1 and jbl["Média sem outliers"] == 115.0
+    assert jbl["% Full"] == 2 / 6 and jbl["% Flex"] == 0.0
+
+    echo = summary.loc["echo dot"]
+    assert echo["Com preço"] == 1 and echo["Mediana"] == 300.0
+    assert echo["% Full"] == 0.5 and echo["% Flex"] == 0.5
+
+
+def test_source_image_summary_splits_merged_records():
+    summary = price_summary(make_products(), by="source_image").set_index("Imagem Origem")
+    # Registro unido ("a.jpg | b.jpg") conta nas duas imagens; sem imagem fica de fora
+    assert list(summary.index) == ["a.jpg", "b.jpg"]
+    assert summary.loc["a.jpg", "Anúncios"] == 6
+    assert summary.loc["b.jpg", "Anúncios"] == 7
+    assert summary.loc["b.jpg", "Mínimo"] == 100.0
+
+
+def test_report_frame_gives_same_summary():
+    products = make_products()
+    frame = products_to_dataframe(products).iloc[::-1]
+    pd.testing.assert_frame_equal(price_summary(frame), price_summary(products))
+    assert price_summary([]).empty
+
+
+def test_report_writes_summary_sheet(tmp_path, monkeypatch):
+    monkeypatch.setattr(report, "fetch_thumbnail", lambda url, client=None: None)
+    filepath = ReportGenerator(output_dir=str(tmp_path)).generate_excel(make_products())
+    sheets = pd.read_excel(filepath, sheet_name=None)
+    assert list(sheets) == ["Resultados", SUMMARY_SHEET]
+    summary = sheets[SUMMARY_SHEET]
+    assert summary.columns[0] == "Termo de Busca"
+    assert list(summary["Termo de Busca"][:2]) == ["echo dot", "jbl flip 6"]
+    # Tabela por imagem de origem logo abaixo (cabeçalho na linha em branco + 1)
+    assert "Imagem Origem" in summary["Termo de Busca"].tolist()
+
+
+if __name__ == "__main__":
+    test_term_summary_rejects_outliers_and_flags_zero_prices()
+    test_source_image_summary_splits_merged_records()
+    test_report_frame_gives_same_summary()
+    print("Price summary OK")
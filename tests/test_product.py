@@ -0,0 +1,65 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from product import Product, Logistics, Condition, products_to_dataframe
+from data_processing import DataProcessor, ConditionFilter, NegativeKeywordFilter, LogisticsFilter
+
+
+def make_products():
+    return [
+        Product("jbl flip 6", "JBL Flip 6 Preta", 649.0, logistics=Logistics.FULL, sales=5000, item_id="MLB1"),
+        Product("jbl flip 6", "JBL Flip 6 Usada", 400.0, condition=Condition.USADO, logistics=Logistics.FLEX),
+        Product("jbl flip 6", "Capa Para JBL Flip 6", 39.9, seller="Loja X"),
+    ]
+
+
+def test_enums_parse_scraped_text():
+    assert Logistics.parse("Full, Flex") is Logistics.FULL_FLEX
+    assert Logistics.parse("") is Logistics.NORMAL
+    assert Condition.parse("Usado - Bom estado") is Condition.USADO
+    assert Condition.parse(None) is Condition.NOVO
+    # Enums comparam com o texto do relatório
+    assert Logistics.FULL == "Full"
+
+
+def test_row_round_trip_uses_report_columns():
+    product = make_products()[0]
+    row = product.to_row()
+
+    assert row["Título"] == "JBL Flip 6 Preta"
+    assert row["Logística"] == "Full"
+    assert row["Vendedor"] == "N/A (Via Scraping)"
+    assert "Imagem Origem" not in row
+    assert Product.from_row(row) == product
+
+    missing = make_products()[1].to_row()
+    assert missing["Vendas (Aprox)"] == "Ver no Site" and missing["ID"] == "N/A"
+
+
+def test_dataframe_matches_rows():
+    products = make_products()
+    products[0].source_image = "foto.jpg"
+    df = products_to_dataframe(products)
+
+    assert list(df.columns)[-1] == "Imagem Origem"
+    assert df["Preço (R$)"].tolist() == [649.0, 400.0, 39.9]
+    assert df.iloc[2]["Vendedor"] == "Loja X"
+    assert df.iloc[1]["Condição"] == "Usado"
+
+
+def test_filters_on_products():
+    processor = DataProcessor()
+    processor.add_filter(ConditionFilter("Novo"))
+    processor.add_filter(NegativeKeywordFilter(["capa"]))
+    assert [p.title for p in processor.process(make_products())] == ["JBL Flip 6 Preta"]
+
+    assert len(LogisticsFilter(["flex"]).apply(make_products())) == 1
+
+
+if __name__ == "__main__":
+    test_enums_parse_scraped_text()
+    test_row_round_trip_uses_report_columns()
+    test_dataframe_matches_rows()
+    test_filters_on_products()
+    print("Product OK")
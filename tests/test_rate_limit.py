@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from rate_limit import (TokenBucket, AdaptiveController, QuotaLimiter, backoff_delay,
+                        SUCCESS, THROTTLED, FAILED, BACKOFF_MAX)
+
+
+def test_token_bucket_paces_after_burst():
+    bucket = TokenBucket(rate=10, burst=2)
+    waits = [bucket._reserve() for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0]
+    assert 0.05 < waits[2] <= 0.1
+    assert waits[3] > waits[2]
+
+
+def test_quota_limiter_counts_requests_and_tokens():
+    quota = QuotaLimiter(rpm=60, tpm=6000)  # burst: 15 requisições, 1500 tokens
+    assert quota.requests._reserve() == 0.0
+    # Chamada "cara": reserva mais tokens do que o burst permite -> espera
+    assert quota.tokens._reserve(1000) == 0.0
+    assert quota.tokens._reserve(1000) > 0
+    # Consumo real menor que o estimado devolve tokens
+    quota.charge_tokens(-1000)
+    assert quota.tokens._reserve(400) == 0.0
+
+
+def test_aimd_halves_on_throttle_and_recovers_on_success():
+    bucket = TokenBucket(rate=4, burst=1)
+    controller = AdaptiveController(bucket, max_limit=8, max_rate=4, failure_threshold=100)
+
+    controller.acquire_blocking()
+    controller.release(THROTTLED)
+    assert controller.snapshot()["concurrency"] == 4
+    assert bucket.rate == 2
+
+    for _ in range(50):
+        controller.acquire_blocking()
+        controller.release(SUCCESS)
+    assert controller.snapshot()["concurrency"] == 8
+    assert bucket.rate == 4
+
+
+def test_burst_of_throttles_halves_once_per_window():
+    bucket = TokenBucket(rate=4, burst=1)
+    controller = AdaptiveController(bucket, max_limit=8, max_rate=4, failure_threshold=100)
+
+    # Quatro 429 de requisições que saíram juntas: um corte só
+    windows = [controller.acquire_blocking() for _ in range(4)]
+    for window in windows:
+        controller.release(THROTTLED, window)
+    assert controller.snapshot()["concurrency"] == 4 and bucket.rate == 2
+    assert controller.snapshot()["throttled"] == 4
+
+    # Requisição enviada depois do corte que também é limitada corta de novo
+    controller.release(THROTTLED, controller.acquire_blocking())
+    assert controller.snapshot()["concurrency"] == 2 and bucket.rate == 1
+
+
+def test_circuit_opens_after_repeated_failures():
+    controller = AdaptiveController(TokenBucket(rate=1), max_limit=2, failure_threshold=2, cooldown=0.2)
+    for _ in range(2):
+        controller.acquire_blocking()
+        controller.release(FAILED)
+
+    snapshot = controller.snapshot()
+    assert snapshot["circuit_open"] and snapshot["circuit_opens"] == 1
+    assert controller._try_acquire()[0] > 0
+
+    time.sleep(0.25)
+    controller.acquire_blocking()
+    # Meio aberto: só uma requisição de teste por vez
+    assert controller._try_acquire()[0] > 0
+    controller.release(SUCCESS)
+    assert controller._try_acquire()[0] == 0.0
+
+
+def test_backoff_is_bounded_and_honours_retry_after():
+    assert all(0 < backoff_delay(attempt) <= BACKOFF_MAX for attempt in range(10))
+    assert backoff_delay(0, retry_after="5") >= 5
+
+
+if __name__ == "__main__":
+    test_token_bucket_paces_after_burst()
+    test_aimd_halves_on_throttle_and_recovers_on_success()
+    test_burst_of_throttles_halves_once_per_window()
+    test_circuit_opens_after_repeated_failures()
+    test_backoff_is_bounded_and_honours_retry_after()
+    print("SUCCESS: rate limiting")
@@ -0,0 +1,137 @@
+import asyncio
+import os
+import sys
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from market_search import (search_mercadolibre, search_mercadolibre_async, stream_search_async, build_search_url,
+                           parse_search_results, PAGE_SIZE)
+from http_client import ScrapingClient, AsyncScrapingClient
+from replay import ReplayStore, ReplayTransport
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+QUERY = "jbl flip 6"
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def make_replay_dir(tmp):
+    store = ReplayStore(tmp)
+    store.save(build_search_url(QUERY), load_fixture("listing_classic.html"))
+    return tmp
+
+
+def test_replay_serves_recorded_pages():
+    html = load_fixture("listing_classic.html")
+    expected = parse_search_results(html, QUERY, limit=10)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        client = ScrapingClient(replay_dir=make_replay_dir(tmp))
+        assert search_mercadolibre(QUERY, limit=10, client=client) == expected
+        # URL não gravada responde 404 (e a busca volta vazia, sem ir à rede)
+        assert search_mercadolibre("termo nao gravado", limit=10, client=client) == []
+
+
+def test_async_replay_and_recording():
+    with tempfile.TemporaryDirectory() as replay_tmp, tempfile.TemporaryDirectory() as record_tmp:
+        sync_client = ScrapingClient(replay_dir=make_replay_dir(replay_tmp), record_dir=record_tmp)
+
+        async def run():
+            async with AsyncScrapingClient(sync_client=sync_client) as client:
+                return await search_mercadolibre_async(QUERY, limit=10, client=client)
+
+        products = asyncio.run(run())
+        assert len(products) == 6
+
+        # A página baixada foi gravada e pode ser reproduzida depois
+        recorded = ReplayStore(record_tmp)
+        assert recorded.load(build_search_url(QUERY)) == load_fixture("listing_classic.html")
+
+
+class DelayedReplay(ReplayTransport):
+    """Replay com atraso por URL; guarda as URLs pedidas e as que foram canceladas."""
+    def __init__(self, store, delays=None):
+        super().__init__(store)
+        self.delays = delays or {}
+        self.requested = []
+        self.cancelled = []
+
+    async def handle_async_request(self, request):
+        url = str(request.url)
+        self.requested.append(url)
+        try:
+            await asyncio.sleep(self.delays.get(url, 0))
+        except asyncio.CancelledError:
+            self.cancelled.append(url)
+            raise
+        return await super().handle_async_request(request)
+
+
+def make_paged_replay(tmp, pages):
+    """Grava 'pages' páginas alternando as duas fixtures (6 e 3 itens)."""
+    store = ReplayStore(tmp)
+    fixtures = ["listing_classic.html", "listing_grid.html"]
+    for page in range(pages):
+        store.save(build_search_url(QUERY, offset=page * PAGE_SIZE), load_fixture(fixtures[page % 2]))
+    return store
+
+
+def stream_titles(store, delays=None, **kwargs):
+    transport = DelayedReplay(store, delays)
+
+    async def run():
+        sync_client = ScrapingClient(replay_dir=store.directory)
+        async with AsyncScrapingClient(sync_client=sync_client, transport=transport) as client:
+            return [p.title async for p in stream_search_async(QUERY, client=client, use_cache=False, **kwargs)]
+
+    return asyncio.run(run()), transport
+
+
+def test_stream_yields_in_page_order():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_paged_replay(tmp, 2)
+        first = [p.title for p in parse_search_results(load_fixture("listing_classic.html"), QUERY, None)]
+        second = [p.title for p in parse_search_results(load_fixture("listing_grid.html"), QUERY, None)]
+        # Primeira página chega por último, mas continua vindo primeiro (e o corte fica na segunda)
+        titles, transport = stream_titles(store, {build_search_url(QUERY): 0.2}, max_items=PAGE_SIZE + 1)
+        assert titles == first + second
+        assert transport.requested == [build_search_url(QUERY), build_search_url(QUERY, offset=PAGE_SIZE)]
+
+
+def test_stream_respects_page_budget():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_paged_replay(tmp, 5)
+        titles, transport = stream_titles(store, max_items=1000, max_pages=3)
+        assert sorted(transport.requested) == sorted(build_search_url(QUERY, offset=page * PAGE_SIZE)
+                                                     for page in range(3))
+        assert len(titles) == 6 + 3 + 6
+
+
+def test_stream_cancels_pending_pages():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_paged_replay(tmp, 3)
+        slow = {build_search_url(QUERY, offset=page * PAGE_SIZE): 5 for page in (1, 2)}
+        transport = DelayedReplay(store, slow)
+
+        async def run():
+            sync_client = ScrapingClient(replay_dir=store.directory)
+            async with AsyncScrapingClient(sync_client=sync_client, transport=transport) as client:
+                stream = stream_search_async(QUERY, max_items=3 * PAGE_SIZE, client=client, use_cache=False)
+                first = await stream.__anext__()
+                await stream.aclose()
+                return first
+
+        assert asyncio.run(asyncio.wait_for(run(), timeout=2)).query == QUERY
+        assert sorted(transport.cancelled) == sorted(slow)
+
+
+if __name__ == "__main__":
+    test_replay_serves_recorded_pages()
+    test_async_replay_and_recording()
+    test_stream_yields_in_page_order()
+    test_stream_respects_page_budget()
+    test_stream_cancels_pending_pages()
+    print("Replay OK")
@@ -0,0 +1,60 @@
+import os
+import sys
+import threading
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from search_query import SearchRun, normalize_query, query_slug
+
+
+def test_equivalent_terms_normalize_to_the_same_key():
+    assert normalize_query("JBL Flip 6") == normalize_query("  jbl   flip 6 ") == "jbl flip 6"
+    assert normalize_query("Película Vidro") == normalize_query("pelicula vidro")
+
+
+def test_query_slug():
+    assert query_slug("Lâmpada LED Bluetooth Altonex WJ-L2 RGB Som") == "lampada-led-bluetooth-altonex-wj-l2-rgb-som"
+    assert query_slug("Caixa d'água  500L ") == "caixa-d-agua-500l"
+
+
+def test_concurrent_identical_searches_share_one_fetch():
+    run = SearchRun()
+    fetches = []
+    results = []
+
+    def worker(term):
+        key = normalize_query(term)
+        future, is_owner = run.claim(key)
+        if is_owner:
+            time.sleep(0.05)  # simula a requisição em andamento
+            fetches.append(term)
+            run.resolve(key, [{"Título": "JBL Flip 6"}])
+        results.append(future.result(timeout=1))
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in ["JBL Flip 6", "jbl flip 6 ", "Jbl  FLIP 6"]]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(fetches) == 1
+    assert len(results) == 3 and all(r == results[0] for r in results)
+    assert run.stats["fetched"] == 1
+    assert run.stats["coalesced"] + run.stats["reused"] == 2
+
+
+def test_failed_search_is_retried():
+    run = SearchRun()
+    future, is_owner = run.claim("jbl")
+    run.fail("jbl", RuntimeError("429"))
+
+    _, is_owner_again = run.claim("jbl")
+    assert is_owner and is_owner_again
+
+
+if __name__ == "__main__":
+    test_equivalent_terms_normalize_to_the_same_key()
+    test_query_slug()
+    test_concurrent_identical_searches_share_one_fetch()
+    test_failed_search_is_retried()
+    print("SUCCESS: query normalization and coalescing")
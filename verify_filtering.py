@@ -1,43 +1,35 @@
 
 import json
-from src.data_processing import DataProcessor, ConditionFilter, NegativeKeywordFilter
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from data_processing import DataProcessor, ConditionFilter, NegativeKeywordFilter
+from product import Product
 
 def verify():
     # Carrega dados reais
     with open("results.json", "r", encoding="utf-8") as f:
-        data = json.load(f)
-    
+        data = [Product.from_row(row) for row in json.load(f)]
+
     print(f"Dados carregados: {len(data)} itens")
-    
-    # Recria processador do main.py
-    processor = DataProcessor()
-    
-    # Filtro 1: Condição
-    cond_filter = ConditionFilter("Novo")
-    processor.add_filter(cond_filter)
-    
-    # Filtro 2: Keywords Negativas
+
+    # Recria processador do main.py (ordem fixa: cada filtro vê o que sobrou do anterior)
+    processor = DataProcessor(mode="list", reorder=False, profile_every=1)
+    processor.add_filter(ConditionFilter("Novo"))
     neg_filter = NegativeKeywordFilter(["capa", "capinha", "película", "vidro", "suporte", "cabo"])
     processor.add_filter(neg_filter)
-    
-    # Teste passo a passo
-    print("\nAdicionando Filtro de Condição ('Novo')...")
-    res1 = cond_filter.apply(data)
-    print(f"Itens restantes: {len(res1)}")
-    if len(res1) == 0 and len(data) > 0:
-        print("  -> TODOS REMOVIDOS POR CONDIÇÃO")
-        print(f"  Exemplo cond: '{data[0].get('Condição')}'")
-
-    print("\nAdicionando Filtro de Keywords Negativas...")
-    res2 = neg_filter.apply(res1)
-    print(f"Itens restantes: {len(res2)}")
-    if len(res2) == 0 and len(res1) > 0:
-        print("  -> TODOS REMOVIDOS POR KEYWORDS")
-        for item in res1:
-            title = item.get("Título", "").lower()
-            triggered = [k for k in neg_filter.keywords if k in title]
-            if triggered:
-                print(f"  Item '{title}' removido por: {triggered}")
+
+    result = processor.process(data)
+    print(f"Itens restantes: {len(result)}")
+    for line in processor.summary():
+        print(f"  {line}")
+
+    # Quais palavras removeram cada item (só os que passaram pela condição)
+    for item in data:
+        triggered = neg_filter.matcher.find_all(item.title)
+        if triggered and item.condition is processor.filters[0].condition:
+            print(f"  Item '{item.title}' removido por: {triggered}")
 
 if __name__ == "__main__":
     verify()